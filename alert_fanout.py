@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+"""
+Distribución no bloqueante de alertas de caída.
+
+Cada destino (dashboard WebSocket, webhook externo, ...) tiene su propia cola
+acotada y su propio worker asyncio con reintentos exponenciales. Publicar una
+alerta nunca bloquea el bucle de eventos, así que un webhook lento o caído no
+retrasa la alerta del dashboard ni la siguiente notificación BLE.
+
+Dependencias:
+pip install requests
+
+Autor: Tu nombre
+Fecha: Octubre 2025
+"""
+
+import asyncio
+import logging
+import random
+from collections import OrderedDict
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from api_client import ApiError
+
+logger = logging.getLogger(__name__)
+
+# Configuración por defecto de los destinos
+SINK_QUEUE_SIZE = 100        # Alertas pendientes por destino
+MAX_RETRIES = 5              # Reintentos antes de descartar una alerta
+RETRY_BASE_DELAY = 0.5       # Segundos del primer reintento (se duplica en cada intento)
+RETRY_MAX_DELAY = 30.0       # Tope de espera entre reintentos
+DELIVERED_WINDOW = 1000      # alert_id recordados para evitar duplicados
+WEBHOOK_TIMEOUT = 5          # Timeout de cada petición HTTP
+
+
+class PermanentDeliveryError(Exception):
+    """Error que no se resuelve reintentando (p. ej. HTTP 4xx)"""
+
+
+class AlertSink:
+    """Destino de alertas con cola acotada, worker propio y reintentos"""
+
+    name = "sink"
+
+    def __init__(self, queue_size=SINK_QUEUE_SIZE, max_retries=MAX_RETRIES,
+                 base_delay=RETRY_BASE_DELAY, max_delay=RETRY_MAX_DELAY):
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.delivered = OrderedDict()  # alert_id ya entregados (ventana acotada)
+        self.stats = {"sent": 0, "failed": 0, "dropped": 0, "duplicates": 0, "retries": 0}
+
+    async def deliver(self, alert):
+        """Entrega una alerta. Debe lanzar una excepción si falla"""
+        raise NotImplementedError
+
+    def close(self):
+        """Libera los recursos del destino"""
+
+    def enqueue(self, alert):
+        """Encola sin bloquear; si la cola está llena se descarta la alerta más antigua"""
+        try:
+            self.queue.put_nowait(alert)
+        except asyncio.QueueFull:
+            oldest = self.queue.get_nowait()
+            self.queue.task_done()
+            self.queue.put_nowait(alert)
+            self.stats["dropped"] += 1
+            logger.error(f"[{self.name}] Cola llena, alerta descartada: {oldest.get('alert_id')}")
+
+    def retry_delay(self, attempt):
+        """Espera exponencial con jitter para el intento indicado"""
+        delay = min(self.max_delay, self.base_delay * (2 ** attempt))
+        return delay * random.uniform(0.5, 1.0)
+
+    def mark_delivered(self, alert_id):
+        self.delivered[alert_id] = True
+        if len(self.delivered) > DELIVERED_WINDOW:
+            self.delivered.popitem(last=False)
+
+    async def send_with_retries(self, alert):
+        """Entrega una alerta reintentando con espera exponencial"""
+        alert_id = alert.get("alert_id")
+        if alert_id in self.delivered:
+            self.stats["duplicates"] += 1
+            logger.debug(f"[{self.name}] Alerta duplicada ignorada: {alert_id}")
+            return
+
+        for attempt in range(self.max_retries + 1):
+            try:
+                await self.deliver(alert)
+                self.stats["sent"] += 1
+                if alert_id:
+                    self.mark_delivered(alert_id)
+                return
+            except PermanentDeliveryError as e:
+                logger.error(f"[{self.name}] Alerta {alert_id} rechazada: {e}")
+                break
+            except Exception as e:
+                if attempt == self.max_retries:
+                    logger.error(f"[{self.name}] Alerta {alert_id} descartada tras {attempt + 1} intentos: {e}")
+                    break
+                delay = self.retry_delay(attempt)
+                self.stats["retries"] += 1
+                logger.warning(f"[{self.name}] Error entregando {alert_id}: {e}. Reintento en {delay:.1f}s")
+                await asyncio.sleep(delay)
+
+        self.stats["failed"] += 1
+
+    async def run(self):
+        """Worker del destino: consume la cola en orden"""
+        while True:
+            alert = await self.queue.get()
+            try:
+                await self.send_with_retries(alert)
+            finally:
+                self.queue.task_done()
+
+
+class WebSocketSink(AlertSink):
+    """Envía las alertas al dashboard a través de la conexión WebSocket del sistema"""
+
+    name = "websocket"
+
+    def __init__(self, system, **kwargs):
+        super().__init__(**kwargs)
+        self.system = system
+
+    async def deliver(self, alert):
+        if not self.system.send_message(alert):
+            raise ConnectionError("WebSocket no conectado")
+
+
+class WebhookSink(AlertSink):
+    """Envía las alertas a un webhook HTTP reutilizando una conexión keep-alive"""
+
+    name = "webhook"
+
+    def __init__(self, url, timeout=WEBHOOK_TIMEOUT, **kwargs):
+        super().__init__(**kwargs)
+        self.url = url
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=2))
+        self.session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=2))
+
+    def build_payload(self, alert):
+        """Formato del webhook externo"""
+        return {
+            "evento": "caida",
+            "usuario": alert.get("user_id"),
+            "timestamp": alert.get("timestamp"),
+            "alert_id": alert.get("alert_id"),
+            "severity": alert.get("severity"),
+            "device_id": alert.get("device_id")
+        }
+
+    def post(self, alert):
+        response = self.session.post(
+            self.url,
+            json=self.build_payload(alert),
+            headers={"Idempotency-Key": str(alert.get("alert_id", ""))},
+            timeout=self.timeout
+        )
+        if 400 <= response.status_code < 500 and response.status_code != 429:
+            raise PermanentDeliveryError(f"HTTP {response.status_code}")
+        response.raise_for_status()
+        return response.status_code
+
+    async def deliver(self, alert):
+        # La petición bloqueante se ejecuta en un hilo para no frenar el bucle de eventos
+        status_code = await asyncio.to_thread(self.post, alert)
+        logger.info(f"Webhook enviado: {status_code}")
+
+    def close(self):
+        self.session.close()
+
+
+class ApiSink(AlertSink):
+    """Guarda las alertas en la base de datos por POST /fall-alert (api_client.py)"""
+
+    name = "api"
+
+    def __init__(self, client, **kwargs):
+        super().__init__(**kwargs)
+        self.client = client
+
+    async def deliver(self, alert):
+        try:
+            await self.client.run(self.client.save_fall_alert, alert)
+        except ApiError as e:
+            if 400 <= e.status < 500 and e.status != 429:
+                raise PermanentDeliveryError(str(e)) from e
+            raise
+
+    def close(self):
+        self.client.close()
+
+
+class AlertFanout:
+    """Reparte cada alerta a todos los destinos registrados sin bloquear al productor"""
+
+    def __init__(self):
+        self.sinks = []
+        self.tasks = []
+
+    def add_sink(self, sink):
+        self.sinks.append(sink)
+        if self.tasks:
+            self.tasks.append(asyncio.create_task(sink.run()))
+        return sink
+
+    def start(self):
+        """Arranca un worker por destino (requiere un bucle de eventos en marcha)"""
+        if not self.tasks:
+            self.tasks = [asyncio.create_task(sink.run()) for sink in self.sinks]
+
+    def publish(self, alert):
+        """Encola la alerta en cada destino y retorna inmediatamente"""
+        for sink in self.sinks:
+            sink.enqueue(alert)
+
+    def get_stats(self):
+        return {
+            sink.name: {**sink.stats, "queued": sink.queue.qsize()}
+            for sink in self.sinks
+        }
+
+    async def stop(self, drain_timeout=5.0):
+        """Espera a que se vacíen las colas (con límite) y detiene los workers"""
+        if self.tasks:
+            try:
+                await asyncio.wait_for(
+                    asyncio.gather(*(sink.queue.join() for sink in self.sinks)),
+                    timeout=drain_timeout
+                )
+            except asyncio.TimeoutError:
+                logger.warning(f"Alertas pendientes al detener: {self.get_stats()}")
+            for task in self.tasks:
+                task.cancel()
+            await asyncio.gather(*self.tasks, return_exceptions=True)
+            self.tasks = []
+
+        for sink in self.sinks:
+            sink.close()
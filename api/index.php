@@ -4,16 +4,20 @@
  * Arduino Nano 33 BLE Sense + Raspberry Pi + React + MySQL
  * 
  * Endpoints:
- * POST /api/sensor-data    - Guardar datos de sensores
+ * POST /api/sensor-data    - Guardar datos de sensores (una lectura o {"readings": [...]})
  * POST /api/fall-alert     - Guardar alerta de caída
+ * POST /api/rollups        - Guardar agregados (sensor_rollup) y combinar daily_stats
  * GET  /api/history        - Obtener datos históricos
  * GET  /api/stats          - Obtener estadísticas
+ *
+ * Los cuerpos POST pueden llegar comprimidos (Content-Encoding: gzip) y las
+ * respuestas se comprimen si el cliente envía Accept-Encoding: gzip.
  */
 
 header('Content-Type: application/json');
 header('Access-Control-Allow-Origin: *');
 header('Access-Control-Allow-Methods: GET, POST, OPTIONS');
-header('Access-Control-Allow-Headers: Content-Type, Authorization');
+header('Access-Control-Allow-Headers: Content-Type, Content-Encoding, Authorization');
 
 // Manejar preflight requests
 if ($_SERVER['REQUEST_METHOD'] === 'OPTIONS') {
@@ -21,6 +25,11 @@ if ($_SERVER['REQUEST_METHOD'] === 'OPTIONS') {
     exit();
 }
 
+// Comprimir la respuesta si el cliente lo admite (historial y estadísticas)
+if (extension_loaded('zlib') && !ini_get('zlib.output_compression')) {
+    ob_start('ob_gzhandler');
+}
+
 // Configuración de base de datos
 class DatabaseConfig {
     const HOST = 'localhost';
@@ -71,6 +80,10 @@ class FallDetectionAPI {
                 $this->saveFallAlert();
                 break;
                 
+            case 'POST /rollups':
+                $this->saveRollups();
+                break;
+                
             case 'GET /history':
                 $this->getHistory();
                 break;
@@ -104,18 +117,10 @@ class FallDetectionAPI {
             return;
         }
         
+        // Una lectura suelta o un lote {"readings": [...]} (api_client.py)
+        $readings = $input['readings'] ?? [$input];
+        
         try {
-            // Extraer datos del formato WebSocket
-            $deviceId = $input['device_id'] ?? 'unknown';
-            $userId = $input['user_id'] ?? null;
-            $timestamp = $input['timestamp'] ?? date('Y-m-d H:i:s');
-            $arduinoTimestamp = $input['arduino_timestamp'] ?? null;
-            
-            // Datos de sensores
-            $sensorData = $input['sensor_data'] ?? [];
-            $environment = $sensorData['environment'] ?? [];
-            $acceleration = $sensorData['acceleration'] ?? [];
-            
             $sql = "INSERT INTO sensor_data (
                 device_id, user_id, timestamp, arduino_timestamp,
                 acceleration_x, acceleration_y, acceleration_z, acceleration_magnitude,
@@ -130,36 +135,60 @@ class FallDetectionAPI {
                 :data_source
             )";
             
+            // Una sentencia preparada y una transacción para todo el lote
             $stmt = $this->pdo->prepare($sql);
-            $stmt->execute([
-                'device_id' => $deviceId,
-                'user_id' => $userId,
-                'timestamp' => $timestamp,
-                'arduino_timestamp' => $arduinoTimestamp,
-                'acc_x' => $acceleration['x'] ?? null,
-                'acc_y' => $acceleration['y'] ?? null,
-                'acc_z' => $acceleration['z'] ?? null,
-                'acc_mag' => $this->calculateMagnitude($acceleration),
-                'temperature' => $environment['temperature'],
-                'humidity' => $environment['humidity'],
-                'pressure' => $environment['pressure'],
-                'baseline' => $input['baseline_acceleration'] ?? null,
-                'current_accel' => $input['current_acceleration'] ?? null,
-                'system_active' => $input['system_active'] ?? true,
-                'fall_count' => $input['fall_count'] ?? 0,
-                'data_source' => $input['data_source'] ?? 'arduino'
-            ]);
+            $this->pdo->beginTransaction();
+            
+            $devices = [];
+            foreach ($readings as $reading) {
+                $deviceId = $reading['device_id'] ?? 'unknown';
+                $timestamp = $reading['timestamp'] ?? date('Y-m-d H:i:s');
+                
+                // Datos de sensores
+                $sensorData = $reading['sensor_data'] ?? [];
+                $environment = $sensorData['environment'] ?? [];
+                $acceleration = $sensorData['acceleration'] ?? [];
+                
+                $stmt->execute([
+                    'device_id' => $deviceId,
+                    'user_id' => $reading['user_id'] ?? null,
+                    'timestamp' => $timestamp,
+                    'arduino_timestamp' => $reading['arduino_timestamp'] ?? null,
+                    'acc_x' => $acceleration['x'] ?? null,
+                    'acc_y' => $acceleration['y'] ?? null,
+                    'acc_z' => $acceleration['z'] ?? null,
+                    'acc_mag' => $this->calculateMagnitude($acceleration),
+                    'temperature' => $environment['temperature'] ?? null,
+                    'humidity' => $environment['humidity'] ?? null,
+                    'pressure' => $environment['pressure'] ?? null,
+                    'baseline' => $reading['baseline_acceleration'] ?? null,
+                    'current_accel' => $reading['current_acceleration'] ?? null,
+                    'system_active' => $reading['system_active'] ?? true,
+                    'fall_count' => $reading['fall_count'] ?? 0,
+                    'data_source' => $reading['data_source'] ?? 'arduino'
+                ]);
+                $devices[$deviceId] = true;
+            }
+            $lastId = $this->pdo->lastInsertId();
+            
+            // Actualizar last_seen de cada dispositivo una sola vez por lote
+            foreach (array_keys($devices) as $deviceId) {
+                $this->updateDeviceLastSeen($deviceId);
+            }
             
-            // Actualizar last_seen del dispositivo
-            $this->updateDeviceLastSeen($deviceId);
+            $this->pdo->commit();
             
             $this->sendSuccess([
                 'message' => 'Datos de sensor guardados exitosamente',
-                'id' => $this->pdo->lastInsertId(),
+                'id' => $lastId,
+                'count' => count($readings),
                 'timestamp' => $timestamp
             ]);
             
         } catch (PDOException $e) {
+            if ($this->pdo->inTransaction()) {
+                $this->pdo->rollBack();
+            }
             $this->sendError(500, 'Error guardando datos: ' . $e->getMessage());
         }
     }
@@ -232,6 +261,153 @@ class FallDetectionAPI {
         }
     }
     
+    private function saveRollups() {
+        $input = $this->getJsonInput();
+        
+        if (!$input) {
+            $this->sendError(400, 'Datos JSON inválidos');
+            return;
+        }
+        
+        // Un bucket suelto o {"rollups": [...]}
+        $rollups = $input['rollups'] ?? [$input];
+        
+        try {
+            $this->pdo->beginTransaction();
+            
+            $devices = [];
+            $users = [];
+            foreach ($rollups as $rollup) {
+                $deviceId = $rollup['device_id'] ?? 'unknown';
+                if (!isset($devices[$deviceId])) {
+                    $this->ensureDevice($deviceId);
+                    $devices[$deviceId] = true;
+                }
+                $userId = $rollup['user_id'] ?? null;
+                if ($userId !== null && !isset($users[$userId])) {
+                    $this->ensureUser($userId);
+                    $users[$userId] = true;
+                }
+                $this->saveRollup($rollup);
+                
+                // Los buckets de 1 hora se combinan en la fila del día
+                if (($rollup['resolution'] ?? '') === '1h') {
+                    $this->mergeDailyStats($rollup);
+                }
+            }
+            
+            $this->pdo->commit();
+            
+            $this->sendSuccess([
+                'message' => 'Agregados guardados exitosamente',
+                'count' => count($rollups)
+            ]);
+            
+        } catch (PDOException $e) {
+            $this->pdo->rollBack();
+            $this->sendError(500, 'Error guardando agregados: ' . $e->getMessage());
+        }
+    }
+    
+    private function saveRollup($rollup) {
+        $metrics = $rollup['metrics'] ?? [];
+        $params = [
+            'device_id' => $rollup['device_id'] ?? 'unknown',
+            'user_id' => $rollup['user_id'] ?? null,
+            'resolution' => $rollup['resolution'],
+            'bucket_start' => $rollup['start'],
+            'bucket_end' => $rollup['end'],
+            'readings' => $rollup['readings'] ?? 0,
+            'falls' => $rollup['falls'] ?? 0,
+            'false_positives' => $rollup['false_positives'] ?? 0,
+            'uptime_minutes' => $rollup['minutes'] ?? 0
+        ];
+        foreach (['temperature', 'humidity', 'pressure', 'acceleration'] as $metric) {
+            $values = $metrics[$metric] ?? null;
+            $params[$metric . '_n'] = $values['n'] ?? 0;
+            $params['avg_' . $metric] = $values['mean'] ?? null;
+            $params['std_' . $metric] = $values['std'] ?? null;
+            $params['min_' . $metric] = $values['min'] ?? null;
+            $params['max_' . $metric] = $values['max'] ?? null;
+        }
+        $columns = array_keys($params);
+        
+        // Un bucket parcial (enviado al detener el proceso) se combina con el existente.
+        // Desviación y media combinadas antes de actualizar n (MySQL aplica en orden).
+        $updates = ["bucket_end = GREATEST(bucket_end, VALUES(bucket_end))"];
+        foreach (['readings', 'falls', 'false_positives', 'uptime_minutes'] as $counter) {
+            $updates[] = "$counter = $counter + VALUES($counter)";
+        }
+        foreach (['temperature', 'humidity', 'pressure', 'acceleration'] as $metric) {
+            $n = "{$metric}_n";
+            $avg = "avg_$metric";
+            $std = "std_$metric";
+            $total = "($n + VALUES($n))";
+            $mean = "(($avg * $n + VALUES($avg) * VALUES($n)) / $total)";
+            $updates[] = "$std = IF(VALUES($n) = 0, $std, IF($n = 0, VALUES($std), SQRT(GREATEST(
+                ($n * (POW($std, 2) + POW($avg, 2)) + VALUES($n) * (POW(VALUES($std), 2) + POW(VALUES($avg), 2)))
+                / $total - POW($mean, 2), 0))))";
+            $updates[] = "$avg = IF(VALUES($n) = 0, $avg, IF($n = 0, VALUES($avg), $mean))";
+            $updates[] = "min_$metric = COALESCE(LEAST(min_$metric, VALUES(min_$metric)), min_$metric, VALUES(min_$metric))";
+            $updates[] = "max_$metric = COALESCE(GREATEST(max_$metric, VALUES(max_$metric)), max_$metric, VALUES(max_$metric))";
+            $updates[] = "$n = $n + VALUES($n)";
+        }
+        
+        $sql = "INSERT INTO sensor_rollups (" . implode(', ', $columns) . ")
+                VALUES (:" . implode(', :', $columns) . ")
+                ON DUPLICATE KEY UPDATE " . implode(', ', $updates);
+        
+        $stmt = $this->pdo->prepare($sql);
+        $stmt->execute($params);
+    }
+    
+    private function mergeDailyStats($rollup) {
+        $metrics = $rollup['metrics'] ?? [];
+        $params = [
+            'device_id' => $rollup['device_id'] ?? 'unknown',
+            'user_id' => $rollup['user_id'] ?? null,
+            'date' => $rollup['date'] ?? substr($rollup['start'], 0, 10),
+            'total_readings' => $rollup['readings'] ?? 0,
+            'total_falls' => $rollup['falls'] ?? 0,
+            'false_positives' => $rollup['false_positives'] ?? 0,
+            'uptime_minutes' => $rollup['minutes'] ?? 0
+        ];
+        
+        // Cada media se pondera con las lecturas de su métrica ({metric}_n), no con
+        // total_readings: una métrica sin muestras en parte del día no se sesga.
+        // Las medias se actualizan antes que su n (MySQL aplica en orden).
+        $updates = [];
+        foreach (['temperature', 'humidity', 'pressure', 'acceleration'] as $metric) {
+            $values = $metrics[$metric] ?? null;
+            $avg = "avg_$metric";
+            $n = "{$metric}_n";
+            $params[$avg] = $values['mean'] ?? null;
+            $params[$n] = $params[$avg] === null ? 0 : ($values['n'] ?? 0);
+            $updates[] = "$avg = IF(VALUES($n) = 0, $avg, IF($n = 0 OR $avg IS NULL, VALUES($avg),
+                ($avg * $n + VALUES($avg) * VALUES($n)) / ($n + VALUES($n))))";
+            $updates[] = "$n = $n + VALUES($n)";
+            $max = "max_$metric";
+            $params[$max] = $values['max'] ?? null;
+            $updates[] = "$max = COALESCE(GREATEST($max, VALUES($max)), $max, VALUES($max))";
+            if ($metric !== 'acceleration') {
+                $min = "min_$metric";
+                $params[$min] = $values['min'] ?? null;
+                $updates[] = "$min = COALESCE(LEAST($min, VALUES($min)), $min, VALUES($min))";
+            }
+        }
+        foreach (['total_readings', 'total_falls', 'false_positives', 'uptime_minutes'] as $counter) {
+            $updates[] = "$counter = $counter + VALUES($counter)";
+        }
+        $columns = array_keys($params);
+        
+        $sql = "INSERT INTO daily_stats (" . implode(', ', $columns) . ")
+                VALUES (:" . implode(', :', $columns) . ")
+                ON DUPLICATE KEY UPDATE " . implode(', ', $updates);
+        
+        $stmt = $this->pdo->prepare($sql);
+        $stmt->execute($params);
+    }
+    
     private function getHistory() {
         $deviceId = $_GET['device_id'] ?? null;
         $userId = $_GET['user_id'] ?? null;
@@ -413,6 +589,21 @@ class FallDetectionAPI {
         $stmt->execute(['device_id' => $deviceId]);
     }
     
+    private function ensureDevice($deviceId) {
+        // Los agregados pueden llegar de dispositivos del gateway aún no registrados
+        $sql = "INSERT IGNORE INTO devices (device_id, device_name, status)
+                VALUES (:device_id, :device_name, 'online')";
+        $stmt = $this->pdo->prepare($sql);
+        $stmt->execute(['device_id' => $deviceId, 'device_name' => $deviceId]);
+    }
+    
+    private function ensureUser($userId) {
+        // daily_stats.user_id referencia a users: se registra el residente si no existe
+        $sql = "INSERT IGNORE INTO users (user_id, name) VALUES (:user_id, :name)";
+        $stmt = $this->pdo->prepare($sql);
+        $stmt->execute(['user_id' => $userId, 'name' => $userId]);
+    }
+    
     private function updateDeviceFallCount($deviceId) {
         // Se podría implementar un contador en la tabla devices si se desea
     }
@@ -430,6 +621,12 @@ class FallDetectionAPI {
     
     private function getJsonInput() {
         $input = file_get_contents('php://input');
+        if (($_SERVER['HTTP_CONTENT_ENCODING'] ?? '') === 'gzip') {
+            $input = gzdecode($input);
+            if ($input === false) {
+                return null;
+            }
+        }
         return json_decode($input, true);
     }
     
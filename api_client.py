@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Cliente HTTP compartido para la API REST PHP (api/index.php).
+
+Todas las peticiones salen por una sesión requests con un pool de conexiones
+keep-alive, así que solo la primera petición a cada host paga el TCP (y TLS)
+handshake. Los cuerpos JSON de más de GZIP_MIN_BYTES se envían comprimidos
+(Content-Encoding: gzip) y las lecturas se agrupan en lotes de hasta
+API_BATCH_SIZE por petición ({"readings": [...]} en POST /sensor-data).
+
+La interfaz async ejecuta las peticiones en un pool de hilos del mismo tamaño
+que el pool de conexiones, para usarla desde el bucle de eventos del BLE sin
+bloquearlo.
+
+Dependencias:
+pip install requests
+
+Uso:
+client = ApiClient("http://192.168.1.100/api")
+client.save_sensor_data([lectura1, lectura2, ...])
+stats = await client.run(client.fetch_stats, days=1)
+
+Autor: Tu nombre
+Fecha: Octubre 2025
+"""
+
+import asyncio
+import gzip
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from message_codec import dumps_bytes
+
+logger = logging.getLogger(__name__)
+
+API_URL = "http://localhost/api"  # Cambiar por la IP del PC con XAMPP
+API_TIMEOUT = 10             # Segundos por petición
+API_POOL_SIZE = 4            # Conexiones keep-alive (y peticiones async simultáneas)
+API_BATCH_SIZE = 200         # Lecturas por POST /sensor-data
+GZIP_MIN_BYTES = 1024        # Cuerpos más pequeños se envían sin comprimir
+GZIP_LEVEL = 5
+
+
+class ApiError(Exception):
+    """Respuesta de error de la API (status 0 si no hubo respuesta)"""
+
+    def __init__(self, status, message):
+        super().__init__(f"HTTP {status}: {message}" if status else message)
+        self.status = status
+
+
+def sensor_payload(message):
+    """Lectura en el formato de POST /sensor-data (igual que websocket-server.js)"""
+    sensor_data = message.get("sensor_data")
+    if sensor_data is None:
+        # Lecturas del sender serial: datos ambientales y del IMU en el nivel superior
+        sensor_data = {
+            "environment": {key: message.get(key) for key in ("temperature", "humidity", "pressure")},
+            "acceleration": message.get("acceleration") or {},
+            "gyroscope": message.get("gyroscope") or {}
+        }
+    return {
+        "device_id": message.get("device_id") or message.get("device_name") or "unknown",
+        "user_id": message.get("user_id"),
+        "timestamp": message.get("timestamp"),
+        "arduino_timestamp": message.get("arduino_timestamp"),
+        "sensor_data": sensor_data,
+        "baseline_acceleration": message.get("baseline_acceleration"),
+        "current_acceleration": message.get("current_acceleration"),
+        "system_active": message.get("system_active", True),
+        "fall_count": message.get("fall_count", 0),
+        "data_source": "simulator" if message.get("platform") == "Windows" else "arduino"
+    }
+
+
+class ApiClient:
+    """Cliente de la API con pool keep-alive, gzip y lotes"""
+
+    def __init__(self, base_url=API_URL, timeout=API_TIMEOUT, pool_size=API_POOL_SIZE,
+                 batch_size=API_BATCH_SIZE, gzip_min_bytes=GZIP_MIN_BYTES):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.batch_size = batch_size
+        self.gzip_min_bytes = gzip_min_bytes  # None para no comprimir nunca
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers.update({"Accept": "application/json", "Accept-Encoding": "gzip"})
+        self.executor = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix="api")
+        self.stats = {
+            "requests": 0, "errors": 0, "readings": 0, "bytes_raw": 0, "bytes_sent": 0,
+            "latency_total": 0.0, "latency_max": 0.0
+        }
+
+    def request(self, method, path, payload=None, params=None):
+        """Hace una petición y devuelve el campo data de la respuesta. Lanza ApiError"""
+        headers = {}
+        body = None
+        if payload is not None:
+            body = dumps_bytes(payload)
+            self.stats["bytes_raw"] += len(body)
+            headers["Content-Type"] = "application/json"
+            if self.gzip_min_bytes is not None and len(body) >= self.gzip_min_bytes:
+                body = gzip.compress(body, GZIP_LEVEL)
+                headers["Content-Encoding"] = "gzip"
+            self.stats["bytes_sent"] += len(body)
+
+        start = time.perf_counter()
+        try:
+            response = self.session.request(method, self.base_url + path, data=body, params=params,
+                                            headers=headers, timeout=self.timeout)
+        except requests.RequestException as e:
+            self.stats["errors"] += 1
+            raise ApiError(0, str(e)) from e
+        finally:
+            latency = time.perf_counter() - start
+            self.stats["requests"] += 1
+            self.stats["latency_total"] += latency
+            self.stats["latency_max"] = max(self.stats["latency_max"], latency)
+
+        try:
+            result = response.json()
+        except ValueError:
+            result = {}
+        if response.status_code >= 400 or not result.get("success", False):
+            self.stats["errors"] += 1
+            raise ApiError(response.status_code, result.get("error") or response.text[:200])
+        return result.get("data")
+
+    def save_sensor_data(self, readings):
+        """Guarda una lectura o una lista de lecturas (en lotes de batch_size por petición)"""
+        if isinstance(readings, dict):
+            readings = [readings]
+        saved = 0
+        for i in range(0, len(readings), self.batch_size):
+            chunk = [sensor_payload(message) for message in readings[i:i + self.batch_size]]
+            data = self.request("POST", "/sensor-data", chunk[0] if len(chunk) == 1 else {"readings": chunk})
+            saved += data.get("count", 1) if data else 0
+            self.stats["readings"] += len(chunk)
+        return saved
+
+    def save_fall_alert(self, alert):
+        payload = dict(alert)
+        payload["device_id"] = alert.get("device_id") or alert.get("device_name") or "unknown"
+        return self.request("POST", "/fall-alert", payload)
+
+    def fetch_history(self, device_id=None, user_id=None, hours=24, limit=100):
+        params = {"hours": hours, "limit": limit}
+        if device_id:
+            params["device_id"] = device_id
+        if user_id:
+            params["user_id"] = user_id
+        return self.request("GET", "/history", params=params)
+
+    def fetch_stats(self, device_id=None, days=7):
+        params = {"days": days}
+        if device_id:
+            params["device_id"] = device_id
+        return self.request("GET", "/stats", params=params)
+
+    async def run(self, method, *args, **kwargs):
+        """Ejecuta un método del cliente sin bloquear el bucle de eventos"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, lambda: method(*args, **kwargs))
+
+    def get_stats(self):
+        stats = dict(self.stats)
+        if stats["requests"]:
+            stats["avg_latency_ms"] = round(1000 * stats["latency_total"] / stats["requests"], 2)
+        stats["latency_max_ms"] = round(1000 * stats.pop("latency_max"), 2)
+        stats["latency_total"] = round(stats["latency_total"], 3)
+        if stats["bytes_raw"]:
+            stats["compression"] = round(stats["bytes_sent"] / stats["bytes_raw"], 3)
+        return stats
+
+    def close(self):
+        self.executor.shutdown(wait=False)
+        self.session.close()
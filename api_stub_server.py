@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Servidor local que imita la API REST PHP (api/index.php) para pruebas.
+
+Atiende los mismos endpoints y formatos de respuesta ({"success": true,
+"data": {...}}) guardando las filas en memoria, con HTTP/1.1 keep-alive,
+cuerpos gzip y lotes {"readings": [...]}. Sirve para probar api_client.py y
+los scripts de la Raspberry Pi sin XAMPP ni MySQL, y para los benchmarks.
+
+Uso:
+python3 api_stub_server.py --port 8000
+python3 api_stub_server.py --port 8000 --delay 0.005   # simular el coste de PHP + MySQL
+
+Autor: Tu nombre
+Fecha: Octubre 2025
+"""
+
+import gzip
+import logging
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from message_codec import dumps_bytes, loads
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+STUB_PORT = 8000
+
+
+class StubApiHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # Keep-alive como Apache
+    disable_nagle_algorithm = True  # Cabeceras y cuerpo van en escrituras separadas
+
+    def log_message(self, format, *args):
+        logger.debug(format % args)
+
+    def send_json(self, code, payload):
+        body = dumps_bytes(payload)
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        if "gzip" in self.headers.get("Accept-Encoding", "") and len(body) > 1024:
+            body = gzip.compress(body)
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def success(self, data):
+        self.send_json(200, {"success": True, "timestamp": datetime.now().isoformat(), "data": data})
+
+    def error(self, code, message):
+        self.send_json(code, {"success": False, "error": message, "timestamp": datetime.now().isoformat()})
+
+    def read_json(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if self.headers.get("Content-Encoding") == "gzip":
+            body = gzip.decompress(body)
+        return loads(body) if body else None
+
+    def route(self, method):
+        server = self.server
+        server.stats["requests"] += 1
+        if server.delay:
+            time.sleep(server.delay)
+        url = urlparse(self.path)
+        path = url.path.rstrip("/")
+        if path.startswith("/api"):
+            path = path[4:]
+        try:
+            payload = self.read_json() if method == "POST" else None
+        except (OSError, ValueError):
+            return self.error(400, "Datos JSON inválidos")
+        params = {key: values[0] for key, values in parse_qs(url.query).items()}
+
+        if method == "POST" and path == "/sensor-data":
+            if not payload:
+                return self.error(400, "Datos JSON inválidos")
+            readings = payload.get("readings") or [payload]
+            with server.lock:
+                server.tables["sensor_data"].extend(readings)
+                row_id = len(server.tables["sensor_data"])
+            return self.success({"message": "Datos de sensor guardados exitosamente", "id": row_id,
+                                 "count": len(readings)})
+        if method == "POST" and path == "/fall-alert":
+            if not payload:
+                return self.error(400, "Datos JSON inválidos")
+            with server.lock:
+                server.tables["fall_alerts"].append(payload)
+                row_id = len(server.tables["fall_alerts"])
+            return self.success({"message": "Alerta de caída guardada exitosamente",
+                                 "alert_id": payload.get("alert_id"), "id": row_id})
+        if method == "POST" and path == "/rollups":
+            rollups = (payload or {}).get("rollups") or [payload]
+            with server.lock:
+                server.tables["sensor_rollups"].extend(rollups)
+            return self.success({"message": "Agregados guardados exitosamente", "count": len(rollups)})
+        if method == "GET" and path == "/history":
+            limit = min(int(params.get("limit", 100)), 1000)
+            device_id = params.get("device_id")
+            with server.lock:
+                rows = [r for r in reversed(server.tables["sensor_data"])
+                        if not device_id or r.get("device_id") == device_id][:limit]
+            return self.success({"data": rows, "count": len(rows), "filters": params})
+        if method == "GET" and path == "/stats":
+            with server.lock:
+                readings = len(server.tables["sensor_data"])
+                alerts = len(server.tables["fall_alerts"])
+            return self.success({"sensor_stats": {"total_readings": readings},
+                                 "alert_stats": {"total_alerts": alerts},
+                                 "period_days": int(params.get("days", 7))})
+        return self.error(404, "Endpoint no encontrado")
+
+    def do_GET(self):
+        self.route("GET")
+
+    def do_POST(self):
+        self.route("POST")
+
+
+class StubApiServer(ThreadingHTTPServer):
+    """Servidor HTTP de la API simulada; start() lo ejecuta en un hilo"""
+
+    daemon_threads = True
+
+    def __init__(self, host="127.0.0.1", port=STUB_PORT, delay=0.0):
+        super().__init__((host, port), StubApiHandler)
+        self.delay = delay  # Segundos de trabajo simulado por petición
+        self.lock = threading.Lock()
+        self.tables = {"sensor_data": [], "fall_alerts": [], "sensor_rollups": []}
+        self.stats = {"requests": 0}
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/api"
+
+    def start(self):
+        self.thread = threading.Thread(target=self.serve_forever, name="api-stub", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="API REST simulada para pruebas locales")
+    parser.add_argument("--host", default="127.0.0.1", help="Dirección de escucha")
+    parser.add_argument("--port", type=int, default=STUB_PORT, help="Puerto HTTP")
+    parser.add_argument("--delay", type=float, default=0.0, help="Segundos de trabajo simulado por petición")
+    args = parser.parse_args()
+
+    server = StubApiServer(args.host, args.port, args.delay)
+    logger.info(f"API simulada en {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        logger.info(f"Peticiones atendidas: {server.stats['requests']}, "
+                    f"lecturas: {len(server.tables['sensor_data'])}, alertas: {len(server.tables['fall_alerts'])}")
+
+
+if __name__ == "__main__":
+    main()
@@ -18,6 +18,11 @@
   1. Ir a Herramientas -> Administrar Bibliotecas
   2. Buscar e instalar: Arduino_HTS221, Arduino_LPS22HB, Arduino_LSM9DS1
   
+  Modo streaming (STREAM_MODE = true):
+  - Envía el IMU a 100 Hz en líneas clave:valor con un contador de secuencia
+    (seq) y los sensores ambientales una vez por segundo
+  - Usar con: python3 raspberry_sensor_sender.py --stream --batch-size 50
+  
   Conexión:
   - Conectar Arduino Nano 33 BLE Sense al Raspberry Pi vía USB
   - El puerto serial aparecerá como /dev/ttyUSB0 o /dev/ttyACM0
@@ -41,13 +46,22 @@ float gx = 0, gy = 0, gz = 0;  // Giroscopio
 const unsigned long SEND_INTERVAL = 2000; // 2 segundos
 unsigned long lastSendTime = 0;
 
+// Modo streaming de alta frecuencia (ver serial_stream.py)
+const bool STREAM_MODE = false;
+const unsigned long STREAM_BAUD_RATE = 460800;
+const unsigned long STREAM_INTERVAL = 10;   // ms entre muestras IMU (100 Hz)
+const unsigned long ENV_INTERVAL = 1000;    // ms entre lecturas ambientales
+unsigned long lastStreamTime = 0;
+unsigned long lastEnvTime = 0;
+uint16_t streamSeq = 0;
+
 // LED integrado para indicar estado
 const int LED_PIN = LED_BUILTIN;
 bool ledState = false;
 
 void setup() {
   // Inicializar comunicación serial
-  Serial.begin(9600);
+  Serial.begin(STREAM_MODE ? STREAM_BAUD_RATE : 9600);
   while (!Serial); // Esperar a que se abra el puerto serial
   
   // Configurar LED
@@ -104,6 +118,11 @@ void setup() {
 void loop() {
   unsigned long currentTime = millis();
   
+  if (STREAM_MODE) {
+    streamSensorData(currentTime);
+    return;
+  }
+  
   // Verificar si es tiempo de enviar datos
   if (currentTime - lastSendTime >= SEND_INTERVAL) {
     
@@ -207,6 +226,53 @@ void sendSensorDataSimple() {
   */
 }
 
+void streamSensorData(unsigned long currentTime) {
+  // IMU a frecuencia fija; los sensores ambientales son lentos y van una vez por segundo
+  if (currentTime - lastStreamTime < STREAM_INTERVAL) {
+    return;
+  }
+  lastStreamTime = currentTime;
+  
+  if (IMU.accelerationAvailable()) {
+    IMU.readAcceleration(ax, ay, az);
+  }
+  if (IMU.gyroscopeAvailable()) {
+    IMU.readGyroscope(gx, gy, gz);
+  }
+  
+  Serial.print("seq:");
+  Serial.print(streamSeq++);
+  Serial.print(",ms:");
+  Serial.print(currentTime);
+  Serial.print(",acc_x:");
+  Serial.print(ax, 3);
+  Serial.print(",acc_y:");
+  Serial.print(ay, 3);
+  Serial.print(",acc_z:");
+  Serial.print(az, 3);
+  Serial.print(",gyro_x:");
+  Serial.print(gx, 2);
+  Serial.print(",gyro_y:");
+  Serial.print(gy, 2);
+  Serial.print(",gyro_z:");
+  Serial.print(gz, 2);
+  
+  if (currentTime - lastEnvTime >= ENV_INTERVAL) {
+    lastEnvTime = currentTime;
+    temperature = HTS.readTemperature();
+    humidity = HTS.readHumidity();
+    pressure = BARO.readPressure();
+    Serial.print(",temp:");
+    Serial.print(temperature, 2);
+    Serial.print(",hum:");
+    Serial.print(humidity, 2);
+    Serial.print(",press:");
+    Serial.print(pressure, 2);
+  }
+  
+  Serial.println();
+}
+
 // Función para debugging - mostrar datos en formato legible
 void printSensorDataDebug() {
   Serial.println("=== DATOS SENSORES ===");
@@ -15,6 +15,8 @@
   - Indicadores LED de estado
   - Monitoreo continuo de sensores
   - Protocolo BLE optimizado
+  - Tramas binarias versionadas (FALL, STATUS, IMU) que no se truncan;
+    formato documentado en ble_frames.py
   
   Dependencias:
   - ArduinoBLE
@@ -39,6 +41,48 @@ BLECharacteristic txChar(
   200  // Aumentamos el tamaño para mensajes más largos
 );
 
+// Formato de tramas (ver ble_frames.py en la Raspberry Pi)
+const bool USE_BINARY_FRAMES = true;  // false = solo mensajes JSON compactos
+const bool STREAM_IMU = false;        // Enviar muestras IMU crudas en tramas de 15 (necesario para --verify-falls)
+const uint8_t FRAME_MAGIC = 0xFD;
+const uint8_t FRAME_VERSION = 1;
+const uint8_t FRAME_FALL = 1;
+const uint8_t FRAME_STATUS = 2;
+const uint8_t FRAME_IMU = 3;
+const int MAX_IMU_SAMPLES = 15;       // (200 - 10) / 12
+const uint16_t IMU_SAMPLE_PERIOD = 50; // ms, igual que la pausa del loop
+
+struct __attribute__((packed)) FallFrame {
+  uint8_t magic, version, type;
+  uint32_t ts;
+  uint16_t fallCount;
+  uint8_t severity;   // 0 low, 1 medium, 2 high, 3 critical
+  float magnitude;
+  float acc[3];
+  float gyro[3];
+  float env[3];       // temp, hum, presión (NAN = sin dato)
+};
+
+struct __attribute__((packed)) StatusFrame {
+  uint8_t magic, version, type;
+  uint32_t ts;
+  uint8_t systemActive;
+  uint16_t fallCount;
+  float baseline;
+  float currentAccel;
+  float env[3];
+};
+
+struct __attribute__((packed)) ImuFrame {
+  uint8_t magic, version, type;
+  uint32_t ts;        // timestamp de la primera muestra
+  uint8_t count;
+  uint16_t periodMs;
+  int16_t samples[MAX_IMU_SAMPLES][6];  // acc en mg, gyro en 0.1 °/s
+};
+
+ImuFrame imuFrame;
+
 // Configuración de detección de caídas
 const float FALL_THRESHOLD = 2.5;    // Umbral de caída (ajustar según pruebas)
 const float HIGH_IMPACT_THRESHOLD = 3.5;  // Umbral de impacto alto
@@ -145,6 +189,10 @@ void loop() {
       // Leer datos de sensores
       readSensorData();
       
+      if (USE_BINARY_FRAMES && STREAM_IMU) {
+        addImuSample(currentTime);
+      }
+      
       // Detectar caídas
       checkForFall(currentTime);
       
@@ -262,6 +310,12 @@ void checkForFall(unsigned long currentTime) {
 }
 
 void sendFallAlert(float magnitude, String severity) {
+  if (USE_BINARY_FRAMES) {
+    sendFallFrame(magnitude, severity);
+    sendMessage("CAIDA");
+    return;
+  }
+  
   // Crear mensaje JSON compacto para alerta de caída
   String message = "{";
   message += "\"t\":\"FALL\","; // type abreviado
@@ -284,6 +338,11 @@ void sendFallAlert(float magnitude, String severity) {
 }
 
 void sendPeriodicData() {
+  if (USE_BINARY_FRAMES) {
+    sendStatusFrame();
+    return;
+  }
+  
   // Crear mensaje de estado compacto
   String message = "{";
   message += "\"t\":\"STATUS\","; // type
@@ -317,6 +376,80 @@ void sendMessage(String message) {
   }
 }
 
+void fillEnvironment(float env[3]) {
+  if (hasEnvironmentalSensors) {
+    env[0] = temperature;
+    env[1] = humidity;
+    env[2] = pressure;
+  } else {
+    env[0] = env[1] = env[2] = NAN;
+  }
+}
+
+void sendFallFrame(float magnitude, String severity) {
+  FallFrame frame;
+  frame.magic = FRAME_MAGIC;
+  frame.version = FRAME_VERSION;
+  frame.type = FRAME_FALL;
+  frame.ts = millis();
+  frame.fallCount = fallCount;
+  frame.severity = severity == "low" ? 0 : severity == "high" ? 2 : severity == "critical" ? 3 : 1;
+  frame.magnitude = magnitude;
+  frame.acc[0] = ax; frame.acc[1] = ay; frame.acc[2] = az;
+  frame.gyro[0] = gx; frame.gyro[1] = gy; frame.gyro[2] = gz;
+  fillEnvironment(frame.env);
+  
+  txChar.writeValue((uint8_t*)&frame, sizeof(frame));
+  Serial.print("Enviada trama FALL (");
+  Serial.print(sizeof(frame));
+  Serial.println(" bytes)");
+}
+
+void sendStatusFrame() {
+  StatusFrame frame;
+  frame.magic = FRAME_MAGIC;
+  frame.version = FRAME_VERSION;
+  frame.type = FRAME_STATUS;
+  frame.ts = millis();
+  frame.systemActive = systemActive ? 1 : 0;
+  frame.fallCount = fallCount;
+  frame.baseline = accelBaseline;
+  frame.currentAccel = sqrt(ax*ax + ay*ay + az*az);
+  fillEnvironment(frame.env);
+  
+  txChar.writeValue((uint8_t*)&frame, sizeof(frame));
+}
+
+int16_t clampInt16(float value) {
+  if (value > 32767) return 32767;
+  if (value < -32768) return -32768;
+  return (int16_t)value;
+}
+
+void addImuSample(unsigned long currentTime) {
+  // Acumula muestras y envía una trama IMU cuando se llena
+  if (imuFrame.count == 0) {
+    imuFrame.magic = FRAME_MAGIC;
+    imuFrame.version = FRAME_VERSION;
+    imuFrame.type = FRAME_IMU;
+    imuFrame.ts = currentTime;
+    imuFrame.periodMs = IMU_SAMPLE_PERIOD;
+  }
+  int16_t* sample = imuFrame.samples[imuFrame.count];
+  sample[0] = clampInt16(ax * 1000);
+  sample[1] = clampInt16(ay * 1000);
+  sample[2] = clampInt16(az * 1000);
+  sample[3] = clampInt16(gx * 10);
+  sample[4] = clampInt16(gy * 10);
+  sample[5] = clampInt16(gz * 10);
+  imuFrame.count++;
+  
+  if (imuFrame.count >= MAX_IMU_SAMPLES) {
+    txChar.writeValue((uint8_t*)&imuFrame, 10 + imuFrame.count * 12);
+    imuFrame.count = 0;
+  }
+}
+
 void updateStatusLED(unsigned long currentTime) {
   // Parpadear LED lentamente cuando está conectado y activo
   if (currentTime - lastLedBlink >= LED_BLINK_INTERVAL) {
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Benchmark del cliente de la API REST (api_client.py) contra el servidor simulado.
+
+Envía las mismas lecturas a POST /sensor-data por cuatro caminos y mide la
+latencia por petición y las lecturas/s:
+1. requests.post suelto por lectura (una conexión TCP nueva cada vez).
+2. ApiClient con pool keep-alive, una lectura por petición.
+3. ApiClient con pool, lotes de --batch-size lecturas y gzip.
+4. Lo mismo desde un bucle asyncio con --pool peticiones en paralelo.
+
+El servidor (api_stub_server.py) corre en el mismo proceso; con --delay se
+simula el trabajo de PHP + MySQL por petición. Para medir contra XAMPP real,
+usar --url http://IP/api.
+
+Uso:
+python3 benchmarks/bench_api_client.py --readings 2000
+python3 benchmarks/bench_api_client.py --delay 0.005
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+import requests
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from api_client import ApiClient, sensor_payload
+from api_stub_server import StubApiServer
+
+
+def readings(count):
+    return [{
+        "type": "system_status",
+        "timestamp": "2025-10-14T10:31:%02d.%03d" % (i // 1000 % 60, i % 1000),
+        "device_id": "AA:BB:CC:DD:EE:%02X" % (i % 7),
+        "user_id": "cliente123",
+        "baseline_acceleration": 1.0,
+        "current_acceleration": 1.0 + (i % 13) / 100,
+        "system_active": True,
+        "fall_count": 0,
+        "sensor_data": {"environment": {"temperature": 22.5, "humidity": 45.0, "pressure": 1013.2}}
+    } for i in range(count)]
+
+
+def report(name, count, elapsed, latencies, sent=None):
+    latencies = sorted(latencies)
+    p95 = latencies[int(0.95 * (len(latencies) - 1))]
+    sent_text = f"{sent / 1024:>9.0f}" if sent is not None else f"{'-':>9}"
+    print(f"{name:34}{len(latencies):>10}{elapsed:>9.2f}{count / elapsed:>11.0f}"
+          f"{1000 * statistics.mean(latencies):>9.2f}{1000 * p95:>9.2f}{sent_text}")
+
+
+def unpooled(url, batch):
+    latencies = []
+    start = time.perf_counter()
+    for message in batch:
+        t = time.perf_counter()
+        requests.post(f"{url}/sensor-data", json=sensor_payload(message), timeout=10).raise_for_status()
+        latencies.append(time.perf_counter() - t)
+    return time.perf_counter() - start, latencies
+
+
+def pooled(client, batch, batch_size):
+    latencies = []
+    start = time.perf_counter()
+    for i in range(0, len(batch), batch_size):
+        t = time.perf_counter()
+        client.save_sensor_data(batch[i:i + batch_size])
+        latencies.append(time.perf_counter() - t)
+    return time.perf_counter() - start, latencies
+
+
+async def pooled_async(client, batch, batch_size):
+    latencies = []
+
+    async def send(chunk):
+        t = time.perf_counter()
+        await client.run(client.save_sensor_data, chunk)
+        latencies.append(time.perf_counter() - t)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(send(batch[i:i + batch_size]) for i in range(0, len(batch), batch_size)))
+    return time.perf_counter() - start, latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del cliente de la API REST")
+    parser.add_argument("--readings", type=int, default=2000, help="Lecturas a enviar")
+    parser.add_argument("--batch-size", type=int, default=200, help="Lecturas por petición en modo lote")
+    parser.add_argument("--pool", type=int, default=4, help="Conexiones del pool (y peticiones async en paralelo)")
+    parser.add_argument("--delay", type=float, default=0.0, help="Trabajo simulado por petición en el servidor")
+    parser.add_argument("--url", help="URL de una API real en lugar del servidor simulado")
+    args = parser.parse_args()
+
+    server = None
+    url = args.url
+    if not url:
+        server = StubApiServer(port=0, delay=args.delay).start()
+        url = server.url
+    batch = readings(args.readings)
+
+    print(f"{args.readings} lecturas contra {url} (trabajo simulado: {1000 * args.delay:g} ms/petición)")
+    print(f"{'camino':34}{'peticiones':>10}{'s':>9}{'lect/s':>11}{'ms medio':>9}{'ms p95':>9}{'KB envío':>9}")
+
+    elapsed, latencies = unpooled(url, batch)
+    report("requests.post por lectura", len(batch), elapsed, latencies)
+
+    client = ApiClient(url, pool_size=args.pool, batch_size=1, gzip_min_bytes=None)
+    elapsed, latencies = pooled(client, batch, 1)
+    report("pool keep-alive, 1 por petición", len(batch), elapsed, latencies, client.stats["bytes_sent"])
+    client.close()
+
+    client = ApiClient(url, pool_size=args.pool, batch_size=args.batch_size)
+    elapsed, latencies = pooled(client, batch, args.batch_size)
+    report(f"pool + lotes de {args.batch_size} + gzip", len(batch), elapsed, latencies, client.stats["bytes_sent"])
+    print(f"  compresión: {client.stats['bytes_raw'] / 1024:.0f} KB -> {client.stats['bytes_sent'] / 1024:.0f} KB")
+    client.close()
+
+    client = ApiClient(url, pool_size=args.pool, batch_size=args.batch_size)
+    elapsed, latencies = asyncio.run(pooled_async(client, batch, max(1, args.batch_size // args.pool)))
+    report(f"async, {args.pool} en paralelo", len(batch), elapsed, latencies, client.stats["bytes_sent"])
+    client.close()
+
+    if server:
+        print(f"Lecturas recibidas por el servidor: {len(server.tables['sensor_data'])}")
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
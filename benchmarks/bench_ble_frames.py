@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Benchmark de las tramas BLE binarias (ble_frames.py) frente a los mensajes JSON.
+
+Compara, para FALL, STATUS y muestras IMU, el tamaño del payload que viaja por
+BLE y el coste de decodificación en la Raspberry Pi: el camino JSON hace
+decode().strip() + json.loads + extracción de campos (como process_json_message)
+y el binario decode_frame con struct.unpack_from sobre memoryview.
+
+Uso:
+python3 benchmarks/bench_ble_frames.py --iterations 100000
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from ble_frames import (MAX_IMU_SAMPLES, decode_frame, encode_fall_frame, encode_imu_frame,
+                        encode_status_frame)
+
+
+def json_fall():
+    """Mismo formato que sendFallAlert en arduino_fall_detector_enhanced.ino"""
+    return (
+        '{"t":"FALL","ts":123456789,"fc":12,"sev":"high","mag":3.87,'
+        '"acc":[1.23,-2.87,0.45],"gyro":[120.5,-85.2,33.1],"env":[22.5,45.1,1013.2]}'
+    ).encode()
+
+
+def json_status():
+    return (
+        '{"t":"STATUS","ts":123456789,"sa":1,"fc":12,"bl":1.01,"ca":0.98,'
+        '"env":[22.5,45.1,1013.2]}'
+    ).encode()
+
+
+def imu_samples():
+    return [tuple(round(random.uniform(-2, 2), 3) for _ in range(3)) +
+            tuple(round(random.uniform(-250, 250), 1) for _ in range(3))
+            for _ in range(MAX_IMU_SAMPLES)]
+
+
+def decode_json(data):
+    """Camino de texto actual: decodificar, comparar y extraer campos"""
+    msg = data.decode().strip()
+    if msg.startswith('{'):
+        json_data = json.loads(msg)
+        msg_type = json_data.get('t') or json_data.get('type')
+        if msg_type == "FALL":
+            return (json_data.get('ts'), json_data.get('fc'), json_data.get('sev'),
+                    json_data.get('mag'), json_data.get('acc', []), json_data.get('gyro', []),
+                    json_data.get('env', []))
+        if msg_type == "STATUS":
+            return (json_data.get('ts'), json_data.get('sa'), json_data.get('fc'),
+                    json_data.get('bl'), json_data.get('ca'), json_data.get('env', []))
+        if msg_type == "IMU":
+            return json_data.get('ts'), json_data.get('p'), json_data.get('s')
+    return None
+
+
+def measure(function, payload, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        function(payload)
+    return 1e6 * (time.perf_counter() - start) / iterations
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de tramas BLE binarias vs JSON")
+    parser.add_argument("--iterations", type=int, default=100000, help="Decodificaciones por caso")
+    args = parser.parse_args()
+
+    random.seed(1)
+    samples = imu_samples()
+    cases = [
+        ("FALL", json_fall(),
+         encode_fall_frame(123456789, 12, "high", 3.87, (1.23, -2.87, 0.45), (120.5, -85.2, 33.1),
+                           (22.5, 45.1, 1013.2))),
+        ("STATUS", json_status(),
+         encode_status_frame(123456789, True, 12, 1.01, 0.98, (22.5, 45.1, 1013.2))),
+        (f"IMU x{MAX_IMU_SAMPLES}",
+         json.dumps({"t": "IMU", "ts": 123456789, "p": 50, "s": [list(s) for s in samples]},
+                    separators=(",", ":")).encode(),
+         encode_imu_frame(123456789, 50, samples)),
+    ]
+
+    print(f"Iteraciones: {args.iterations}")
+    print(f"{'trama':12}{'JSON bytes':>12}{'bin bytes':>11}{'JSON µs':>10}{'bin µs':>9}{'speedup':>9}")
+    for name, json_payload, binary_payload in cases:
+        json_us = measure(decode_json, json_payload, args.iterations)
+        binary_us = measure(decode_frame, binary_payload, args.iterations)
+        truncated = " (truncado a 200 en el Arduino)" if len(json_payload) > 200 else ""
+        print(f"{name:12}{len(json_payload):>12}{len(binary_payload):>11}{json_us:>10.2f}"
+              f"{binary_us:>9.2f}{json_us / binary_us:>8.1f}x{truncated}")
+
+
+if __name__ == "__main__":
+    main()
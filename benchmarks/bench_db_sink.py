@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Benchmark de la ingesta en la base de datos (db_sink.py) sobre SQLite.
+
+Compara filas/s de sensor_data (con una alerta cada 1000 lecturas) en tres
+caminos:
+1. Conexión y commit por fila: lo que hace hoy la API PHP en cada POST.
+2. Conexión persistente y commit por fila.
+3. DatabaseSink: conexión persistente, executemany y una transacción por lote.
+
+El esquema es el mismo en los tres (SQLITE_SCHEMA de db_sink.py, con las
+columnas de database/fall_detection_schema.sql). Se mide sobre un archivo en
+disco para que el coste de cada commit sea real.
+
+Uso:
+python3 benchmarks/bench_db_sink.py --rows 20000
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from db_sink import (ALERT_COLUMNS, SENSOR_COLUMNS, SQLITE_SCHEMA, DatabaseSink, SqliteBackend,
+                     alert_row, insert_sql, sensor_row)
+
+DEVICES = ["AA:BB:CC:DD:EE:%02X" % i for i in range(7)]
+
+
+def messages(rows):
+    """Mensajes system_status y fall_alert como los que envía el gateway"""
+    result = []
+    for i in range(rows):
+        device = DEVICES[i % len(DEVICES)]
+        result.append({
+            "type": "system_status",
+            "timestamp": "2025-10-14T10:31:%02d.%06d" % (i // 1000 % 60, i % 1000),
+            "device_id": device,
+            "user_id": "cliente123",
+            "baseline_acceleration": 1.0,
+            "current_acceleration": round(random.uniform(0.9, 1.1), 3),
+            "system_active": True,
+            "fall_count": 0,
+            "sensor_data": {"environment": {"temperature": 22.5, "humidity": 45.0, "pressure": 1013.2}}
+        })
+        if i % 1000 == 999:
+            result.append({
+                "type": "fall_alert",
+                "alert_id": f"fall_{i}",
+                "device_id": device,
+                "user_id": "cliente123",
+                "severity": "high",
+                "magnitude": 3.4,
+                "sensor_data": {"acceleration": {"x": 2.1, "y": 2.0, "z": 1.6}}
+            })
+    return result
+
+
+def connect(path):
+    connection = sqlite3.connect(path)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA synchronous=NORMAL")
+    return connection
+
+
+def prepare(path):
+    connection = connect(path)
+    connection.executescript(SQLITE_SCHEMA)
+    connection.executemany("INSERT INTO devices (device_id, device_name) VALUES (?, ?)",
+                           [(d, d) for d in DEVICES])
+    connection.commit()
+    connection.close()
+
+
+def per_row(path, batch, reconnect):
+    sensor_sql = insert_sql("sensor_data", SENSOR_COLUMNS, "?")
+    alert_sql = insert_sql("fall_alerts", ALERT_COLUMNS, "?", "INSERT OR IGNORE")
+    connection = None if reconnect else connect(path)
+    start = time.perf_counter()
+    for message in batch:
+        if reconnect:
+            connection = connect(path)
+        if message["type"] == "fall_alert":
+            connection.execute(alert_sql, alert_row(message))
+        else:
+            connection.execute(sensor_sql, sensor_row(message))
+        connection.commit()
+        if reconnect:
+            connection.close()
+    if not reconnect:
+        connection.close()
+    return time.perf_counter() - start
+
+
+def sink(path, batch, batch_size):
+    db = DatabaseSink(SqliteBackend(path), batch_size=batch_size, queue_size=len(batch))
+    db.start()
+    start = time.perf_counter()
+    for message in batch:
+        db.add(message)
+    db.stop()
+    return time.perf_counter() - start, db.get_stats()
+
+
+def count(path):
+    connection = sqlite3.connect(path)
+    rows = sum(connection.execute(f"SELECT COUNT(*) FROM {t}").fetchone()[0] for t in ("sensor_data", "fall_alerts"))
+    connection.close()
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de la ingesta por lotes en SQLite")
+    parser.add_argument("--rows", type=int, default=20000, help="Lecturas a insertar")
+    parser.add_argument("--batch-size", type=int, default=500, help="Filas por lote del sink")
+    args = parser.parse_args()
+
+    batch = messages(args.rows)
+    print(f"{len(batch)} mensajes ({args.rows} lecturas) en SQLite (WAL, synchronous=NORMAL)")
+    print(f"{'camino':40}{'segundos':>10}{'filas/s':>12}")
+    with tempfile.TemporaryDirectory() as tmp:
+        cases = [
+            ("conexión + commit por fila (API PHP)", lambda p: per_row(p, batch, True)),
+            ("conexión persistente, commit por fila", lambda p: per_row(p, batch, False)),
+            (f"DatabaseSink (lotes de {args.batch_size})", lambda p: sink(p, batch, args.batch_size)[0]),
+        ]
+        for i, (name, run) in enumerate(cases):
+            path = os.path.join(tmp, f"case{i}.db")
+            prepare(path)
+            elapsed = run(path)
+            rows = count(path)
+            print(f"{name:40}{elapsed:>10.2f}{rows / elapsed:>12.0f}")
+
+        path = os.path.join(tmp, "stats.db")
+        prepare(path)
+        _, stats = sink(path, batch, args.batch_size)
+        print(f"Estadísticas del sink: {stats}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+"""
+Benchmark del motor de caídas de la Raspberry Pi (fall_engine.py).
+
+1. Precisión sobre escenarios sintéticos (o una grabación CSV): caídas reales
+   frente a actividades cotidianas que superan el umbral del Arduino (sentarse
+   de golpe, saltar, tropezar). Se compara la regla del Arduino (|a| > 2.5 g)
+   con el FALL verificado por el motor.
+2. Latencia por tick (todas las ventanas en un cálculo) y CPU estimada con 1, 7,
+   16 y 64 dispositivos. Ejecutarlo en la propia Raspberry Pi para obtener las
+   cifras de un núcleo de clase Pi.
+
+Formato de la grabación (--recording): CSV con columnas ax,ay,az,gx,gy,gz en g y
+°/s a la frecuencia del motor, y opcionalmente una columna label (1 en las
+muestras que pertenecen a una caída real).
+
+Uso:
+python3 benchmarks/bench_fall_engine.py --trials 200
+python3 benchmarks/bench_fall_engine.py --recording grabacion.csv
+"""
+
+import argparse
+import csv
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from fall_engine import FRAME_SAMPLES, IMPACT_G, SAMPLE_RATE, TICK_INTERVAL, FallEngine
+
+RATE = SAMPLE_RATE
+ARDUINO_COOLDOWN = int(3 * RATE)   # FALL_COOLDOWN del Arduino en muestras
+
+rng = np.random.default_rng(1)
+
+
+def samples(seconds):
+    return max(1, int(round(seconds * RATE)))
+
+
+def still(seconds, gravity=(0, 0, 1), noise=0.02):
+    n = samples(seconds)
+    acc = np.array(gravity, dtype=np.float32) + rng.normal(0, noise, (n, 3))
+    gyro = rng.normal(0, 2, (n, 3))
+    return np.hstack([acc, gyro]).astype(np.float32)
+
+
+def walking(seconds):
+    n = samples(seconds)
+    t = np.arange(n) / RATE
+    bounce = 0.3 * np.sin(2 * np.pi * 1.8 * t) + rng.normal(0, 0.1, n)
+    acc = np.column_stack([rng.normal(0, 0.15, n), rng.normal(0, 0.15, n), 1 + bounce])
+    gyro = rng.normal(0, 40, (n, 3))
+    return np.hstack([acc, gyro]).astype(np.float32)
+
+
+def segment(magnitude, gyro=150):
+    """Una muestra por cada magnitud de aceleración, en dirección aleatoria"""
+    magnitude = np.atleast_1d(magnitude).astype(np.float32)
+    n = len(magnitude)
+    direction = rng.normal(0, 1, (n, 3))
+    direction /= np.linalg.norm(direction, axis=1, keepdims=True)
+    acc = direction * magnitude[:, None]
+    return np.hstack([acc, rng.normal(0, gyro, (n, 3))]).astype(np.float32)
+
+
+def scenario(kind):
+    """Devuelve las muestras de un escenario y si es una caída real"""
+    if kind == "fall":
+        parts = [walking(1), segment(rng.uniform(0.1, 0.45, samples(rng.uniform(0.25, 0.5)))),
+                 segment(rng.uniform(3, 6), gyro=250), segment(rng.uniform(0.6, 1.6, samples(0.4))),
+                 still(3, gravity=(1, 0, 0), noise=0.03)]
+        return np.vstack(parts), True
+    if kind == "sit_hard":
+        parts = [walking(1), segment(rng.uniform(0.7, 0.9, samples(0.3))),
+                 segment(rng.uniform(2.6, 3.2)), still(3, gravity=(0.3, 0, 0.95))]
+    elif kind == "jump":
+        parts = [walking(1), segment(rng.uniform(0.05, 0.3, samples(0.3))),
+                 segment(rng.uniform(3, 4.5)), walking(3)]
+    elif kind == "stumble":
+        parts = [walking(1), segment(rng.uniform(2.6, 3.5)), walking(3)]
+    else:  # walk
+        parts = [walking(4)]
+    return np.vstack(parts), False
+
+
+def arduino_triggers(stream):
+    """Índices donde la regla del Arduino (|a| > IMPACT_G con enfriamiento) envía FALL"""
+    mag = np.linalg.norm(stream[:, :3], axis=1)
+    triggers = []
+    last = -ARDUINO_COOLDOWN
+    for i in np.flatnonzero(mag > IMPACT_G):
+        if i - last >= ARDUINO_COOLDOWN:
+            triggers.append(int(i))
+            last = i
+    return triggers
+
+
+def run_lanes(lanes, engine):
+    """
+    Alimenta cada carril (un dispositivo) en tramas de FRAME_SAMPLES y hace un tick
+    del motor cada TICK_INTERVAL de tiempo de muestra. Devuelve los eventos con el
+    índice de muestra en el que se produjeron
+    """
+    streams = [np.vstack(lane["streams"]) for lane in lanes]
+    triggers = [arduino_triggers(s) for s in streams]
+    tick_every = max(1, int(TICK_INTERVAL * RATE))
+    length = max(len(s) for s in streams)
+    events = []
+    fed = [0] * len(lanes)
+    next_tick = tick_every
+    for end in range(FRAME_SAMPLES, length + FRAME_SAMPLES, FRAME_SAMPLES):
+        for lane, stream in enumerate(streams):
+            chunk = stream[fed[lane]:end]
+            if not len(chunk):
+                continue
+            engine.add_samples(lane, chunk)
+            for trigger in triggers[lane]:
+                if fed[lane] <= trigger < fed[lane] + len(chunk):
+                    engine.verify(lane, {"sample": trigger})
+            fed[lane] += len(chunk)
+        while next_tick <= end:
+            for kind, lane, alert, _ in engine.tick():
+                sample = alert["sample"] if alert else fed[lane] - engine.settle_samples - engine.inactive_samples
+                events.append((kind, lane, sample))
+            next_tick += tick_every
+    for _ in range(int(engine.post_samples / tick_every) + 2):
+        for kind, lane, alert, _ in engine.tick():
+            sample = alert["sample"] if alert else fed[lane]
+            events.append((kind, lane, sample))
+    return events, triggers
+
+
+def accuracy(trials, devices):
+    kinds = ["fall", "sit_hard", "jump", "stumble", "walk"]
+    lanes = [{"streams": [still(2)], "trials": []} for _ in range(devices)]
+    offsets = [len(lane["streams"][0]) for lane in lanes]
+    for i in range(trials):
+        kind = kinds[i % len(kinds)]
+        lane = i % devices
+        stream, is_fall = scenario(kind)
+        lanes[lane]["trials"].append((offsets[lane], offsets[lane] + len(stream), kind))
+        lanes[lane]["streams"] += [stream, still(2)]
+        offsets[lane] += len(stream) + len(lanes[lane]["streams"][-1])
+
+    engine = FallEngine(max_devices=devices, verify_timeout=3600)
+    events, triggers = run_lanes(lanes, engine)
+
+    def trial_of(lane, sample):
+        for start, end, kind in lanes[lane]["trials"]:
+            if start <= sample < end:
+                return kind
+        return None
+
+    table = {kind: {"trials": 0, "arduino": 0, "confirmed": 0, "rejected": 0, "host": 0} for kind in kinds}
+    for lane in lanes:
+        for _, _, kind in lane["trials"]:
+            table[kind]["trials"] += 1
+    for lane, lane_triggers in enumerate(triggers):
+        for trigger in lane_triggers:
+            kind = trial_of(lane, trigger)
+            if kind:
+                table[kind]["arduino"] += 1
+    for kind, lane, sample in events:
+        trial = trial_of(lane, sample)
+        if trial is None:
+            continue
+        column = {"confirmed": "confirmed", "rejected": "rejected", "detected": "host"}.get(kind)
+        if column:
+            table[trial][column] += 1
+
+    print(f"Precisión sobre {trials} escenarios sintéticos en {devices} dispositivos a {RATE:g} Hz")
+    print(f"{'escenario':12}{'pruebas':>9}{'FALL Arduino':>14}{'confirmadas':>13}{'rechazadas':>12}{'solo Pi':>9}")
+    for kind, row in table.items():
+        print(f"{kind:12}{row['trials']:>9}{row['arduino']:>14}{row['confirmed']:>13}{row['rejected']:>12}{row['host']:>9}")
+    adl = [row for kind, row in table.items() if kind != "fall"]
+    adl_trials = sum(row["trials"] for row in adl)
+    falls = table["fall"]
+    print(f"Falsos positivos por actividad cotidiana: Arduino {sum(r['arduino'] for r in adl) / adl_trials:.1%}, "
+          f"verificado {sum(r['confirmed'] + r['host'] for r in adl) / adl_trials:.1%}")
+    print(f"Caídas detectadas: Arduino {falls['arduino'] / falls['trials']:.1%}, "
+          f"verificado {(falls['confirmed'] + falls['host']) / falls['trials']:.1%}")
+
+
+def recording(path):
+    with open(path) as f:
+        rows = list(csv.reader(f))
+    if rows and not rows[0][0].replace(".", "").replace("-", "").isdigit():
+        rows = rows[1:]
+    data = np.array([[float(v) for v in row[:6]] for row in rows], dtype=np.float32)
+    labels = np.array([int(float(row[6])) if len(row) > 6 else 0 for row in rows])
+
+    engine = FallEngine(max_devices=1, verify_timeout=3600)
+    events, triggers = run_lanes([{"streams": [data]}], engine)
+    detections = [sample for kind, _, sample in events if kind in ("confirmed", "detected")]
+    near_fall = [s for s in detections if labels[max(0, s - 5):s + 5].any()]
+    hours = len(data) / RATE / 3600
+    false_positives = len(detections) - len(near_fall)
+    arduino_fp = sum(1 for t in triggers[0] if not labels[max(0, t - 5):t + 5].any())
+    print(f"Grabación {path}: {len(data)} muestras ({hours * 60:.1f} min), caídas etiquetadas: "
+          f"{int((np.diff(np.r_[0, labels]) == 1).sum())}")
+    print(f"  FALL Arduino: {len(triggers[0])} ({arduino_fp} fuera de caídas)")
+    print(f"  Motor: {len(detections)} detecciones, {false_positives} falsos positivos "
+          f"({false_positives / hours if hours else 0:.2f}/hora)")
+
+
+def latency(device_counts, ticks):
+    print(f"Latencia por tick ({ticks} ticks, ventana de {FallEngine().window_size} muestras)")
+    print(f"{'dispositivos':>12}{'ms/tick':>10}{'máx ms':>9}{'CPU a 4 Hz':>12}")
+    for devices in device_counts:
+        engine = FallEngine(max_devices=devices)
+        for device in range(devices):
+            engine.add_samples(device, walking(engine.window_size / RATE))
+        cpu_start = time.process_time()
+        worst = 0.0
+        start = time.perf_counter()
+        for _ in range(ticks):
+            tick_start = time.perf_counter()
+            engine.detect(devices)
+            worst = max(worst, time.perf_counter() - tick_start)
+        elapsed = time.perf_counter() - start
+        cpu = time.process_time() - cpu_start
+        tick_ms = 1000 * elapsed / ticks
+        cpu_percent = 100 * (cpu / ticks) / TICK_INTERVAL
+        print(f"{devices:>12}{tick_ms:>10.3f}{1000 * worst:>9.3f}{cpu_percent:>11.2f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del motor de caídas de la Raspberry Pi")
+    parser.add_argument("--trials", type=int, default=200, help="Escenarios sintéticos")
+    parser.add_argument("--devices", type=int, default=7, help="Dispositivos simulados en paralelo")
+    parser.add_argument("--ticks", type=int, default=1000, help="Ticks para medir la latencia")
+    parser.add_argument("--recording", help="CSV grabado (ax,ay,az,gx,gy,gz[,label])")
+    args = parser.parse_args()
+
+    if args.recording:
+        recording(args.recording)
+    else:
+        accuracy(args.trials, args.devices)
+    latency((1, 7, 16, 64), args.ticks)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Benchmark del coste de CPU del logging en el camino caliente (log_config.py).
+
+Procesa notificaciones BLE (STATUS en JSON y en trama binaria) con el
+notification_handler del detector y lecturas con send_sensor_data del sender,
+escribiendo los logs en un archivo (como en la tarjeta SD de la Raspberry Pi) y
+con el canal WebSocket sustituido por ReplayChannel, con cada modo:
+
+  full  registros formateados y escritos en el momento (comportamiento anterior)
+  fast  QueueListener en otro hilo + muestreo de los logs por mensaje
+  off   sin logs INFO (nivel WARNING), como referencia del coste sin logging
+
+Para cada caso muestra µs de CPU por mensaje en el hilo que procesa (lo que
+retrasa la siguiente notificación) y en todo el proceso (incluido el hilo del
+listener, que en fast solo escribe los registros muestreados), además de las
+líneas escritas en el archivo.
+
+Uso:
+python3 benchmarks/bench_logging.py --messages 20000
+python3 benchmarks/bench_logging.py --log-file /home/pi/bench.log   # en la tarjeta SD
+"""
+
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from ble_frames import encode_status_frame
+from log_config import LOG_FORMAT, SAMPLE_LIMIT, SAMPLE_WINDOW, configure_logging
+from raspberry_fall_detection import FallDetectionSystem
+from raspberry_sensor_sender import SensorDataSender
+from stream_replay import ReplayChannel
+
+MODES = ("full", "fast", "off")
+STATUS_JSON = (b'{"t":"STATUS","ts":123456789,"sa":1,"fc":12,"bl":1.01,"ca":0.98,'
+               b'"env":[22.5,45.1,1013.2]}')
+SENSOR_LINE = "temp:25.5,hum:60.2,press:1013.2,acc_x:0.012,acc_y:-0.998,acc_z:0.034,gyro_x:1.22,gyro_y:-0.61,gyro_z:0.12"
+
+
+def run_now(coroutine):
+    """Ejecuta una corrutina que no se suspende sin pasar por el bucle de eventos"""
+    try:
+        coroutine.send(None)
+    except StopIteration:
+        return
+    raise RuntimeError("el handler se suspendió")
+
+
+def detector_calls(payload):
+    system = FallDetectionSystem(ws_url="ws://localhost:1", spool_dir=None, capture_dir=None)
+    system.channel = ReplayChannel()
+    return lambda i: run_now(system.notification_handler(None, bytearray(payload(i))))
+
+
+def sender_calls(level):
+    sender = SensorDataSender(spool_dir=None, rollups=False)
+    sender.channel = ReplayChannel()
+    reading = sender.parse_sensor_string(SENSOR_LINE)
+    if logging.getLogger().level <= logging.INFO:  # En off no se rebaja el nivel
+        logging.getLogger("raspberry_sensor_sender").setLevel(level)
+    return lambda i: sender.send_sensor_data(reading)
+
+
+CASES = {
+    "ble_status_json": lambda: detector_calls(lambda i: STATUS_JSON),
+    "ble_status_bin": lambda: detector_calls(
+        lambda i: encode_status_frame(i, 1, 12, 1.01, 0.98, (22.5, 45.1, 1013.2))),
+    "send_sensor_data": lambda: sender_calls(logging.NOTSET),
+    "send_sensor_data_debug": lambda: sender_calls(logging.DEBUG),
+}
+
+
+def count_lines(path):
+    with open(path, "rb") as f:
+        return sum(1 for _ in f)
+
+
+def run_case(make_calls, mode, count, log_file, sample):
+    """CPU por mensaje (hilo que procesa, proceso completo) y líneas escritas"""
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    handler = logging.FileHandler(log_file, mode="w")
+    handler.setFormatter(logging.Formatter(LOG_FORMAT))
+    root.addHandler(handler)
+    root.setLevel(logging.WARNING if mode == "off" else logging.INFO)
+
+    call = make_calls()
+    logs = configure_logging(mode, sample)
+    thread_start, process_start = time.thread_time(), time.process_time()
+    for i in range(count):
+        call(i)
+    thread_cpu = time.thread_time() - thread_start
+    if logs is not None:
+        logs.stop()  # Espera a que el listener escriba lo pendiente
+    process_cpu = time.process_time() - process_start
+
+    root.removeHandler(handler)
+    handler.close()
+    logging.getLogger("raspberry_sensor_sender").setLevel(logging.NOTSET)
+    return thread_cpu / count * 1e6, process_cpu / count * 1e6, count_lines(log_file)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CPU del logging por mensaje con cada modo")
+    parser.add_argument("--messages", type=int, default=20000, help="Mensajes por caso y modo")
+    parser.add_argument("--log-file", help="Archivo de log (por defecto uno temporal)")
+    parser.add_argument("--cases", default=",".join(CASES), help="Casos separados por comas")
+    args = parser.parse_args()
+
+    log_file = args.log_file or os.path.join(tempfile.mkdtemp(prefix="bench_logging_"), "bench.log")
+    sample = (SAMPLE_LIMIT, SAMPLE_WINDOW)
+    print(f"{args.messages} mensajes por caso, logs en {log_file}, muestreo {SAMPLE_LIMIT}/{SAMPLE_WINDOW:g}s")
+    print(f"{'caso':<24}{'modo':<6}{'µs hilo':>10}{'µs proceso':>12}{'líneas':>9}{'ahorro':>9}")
+    for name in args.cases.split(","):
+        full_cpu = None
+        for mode in MODES:
+            thread_us, process_us, lines = run_case(CASES[name], mode, args.messages, log_file, sample)
+            if full_cpu is None:
+                full_cpu = process_us
+            saving = f"{(1 - process_us / full_cpu) * 100:.0f}%" if mode != "full" else ""
+            print(f"{name:<24}{mode:<6}{thread_us:>10.1f}{process_us:>12.1f}{lines:>9}{saving:>9}")
+    if not args.log_file:
+        os.remove(log_file)
+        os.rmdir(os.path.dirname(log_file))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark del codec de mensajes (message_codec.py).
+
+Entrada: coste por mensaje FALL y STATUS del Arduino con el parseo anterior
+(doble .get por campo y dicts construidos a mano) frente a normalize_message.
+Salida: coste de serializar fall_alert y system_status con json.dumps +
+datetime.now().isoformat() frente a iso_now() + encode_message, y frente a una
+plantilla precompilada por forma de mensaje (descartada: no mejora al encoder C).
+
+Uso:
+python3 benchmarks/bench_message_codec.py --iterations 100000
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from message_codec import JSON_BACKEND, encode_message, iso_now, loads, normalize_message
+
+FALL_RAW = ('{"t":"FALL","ts":123456789,"fc":12,"sev":"high","mag":3.87,'
+            '"acc":[1.23,-2.87,0.45],"env":[22.5,45.1,1013.2]}')
+STATUS_RAW = ('{"t":"STATUS","ts":123456789,"sa":1,"fc":12,"bl":1.01,"ca":0.98,'
+              '"env":[22.5,45.1,1013.2]}')
+
+
+def legacy_parse(json_data):
+    """Parseo anterior de process_json_message"""
+    msg_type = json_data.get('t') or json_data.get('type')
+    if msg_type == "FALL" or msg_type == "FALL_ALERT":
+        severity = json_data.get('sev', json_data.get('severity', 'medium'))
+        magnitude = json_data.get('mag', json_data.get('magnitude', 0))
+        fall_count = json_data.get('fc', json_data.get('fall_count', 0))
+        timestamp = json_data.get('ts', json_data.get('timestamp', 0))
+        acc_data = json_data.get('acc', [0, 0, 0])
+        if not acc_data and 'acceleration' in json_data:
+            acc = json_data['acceleration']
+            acc_data = [acc.get('x', 0), acc.get('y', 0), acc.get('z', 0)]
+        env_data = json_data.get('env', [])
+        if not env_data and 'environment' in json_data:
+            env = json_data['environment']
+            env_data = [env.get('temperature', 0), env.get('humidity', 0), env.get('pressure', 0)]
+        return severity, magnitude, fall_count, timestamp, acc_data, env_data
+    if msg_type == "STATUS":
+        system_active = json_data.get('sa', json_data.get('system_active', True))
+        fall_count = json_data.get('fc', json_data.get('fall_count', 0))
+        baseline = json_data.get('bl', json_data.get('baseline', 1.0))
+        current_accel = json_data.get('ca', json_data.get('current_accel', 1.0))
+        timestamp = json_data.get('ts', json_data.get('timestamp', 0))
+        env_data = json_data.get('env', [])
+        if not env_data and 'environment' in json_data:
+            env = json_data['environment']
+            env_data = [env.get('temperature', 0), env.get('humidity', 0), env.get('pressure', 0)]
+        return system_active, fall_count, baseline, current_accel, timestamp, env_data
+    return None
+
+
+def fall_alert(timestamp):
+    """Misma forma que handle_detailed_fall"""
+    return {
+        "type": "fall_alert",
+        "timestamp": timestamp,
+        "arduino_timestamp": 123456789,
+        "alert_id": "fall_12_1729000000",
+        "severity": "high",
+        "magnitude": 3.87,
+        "location": "Sensor BLE",
+        "user_id": "cliente123",
+        "device_id": "Nano33BLE",
+        "fall_count": 12,
+        "device_status": "active",
+        "sensor_data": {
+            "acceleration": {"x": 1.23, "y": -2.87, "z": 0.45},
+            "gyroscope": None,
+            "environment": {"temperature": 22.5, "humidity": 45.1, "pressure": 1013.2}
+        }
+    }
+
+
+def system_status(timestamp):
+    """Misma forma que handle_status_update"""
+    return {
+        "type": "system_status",
+        "timestamp": timestamp,
+        "arduino_timestamp": 123456789,
+        "user_id": "cliente123",
+        "device_id": "Nano33BLE",
+        "system_active": True,
+        "fall_count": 12,
+        "baseline_acceleration": 1.01,
+        "current_acceleration": 0.98,
+        "sensor_data": {"environment": {"temperature": 22.5, "humidity": 45.1, "pressure": 1013.2}}
+    }
+
+
+class TemplateEncoder:
+    """Plantilla precompilada por forma de mensaje: solo se codifican los valores"""
+
+    def __init__(self):
+        self.encoder = json.JSONEncoder(separators=(",", ":")).encode
+        self.templates = {}
+
+    def encode(self, message):
+        shape = tuple(message)
+        template = self.templates.get(shape)
+        if template is None:
+            template = self.templates[shape] = "{" + ",".join(
+                json.dumps(key) + ":%s" for key in message
+            ) + "}"
+        return template % tuple([self.encoder(value) for value in message.values()])
+
+
+def measure(function, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        function()
+    return 1e6 * (time.perf_counter() - start) / iterations
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Microbenchmark del codec de mensajes")
+    parser.add_argument("--iterations", type=int, default=100000, help="Mensajes por caso")
+    args = parser.parse_args()
+    n = args.iterations
+
+    # Comprobar que ambos caminos producen lo mismo
+    assert json.loads(encode_message(fall_alert("x"))) == fall_alert("x")
+    assert json.loads(encode_message(system_status("x"))) == system_status("x")
+    template = TemplateEncoder()
+    assert json.loads(template.encode(fall_alert("x"))) == fall_alert("x")
+
+    print(f"Backend JSON: {JSON_BACKEND}, iteraciones: {n}")
+    print(f"{'caso':28}{'anterior µs':>13}{'codec µs':>10}{'speedup':>9}")
+    rows = [
+        ("FALL entrada", lambda: legacy_parse(json.loads(FALL_RAW)),
+         lambda: normalize_message(loads(FALL_RAW))),
+        ("STATUS entrada", lambda: legacy_parse(json.loads(STATUS_RAW)),
+         lambda: normalize_message(loads(STATUS_RAW))),
+        ("fall_alert salida", lambda: json.dumps(fall_alert(datetime.now().isoformat())),
+         lambda: encode_message(fall_alert(iso_now()))),
+        ("system_status salida", lambda: json.dumps(system_status(datetime.now().isoformat())),
+         lambda: encode_message(system_status(iso_now()))),
+        ("fall_alert plantilla", lambda: json.dumps(fall_alert(datetime.now().isoformat())),
+         lambda: template.encode(fall_alert(iso_now()))),
+    ]
+    for name, legacy, codec in rows:
+        legacy_us = measure(legacy, n)
+        codec_us = measure(codec, n)
+        print(f"{name:28}{legacy_us:>13.2f}{codec_us:>10.2f}{legacy_us / codec_us:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
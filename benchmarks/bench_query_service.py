@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+Benchmark del servicio de consultas con caché (query_service.py).
+
+1. Crea una base de datos sqlite temporal con el esquema de db_sink.py:
+   --devices dispositivos con una lectura cada --interval segundos durante
+   --days días y alguna alerta.
+2. Sin caché: las consultas de la API PHP (historial de un dispositivo,
+   estadísticas de 7 días de todos y de un dispositivo) directamente contra la
+   base de datos, como hace api/index.php en cada refresco.
+3. Carga inicial del servicio (historial y agregados por hora).
+4. Por HTTP con keep-alive: latencia de las mismas consultas cuando están en
+   caché (hit) y cuando un mensaje nuevo del dispositivo acaba de invalidarlas
+   (miss, recalculadas desde los agregados).
+5. Mezcla: un hilo mete --rate lecturas/s de dispositivos al azar mientras se
+   sondean las consultas de --dashboards dashboards (cada uno, su dispositivo);
+   tasa de aciertos y latencia.
+
+Uso:
+python3 benchmarks/bench_query_service.py
+python3 benchmarks/bench_query_service.py --devices 50 --days 14 --interval 5
+python3 benchmarks/bench_query_service.py --rate 200 --dashboards 20 --duration 10
+"""
+
+import argparse
+import http.client
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from db_sink import ALERT_COLUMNS, SENSOR_COLUMNS, SqliteBackend, alert_row, insert_sql, sensor_row
+from query_service import QueryServer, QueryService
+
+rng = random.Random(5)
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+def device_name(i):
+    return "AA:BB:CC:DD:EE:%02X" % i
+
+
+def reading(device, timestamp):
+    return {"type": "sensor_data", "device_id": device, "user_id": f"residente_{device[-2:]}",
+            "timestamp": timestamp.isoformat(),
+            "sensor_data": {"acceleration": {"x": rng.gauss(0, 0.1), "y": rng.gauss(-1, 0.1), "z": rng.gauss(0, 0.1)},
+                            "environment": {"temperature": rng.gauss(22, 1), "humidity": rng.gauss(45, 3),
+                                            "pressure": rng.gauss(1013, 2)}}}
+
+
+def create_database(path, devices, days, interval):
+    backend = SqliteBackend(path)
+    connection = backend.connect()
+    now = datetime.now()
+    steps = int(days * 86400 / interval)
+    sensor_sql = insert_sql("sensor_data", SENSOR_COLUMNS, "?")
+    start = time.perf_counter()
+    for step in range(0, steps, 1000):
+        rows = [sensor_row(reading(device_name(d), now - timedelta(seconds=s * interval)))
+                for s in range(step, min(steps, step + 1000)) for d in range(devices)]
+        connection.executemany(sensor_sql, rows)
+    alerts = [alert_row({"alert_id": f"bench_{i}", "device_id": device_name(i % devices),
+                         "timestamp": (now - timedelta(hours=rng.uniform(0, days * 24))).isoformat(),
+                         "severity": rng.choice(("high", "medium", "low"))}) for i in range(devices * days)]
+    connection.executemany(insert_sql("fall_alerts", ALERT_COLUMNS, "?"), alerts)
+    connection.executemany("INSERT OR IGNORE INTO devices (device_id, device_name) VALUES (?, ?)",
+                           [(device_name(d), f"Sensor {d}") for d in range(devices)])
+    connection.commit()
+    connection.close()
+    print(f"Base de datos: {steps * devices} lecturas y {len(alerts)} alertas en "
+          f"{time.perf_counter() - start:.1f}s ({os.path.getsize(path) / 1e6:.0f} MB)")
+
+
+def queries(device):
+    return (
+        ("historial", "/history", {"device_id": device, "hours": "24", "limit": "100"}),
+        ("stats todos", "/stats", {"days": "7"}),
+        ("stats disp.", "/stats", {"device_id": device, "days": "7"}),
+    )
+
+
+def url(path, params):
+    return "/api" + path + "?" + "&".join(f"{key}={value}" for key, value in params.items())
+
+
+def timed_get(connection, path):
+    start = time.perf_counter()
+    connection.request("GET", path)
+    connection.getresponse().read()
+    return time.perf_counter() - start
+
+
+def bench_database(service, device, repeats):
+    """Consultas de la API PHP directamente contra la base de datos"""
+    for label, path, params in queries(device):
+        fallback = service.endpoints[path](params)[3]
+        times = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            fallback()
+            times.append(time.perf_counter() - start)
+        print(f"{label:>12} {1000 * percentile(times, 0.5):>9.3f}ms {1000 * percentile(times, 0.99):>9.3f}ms")
+
+
+def bench_service(service, port, device, repeats):
+    connection = http.client.HTTPConnection("127.0.0.1", port)
+    message = reading(device, datetime.now())
+    for label, path, params in queries(device):
+        hits, misses = [], []
+        for _ in range(repeats):
+            service.add(message)
+            misses.append(timed_get(connection, url(path, params)))
+            hits.append(timed_get(connection, url(path, params)))
+        print(f"{label:>12} {1000 * percentile(hits, 0.5):>9.3f}ms {1000 * percentile(hits, 0.99):>9.3f}ms "
+              f"{1000 * percentile(misses, 0.5):>9.3f}ms {1000 * percentile(misses, 0.99):>9.3f}ms")
+    connection.close()
+
+
+def bench_mixed(service, port, devices, dashboards, rate, duration):
+    """Lecturas entrando a `rate` por segundo mientras los dashboards sondean"""
+    stop = threading.Event()
+
+    def producer():
+        sent = 0
+        start = time.monotonic()
+        while not stop.is_set():
+            service.add(reading(device_name(rng.randrange(devices)), datetime.now()))
+            sent += 1
+            delay = start + sent / rate - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+
+    thread = threading.Thread(target=producer, daemon=True)
+    before = service.get_stats()
+    thread.start()
+    connection = http.client.HTTPConnection("127.0.0.1", port)
+    paths = [url(path, params) for d in range(dashboards) for _, path, params in queries(device_name(d % devices))]
+    times = []
+    end = time.monotonic() + duration
+    while time.monotonic() < end:
+        for path in paths:
+            times.append(timed_get(connection, path))
+    stop.set()
+    thread.join()
+    connection.close()
+    after = service.get_stats()
+    hits = after["hits"] - before["hits"]
+    lookups = hits + after["misses"] - before["misses"]
+    print(f"Mezcla: {rate} lecturas/s, {dashboards} dashboards, {len(times) / duration:.0f} consultas/s, "
+          f"aciertos {100 * hits / lookups:.0f}%, p50 {1000 * percentile(times, 0.5):.3f} ms, "
+          f"p99 {1000 * percentile(times, 0.99):.3f} ms, {after['invalidations'] - before['invalidations']} "
+          f"invalidaciones")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del servicio de consultas con caché")
+    parser.add_argument("--devices", type=int, default=20, help="Dispositivos")
+    parser.add_argument("--days", type=int, default=7, help="Días de histórico")
+    parser.add_argument("--interval", type=float, default=30.0, help="Segundos entre lecturas de un dispositivo")
+    parser.add_argument("--repeats", type=int, default=200, help="Repeticiones por consulta")
+    parser.add_argument("--rate", type=int, default=100, help="Lecturas/s durante la mezcla")
+    parser.add_argument("--dashboards", type=int, default=10, help="Dashboards sondeando durante la mezcla")
+    parser.add_argument("--duration", type=float, default=5.0, help="Segundos de la mezcla")
+    args = parser.parse_args()
+
+    root = tempfile.mkdtemp(prefix="bench_query_")
+    try:
+        path = os.path.join(root, "bench.db")
+        create_database(path, args.devices, args.days, args.interval)
+        service = QueryService(SqliteBackend(path))
+        device = device_name(0)
+
+        print(f"\nSin caché (SQL de la API contra sqlite)\n{'consulta':>12} {'p50':>11} {'p99':>11}")
+        bench_database(service, device, max(10, args.repeats // 10))
+
+        start = time.perf_counter()
+        service.load()
+        print(f"\nCarga inicial del servicio: {time.perf_counter() - start:.2f}s")
+
+        server = QueryServer(service, 0, "127.0.0.1").start()
+        port = server.server_address[1]
+        print(f"\nServicio por HTTP\n{'consulta':>12} {'hit p50':>11} {'hit p99':>11} {'miss p50':>11} "
+              f"{'miss p99':>11}")
+        bench_service(service, port, device, args.repeats)
+        print()
+        bench_mixed(service, port, args.devices, args.dashboards, args.rate, args.duration)
+        server.stop()
+        service.close()
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
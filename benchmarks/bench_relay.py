@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""
+Benchmark de carga del servidor de retransmisión (ws_relay_server.py).
+
+Arranca el relay en un proceso aparte y, desde este proceso, conecta:
+- --producers productores (identify "raspberry"), cada uno con su dispositivo,
+  enviando sensor_data a --rate Hz con la marca de envío en el mensaje.
+- --dashboards dashboards (identify "react"): --wildcard sin suscripciones
+  (reciben todo y miden la latencia productor -> dashboard), --slow que nunca
+  leen el socket y el resto suscritos a --devices dispositivos al azar.
+
+Al terminar muestra mensajes enviados, entregas/s recibidas por los dashboards,
+latencia p50/p99 de los dashboards sin suscripciones (con --frame-rate incluye la
+espera hasta el siguiente frame), dashboards lentos desconectados, lo que el
+relay fusionó o descartó (desde su /metrics) y la CPU del proceso del relay.
+
+Con --url se mide un servidor ya en marcha (p. ej. node websocket-server.js),
+sin CPU ni métricas del servidor; websocket-server.js ignora las suscripciones,
+así que todos los dashboards reciben todo.
+
+Uso:
+python3 benchmarks/bench_relay.py --producers 1000 --dashboards 100 --rate 2
+python3 benchmarks/bench_relay.py --producers 2000 --dashboards 300 --duration 30
+python3 benchmarks/bench_relay.py --rate 10 --frame-rate 4   # último valor 4 veces por segundo
+python3 benchmarks/bench_relay.py --url ws://localhost:8080
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import resource
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+
+import websockets
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+
+from message_codec import dumps, loads
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+def device_name(i):
+    return "AA:BB:%02X:%02X:%02X:%02X" % (i >> 24 & 0xFF, i >> 16 & 0xFF, i >> 8 & 0xFF, i & 0xFF)
+
+
+def scrape_metrics(port):
+    """Valores relay_* del endpoint /metrics del relay"""
+    values = {}
+    with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics", timeout=5) as response:
+        for line in response.read().decode().splitlines():
+            if line.startswith("relay_"):
+                name, _, value = line.partition(" ")
+                values[name] = float(value)
+    return values
+
+
+async def connect_all(url, count, on_connect, batch=100):
+    """Conecta por tandas para no saturar el backlog de accept del servidor"""
+    connections = []
+    for start in range(0, count, batch):
+        connections += await asyncio.gather(*(on_connect(url, i) for i in range(start, min(count, start + batch))))
+    return connections
+
+
+async def open_producer(url, i):
+    ws = await websockets.connect(url, max_queue=None)
+    await ws.send(dumps({"type": "identify", "client": "raspberry", "device": device_name(i)}))
+    return ws
+
+
+async def run_producer(ws, i, rate, deadline, counter):
+    await asyncio.sleep(random.random() / rate)  # Repartir los envíos dentro de cada periodo
+    interval = 1.0 / rate
+    next_send = time.perf_counter()
+    message = {"type": "sensor_data", "device_id": device_name(i), "timestamp": "", "sent": 0.0,
+               "temperature": 22.5, "humidity": 45.1, "pressure": 1013.2,
+               "acceleration": {"x": 0.01, "y": -0.99, "z": 0.03}, "gyroscope": {"x": 1.2, "y": -0.6, "z": 0.1}}
+    while next_send < deadline:
+        message["sent"] = time.perf_counter()
+        message["timestamp"] = time.strftime("%Y-%m-%dT%H:%M:%S")
+        await ws.send(dumps(message))
+        counter[0] += 1
+        next_send += interval
+        await asyncio.sleep(max(0.0, next_send - time.perf_counter()))
+
+
+async def run_dashboard(ws, stats, latencies):
+    try:
+        async for raw in ws:
+            stats["received"] += 1
+            stats["bytes"] += len(raw)
+            if latencies is not None:
+                message = loads(raw)
+                if message.get("type") == "sensor_data":
+                    latencies.append(time.perf_counter() - message["sent"])
+    except websockets.ConnectionClosed:
+        pass
+
+
+async def run_load(args, url):
+    devices = [device_name(i) for i in range(args.producers)]
+    subscribed = args.dashboards - args.wildcard - args.slow
+
+    async def open_dashboard(url, i):
+        ws = await websockets.connect(url, max_size=None)
+        identify = {"type": "identify", "client": "react", "frame_rate": args.frame_rate}
+        if args.wildcard <= i < args.wildcard + subscribed:
+            identify["devices"] = random.sample(devices, min(args.devices, len(devices)))
+        await ws.send(dumps(identify))
+        return ws
+
+    dashboards = await connect_all(url, args.dashboards, open_dashboard)
+    producers = await connect_all(url, args.producers, open_producer)
+    print(f"Conectados {len(producers)} productores y {len(dashboards)} dashboards "
+          f"({args.wildcard} sin suscripciones, {subscribed} con {args.devices} dispositivos, {args.slow} lentos)")
+
+    stats = {"received": 0, "bytes": 0}
+    latencies = []
+    readers = [
+        asyncio.create_task(run_dashboard(ws, stats, latencies if i < args.wildcard else None))
+        for i, ws in enumerate(dashboards[:args.wildcard + subscribed])
+    ]
+    # Los args.slow últimos nunca leen: el relay debe desconectarlos (con la lectura
+    # pausada el cliente no ve el cierre, se cuenta desde las métricas del relay)
+
+    await asyncio.sleep(0.5)  # Mensajes de conexión e historial fuera de la medida
+    stats["received"] = stats["bytes"] = 0
+    sent = [0]
+    start = time.perf_counter()
+    deadline = start + args.duration
+    await asyncio.gather(*(run_producer(ws, i, args.rate, deadline, sent) for i, ws in enumerate(producers)))
+    elapsed = time.perf_counter() - start
+    await asyncio.sleep(1.0)  # Dejar llegar lo que queda en vuelo
+    received, received_bytes = stats["received"], stats["bytes"]
+
+    for task in readers:
+        task.cancel()
+    for ws in producers + dashboards:
+        ws.transport.abort()
+    return sent[0], received, received_bytes, elapsed, latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de carga del relay WebSocket")
+    parser.add_argument("--producers", type=int, default=1000, help="Conexiones productoras")
+    parser.add_argument("--dashboards", type=int, default=100, help="Conexiones de dashboard")
+    parser.add_argument("--wildcard", type=int, default=5, help="Dashboards sin suscripciones (miden la latencia)")
+    parser.add_argument("--slow", type=int, default=3, help="Dashboards que nunca leen")
+    parser.add_argument("--devices", type=int, default=10, help="Dispositivos por dashboard suscrito")
+    parser.add_argument("--rate", type=float, default=2.0, help="Mensajes por segundo de cada productor")
+    parser.add_argument("--duration", type=float, default=10.0, help="Segundos de carga")
+    parser.add_argument("--frame-rate", type=float, default=0.0,
+                        help="frame_rate que piden los dashboards (0 = cada lectura)")
+    parser.add_argument("--slow-timeout", type=float, default=2.0, help="--slow-timeout del relay")
+    parser.add_argument("--url", help="Medir un servidor ya en marcha en lugar de arrancar ws_relay_server.py")
+    args = parser.parse_args()
+
+    # Cada conexión ocupa un descriptor aquí y otro en el relay
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    needed = 2 * (args.producers + args.dashboards) + 100
+    if soft < needed:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (min(needed, hard), hard))
+
+    relay = None
+    metrics_port = None
+    url = args.url
+    if not url:
+        port = free_port()
+        metrics_port = free_port()
+        relay = subprocess.Popen(
+            [sys.executable, os.path.join(ROOT, "ws_relay_server.py"), "--host", "127.0.0.1", "--port", str(port),
+             "--metrics-port", str(metrics_port), "--slow-timeout", str(args.slow_timeout),
+             "--log-mode", "fast", "--stats-interval", "3600"],
+            stderr=subprocess.DEVNULL
+        )
+        url = f"ws://127.0.0.1:{port}"
+        time.sleep(1.0)
+
+    try:
+        sent, received, received_bytes, elapsed, latencies = asyncio.run(run_load(args, url))
+        server = scrape_metrics(metrics_port) if metrics_port else {}
+    finally:
+        if relay is not None:
+            relay.terminate()
+            relay.wait()
+
+    print(f"Enviados: {sent} mensajes en {elapsed:.1f}s ({sent / elapsed:.0f} msg/s)")
+    readers = max(1, args.dashboards - args.slow)
+    print(f"Recibidos por los dashboards: {received} ({received / elapsed:.0f} entregas/s, "
+          f"{received_bytes / elapsed / readers / 1024:.1f} KB/s por dashboard)")
+    print(f"Latencia productor -> dashboard: p50 {1000 * percentile(latencies, 0.50):.1f} ms, "
+          f"p99 {1000 * percentile(latencies, 0.99):.1f} ms ({len(latencies)} muestras)")
+    if server:
+        print(f"Dashboards lentos desconectados: {server.get('relay_slow_disconnects_total', 0):.0f}/{args.slow}")
+        print(f"Relay: recibidos {server.get('relay_received_total', 0):.0f}, "
+              f"fusionados {server.get('relay_coalesced_total', 0):.0f}, "
+              f"descartados {server.get('relay_dropped_total', 0):.0f}")
+    if relay is not None:
+        usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+        cpu = usage.ru_utime + usage.ru_stime
+        print(f"CPU del relay: {cpu:.1f}s ({100 * cpu / elapsed:.0f}% de un núcleo durante la carga, "
+              f"{1e6 * cpu / max(1, sent):.0f} µs por mensaje, incluidos arranque y conexiones)")
+
+
+if __name__ == "__main__":
+    main()
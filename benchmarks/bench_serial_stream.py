@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Benchmark del lector serial en streaming (serial_stream.py).
+
+1. Coste de parseo por línea: readline + split(',')/split(':') de
+   parse_sensor_string frente a LineFramer + parse_block en bloques.
+2. Prueba en vivo sobre un puerto serial en bucle (pyserial "loop://"): un hilo
+   escribe líneas con contador seq a la frecuencia indicada y SerialStreamReader
+   las lee; se informa de la frecuencia sostenida y la tasa de pérdidas.
+3. Capacidad teórica del enlace a distintas velocidades en baudios.
+
+Uso:
+python3 benchmarks/bench_serial_stream.py --rate 200 --seconds 5
+"""
+
+import argparse
+import io
+import os
+import random
+import sys
+import threading
+import time
+
+import serial
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from serial_stream import READ_TIMEOUT, LineFramer, SerialStreamReader, parse_block
+
+
+def stream_line(seq, with_env=False):
+    """Misma línea que streamSensorData en arduino_ble_sense_reader.ino"""
+    line = (f"seq:{seq % 65536},ms:{seq * 10},acc_x:{random.uniform(-2, 2):.3f},"
+            f"acc_y:{random.uniform(-2, 2):.3f},acc_z:{random.uniform(-2, 2):.3f},"
+            f"gyro_x:{random.uniform(-250, 250):.2f},gyro_y:{random.uniform(-250, 250):.2f},"
+            f"gyro_z:{random.uniform(-250, 250):.2f}")
+    if with_env:
+        line += f",temp:{random.uniform(15, 35):.2f},hum:{random.uniform(20, 80):.2f},press:1013.25"
+    return line + "\r\n"
+
+
+def legacy_parse(data_string):
+    """parse_sensor_string anterior"""
+    data = {}
+    for pair in data_string.split(','):
+        key, value = pair.split(':')
+        data[key.strip()] = float(value.strip())
+    return {
+        "temperature": data.get("temp"),
+        "humidity": data.get("hum"),
+        "pressure": data.get("press"),
+        "acceleration": {"x": data.get("acc_x", 0), "y": data.get("acc_y", 0), "z": data.get("acc_z", 0)},
+        "gyroscope": {"x": data.get("gyro_x", 0), "y": data.get("gyro_y", 0), "z": data.get("gyro_z", 0)}
+    }
+
+
+def bench_parse(lines):
+    payload = "".join(lines).encode()
+
+    # Línea a línea, como read_sensor_data
+    stream = io.BytesIO(payload)
+    start = time.perf_counter()
+    for raw in iter(stream.readline, b""):
+        legacy_parse(raw.decode('utf-8').strip())
+    legacy_us = 1e6 * (time.perf_counter() - start) / len(lines)
+
+    # En bloques de 4 KiB con framing incremental
+    framer = LineFramer()
+    parsed = 0
+    start = time.perf_counter()
+    for offset in range(0, len(payload), 4096):
+        block = framer.feed(payload[offset:offset + 4096])
+        if block:
+            parsed += len(parse_block(block)[0])
+    block = framer.feed(b"\n")
+    if block:
+        parsed += len(parse_block(block)[0])
+    stream_us = 1e6 * (time.perf_counter() - start) / len(lines)
+    assert parsed == len(lines)
+    return legacy_us, stream_us
+
+
+def bench_live(rate, seconds):
+    port = serial.serial_for_url("loop://", timeout=READ_TIMEOUT)
+    reader = SerialStreamReader("loop://", serial_connection=port)
+    reader.start()
+
+    total = int(rate * seconds)
+    received = 0
+
+    def writer():
+        start = time.perf_counter()
+        for seq in range(total):
+            port.write(stream_line(seq, seq % int(rate) == 0).encode())
+            delay = start + (seq + 1) / rate - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+
+    thread = threading.Thread(target=writer)
+    start = time.perf_counter()
+    thread.start()
+    while thread.is_alive() or received < total:
+        readings = reader.get_readings(timeout=0.2)
+        if not readings and not thread.is_alive():
+            break
+        received += len(readings)
+    elapsed = time.perf_counter() - start
+    reader.stop()
+    return received, total, elapsed, reader.get_stats()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del lector serial en streaming")
+    parser.add_argument("--rate", type=float, default=200.0, help="Líneas por segundo en la prueba en vivo")
+    parser.add_argument("--seconds", type=float, default=5.0, help="Duración de la prueba en vivo")
+    parser.add_argument("--lines", type=int, default=50000, help="Líneas para el benchmark de parseo")
+    args = parser.parse_args()
+
+    random.seed(1)
+    lines = [stream_line(seq, seq % 100 == 0) for seq in range(args.lines)]
+    line_bytes = sum(len(line) for line in lines) / len(lines)
+
+    legacy_us, stream_us = bench_parse(lines)
+    print(f"Parseo ({args.lines} líneas, {line_bytes:.0f} bytes/línea)")
+    print(f"  readline + split:        {legacy_us:6.2f} µs/línea ({1e6 / legacy_us:,.0f} líneas/s)")
+    print(f"  LineFramer + parse_block: {stream_us:5.2f} µs/línea ({1e6 / stream_us:,.0f} líneas/s)")
+
+    received, total, elapsed, stats = bench_live(args.rate, args.seconds)
+    print(f"Streaming en vivo (loop://) a {args.rate:g} Hz durante {args.seconds:g}s")
+    print(f"  recibidas {received}/{total} en {elapsed:.2f}s ({received / elapsed:.1f} Hz), "
+          f"perdidas seq: {stats['lost']}, descartadas cola: {stats['dropped']}, "
+          f"tasa de pérdida: {stats.get('drop_rate', 0):.4%}, lecturas del puerto: {stats['reads']}")
+
+    print("Capacidad del enlace (10 bits por byte)")
+    for baud in (9600, 115200, 460800, 921600):
+        print(f"  {baud:>7} baudios: {baud / 10 / line_bytes:8.1f} líneas/s")
+
+
+if __name__ == "__main__":
+    main()
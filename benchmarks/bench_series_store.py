@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Benchmark del almacén local de series (series_store.py).
+
+1. Ingesta trama a trama: tramas IMU de 15 muestras por append_imu(), como las
+   escribe el detector (incluye la conversión del reloj del Arduino).
+2. Ingesta masiva: --days días de IMU a --rate Hz y ambiente a 1 Hz por
+   dispositivo, en bloques de un minuto, con marcas de tiempo que terminan ahora.
+3. Consultas de rangos al azar (1 s, 1 min, 1 h, 1 día) sobre todo el histórico:
+   latencia de read() (vistas sobre el mapa, sin copiar) y de read() más un
+   cálculo que recorre los datos (|a| medio). Las páginas están en la caché del
+   sistema (recién escritas); en frío manda la tarjeta SD.
+4. Reapertura del almacén (índice de trozos) y retención por edad a la mitad.
+
+Uso:
+python3 benchmarks/bench_series_store.py
+python3 benchmarks/bench_series_store.py --days 28 --devices 2 --dir /mnt/usb/bench_series
+python3 benchmarks/bench_series_store.py --days 1 --keep
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from ble_frames import MAX_IMU_SAMPLES
+from series_store import SeriesStore
+
+QUERY_WINDOWS = (("1 s", 1), ("1 min", 60), ("1 h", 3600), ("1 día", 86400))
+BLOCK_SECONDS = 60
+
+rng = np.random.default_rng(3)
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+def device_name(i):
+    return "AA:BB:CC:DD:EE:%02X" % i
+
+
+def imu_block(rows):
+    """Muestras int16 con forma de marcha (mg y 0.1 °/s)"""
+    t = np.arange(rows) / 100.0
+    block = np.empty((rows, 6), dtype=np.int16)
+    block[:, 0] = 150 * np.sin(2 * np.pi * 1.8 * t)
+    block[:, 1] = -1000 + 200 * np.sin(2 * np.pi * 3.6 * t)
+    block[:, 2] = 50 * np.cos(2 * np.pi * 1.8 * t)
+    block[:, 3:] = rng.normal(0, 50, (rows, 3))
+    return block
+
+
+def bench_frames(store, frames):
+    """Tramas de 15 muestras por append_imu() (camino del detector)"""
+    block = imu_block(frames * MAX_IMU_SAMPLES)
+    raw = memoryview(block.reshape(-1)).cast("B").cast("h")
+    step = MAX_IMU_SAMPLES * 6
+    start = time.perf_counter()
+    for frame in range(frames):
+        store.append_imu("frames", frame * MAX_IMU_SAMPLES * 10, 10, raw[frame * step:(frame + 1) * step])
+    elapsed = time.perf_counter() - start
+    print(f"Trama a trama: {frames / elapsed:.0f} tramas/s ({1e6 * elapsed / frames:.1f} µs por trama, "
+          f"{frames * MAX_IMU_SAMPLES / elapsed / 1e6:.2f} M muestras/s)")
+
+
+def bench_bulk(store, devices, days, rate):
+    """Histórico de days días que termina ahora, en bloques de un minuto"""
+    rows = int(rate * BLOCK_SECONDS)
+    block = imu_block(rows)
+    env = np.array([[22.5, 45.0, 1013.2]], dtype=np.float32).repeat(BLOCK_SECONDS, axis=0)
+    step = 1000.0 / rate
+    end_ms = int(time.time() * 1000)
+    first_ms = end_ms - int(days * 86400000)
+    blocks = int(days * 86400 / BLOCK_SECONDS)
+    offsets = (np.arange(rows) * step).astype(np.int64)
+    env_offsets = np.arange(BLOCK_SECONDS, dtype=np.int64) * 1000
+    start = time.perf_counter()
+    for b in range(blocks):
+        block_ms = first_ms + b * BLOCK_SECONDS * 1000
+        for d in range(devices):
+            store.append(device_name(d), "imu", block_ms + offsets, block)
+            store.append(device_name(d), "env", block_ms + env_offsets, env)
+        if b and b % (blocks // 10 or 1) == 0:
+            print(f"  {100 * b / blocks:.0f}%  ({time.perf_counter() - start:.0f}s)", flush=True)
+    store.flush()
+    elapsed = time.perf_counter() - start
+    total = blocks * rows * devices
+    size = sum(series.disk_bytes() for series in store.series.values())
+    print(f"Ingesta masiva: {total / 1e6:.1f} M muestras IMU en {elapsed:.1f}s ({total / elapsed / 1e6:.2f} M "
+          f"muestras/s, {size / elapsed / 1e6:.0f} MB/s); {size / 1e9:.2f} GB en disco "
+          f"({size / total:.1f} bytes/muestra con el ambiente)")
+    return first_ms, end_ms
+
+
+def bench_queries(store, devices, first_ms, end_ms, queries):
+    print(f"{'rango':>8} {'filas':>9} {'read p50':>10} {'read p99':>10} {'+|a| p50':>10} {'+|a| p99':>10}")
+    for label, seconds in QUERY_WINDOWS:
+        span = seconds * 1000
+        if span >= end_ms - first_ms:
+            continue
+        views, computed, rows = [], [], 0
+        for _ in range(queries):
+            start = int(rng.integers(first_ms, end_ms - span))
+            device = device_name(int(rng.integers(devices)))
+            t0 = time.perf_counter()
+            parts = store.read(device, "imu", start, start + span, ["ax", "ay", "az"])
+            t1 = time.perf_counter()
+            total = 0.0
+            for part in parts:
+                acc = np.column_stack((part["ax"], part["ay"], part["az"])).astype(np.float32)
+                total += float(np.sqrt(np.einsum("nk,nk->n", acc, acc)).sum())
+            t2 = time.perf_counter()
+            views.append(t1 - t0)
+            computed.append(t2 - t0)
+            rows += sum(len(part["ax"]) for part in parts)
+        print(f"{label:>8} {rows // queries:>9} {1000 * percentile(views, 0.5):>8.3f}ms "
+              f"{1000 * percentile(views, 0.99):>8.3f}ms {1000 * percentile(computed, 0.5):>8.2f}ms "
+              f"{1000 * percentile(computed, 0.99):>8.2f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del almacén local de series")
+    parser.add_argument("--days", type=float, default=14.0, help="Días de histórico por dispositivo")
+    parser.add_argument("--rate", type=float, default=100.0, help="Frecuencia IMU en Hz")
+    parser.add_argument("--devices", type=int, default=1, help="Dispositivos")
+    parser.add_argument("--frames", type=int, default=50000, help="Tramas de la prueba trama a trama")
+    parser.add_argument("--queries", type=int, default=200, help="Consultas por tamaño de rango")
+    parser.add_argument("--dir", help="Directorio del almacén (por defecto, uno temporal que se borra)")
+    parser.add_argument("--keep", action="store_true", help="No borrar el almacén al terminar")
+    args = parser.parse_args()
+
+    root = args.dir or tempfile.mkdtemp(prefix="bench_series_")
+    print(f"Almacén en {root}: {args.devices} dispositivos x {args.days:g} días a {args.rate:g} Hz")
+    try:
+        store = SeriesStore(root, max_age_days=None)
+        bench_frames(store, args.frames)
+        first_ms, end_ms = bench_bulk(store, args.devices, args.days, args.rate)
+        bench_queries(store, args.devices, first_ms, end_ms, args.queries)
+        store.close()
+
+        start = time.perf_counter()
+        store = SeriesStore(root, max_age_days=args.days / 2)
+        for d in range(args.devices):
+            store.time_range(device_name(d), "imu")
+        chunks = sum(len(series.paths) + 1 for series in store.series.values())
+        print(f"Reapertura: {chunks} trozos indexados en {1000 * (time.perf_counter() - start):.0f} ms")
+        start = time.perf_counter()
+        expired = store.apply_retention()
+        print(f"Retención a {args.days / 2:g} días: {expired} trozos ({store.stats['expired_bytes'] / 1e9:.2f} GB) "
+              f"en {1000 * (time.perf_counter() - start):.0f} ms")
+        store.close()
+    finally:
+        if not args.keep:
+            shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Benchmark de escalado del gateway repartido (sharded_gateway.py).
+
+Arranca el supervisor con 1, 2 y 4 procesos de trabajo y --devices dispositivos
+BLE falsos (stream_replay.FakeBleakClient) que entregan, a velocidad máxima,
+--frames tramas cada uno: tramas IMU de 15 muestras (marcha simulada con algún
+impacto) y una STATUS cada 10. Cada proceso verifica caídas con su motor
+(--verify-falls) y publica el IMU crudo en memoria compartida; con --analytics
+un proceso lector lo analiza a la vez. Los mensajes se cuentan sin servidor
+WebSocket (ReplayChannel).
+
+Por configuración se informa de notificaciones/s y muestras IMU/s agregadas
+(desde que arranca el primer proceso de trabajo, ya importados los módulos,
+hasta procesarlo todo), CPU de los procesos de trabajo y aceleración frente
+a 1 proceso. El escalado está limitado por los núcleos disponibles: se muestra
+os.cpu_count() junto a los resultados.
+
+Uso:
+python3 benchmarks/bench_sharded_gateway.py
+python3 benchmarks/bench_sharded_gateway.py --workers 1,2,4 --devices 8 --frames 20000
+python3 benchmarks/bench_sharded_gateway.py --no-analytics --no-verify
+"""
+
+import argparse
+import functools
+import logging
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from ble_frames import MAX_IMU_SAMPLES, encode_imu_frame, encode_status_frame
+from sharded_gateway import ShardSupervisor
+from stream_replay import KIND_BLE, FakeBleakClient, Record
+
+PERIOD_MS = 10       # 100 Hz
+STATUS_EVERY = 10    # Una trama STATUS cada 10 tramas IMU
+
+
+@functools.lru_cache(maxsize=None)
+def synthetic_records(frames):
+    """Tramas de un dispositivo (las mismas para todos: se codifican una vez por proceso)"""
+    rng = np.random.default_rng(7)
+    t = np.arange(frames * MAX_IMU_SAMPLES) * PERIOD_MS / 1000.0
+    acc = np.column_stack((0.15 * np.sin(2 * np.pi * 1.8 * t), -1.0 + 0.2 * np.sin(2 * np.pi * 3.6 * t),
+                           0.05 * np.cos(2 * np.pi * 1.8 * t))) + rng.normal(0.0, 0.02, (len(t), 3))
+    acc[::3000] += (0.5, -2.5, 0.8)  # Impactos sueltos: el motor también trabaja
+    gyro = rng.normal(0.0, 5.0, (len(t), 3))
+    imu = np.hstack((acc, gyro)).tolist()
+    records = []
+    for frame in range(frames):
+        timestamp = frame * MAX_IMU_SAMPLES * PERIOD_MS
+        chunk = imu[frame * MAX_IMU_SAMPLES:(frame + 1) * MAX_IMU_SAMPLES]
+        records.append(Record(0.0, KIND_BLE, "", encode_imu_frame(timestamp, PERIOD_MS, chunk)))
+        if frame % STATUS_EVERY == 0:
+            records.append(Record(0.0, KIND_BLE, "", encode_status_frame(timestamp, True, 0, 1.0, 1.0,
+                                                                         (22.5, 45.0, 1013.2))))
+    return records
+
+
+def synthetic_client(address, frames):
+    """Fábrica de clientes BLE falsos para los procesos de trabajo"""
+    return FakeBleakClient(address, synthetic_records(frames), speed=0)
+
+
+def device_address(i):
+    return "AA:BB:CC:DD:%02X:%02X" % (i >> 8 & 0xFF, i & 0xFF)
+
+
+def run_case(workers, args):
+    device_map = {device_address(i): {"user_id": f"bench{i}", "name": f"Bench{i}"} for i in range(args.devices)}
+    expected = args.devices * len(synthetic_records(args.frames))
+    supervisor = ShardSupervisor(
+        workers=workers,
+        device_map=device_map,
+        max_devices=args.devices,
+        analytics=args.analytics,
+        stats_interval=3600,
+        client_factory=functools.partial(synthetic_client, frames=args.frames),
+        worker_options={
+            "ws_url": None, "verify_falls": args.verify, "capture_dir": None, "spool_dir": None,
+            "stats_interval": 3600, "report_interval": 0.1, "log_mode": "fast", "log_level": logging.WARNING,
+        }
+    )
+    supervisor.start()
+    stats = {}
+    notifications = 0
+    deadline = time.monotonic() + args.timeout
+    try:
+        while time.monotonic() < deadline:
+            supervisor.poll(timeout=0.05)
+            stats = supervisor.get_stats()
+            notifications = stats.get("notifications", 0)
+            if notifications >= expected:
+                break
+        end = time.time()
+        # Los procesos pueden terminarlo todo antes de su primer informe: se cuenta desde
+        # su arranque (reloj de pared de cada proceso), no desde el primer contador visto
+        starts = [shard.stats["started_at"] for shard in supervisor.shards if "started_at" in shard.stats]
+    finally:
+        supervisor.stop()
+
+    if not notifications or not starts or end <= min(starts):
+        return None
+    elapsed = end - min(starts)
+    return {
+        "workers": workers,
+        "notifications": notifications,
+        "complete": notifications >= expected,
+        "notif_rate": notifications / elapsed,
+        "sample_rate": stats.get("imu_samples", 0) / elapsed,
+        "cpu": stats.get("cpu_seconds", 0.0),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de escalado del gateway repartido")
+    parser.add_argument("--workers", default="1,2,4", help="Número de procesos a probar, separados por comas")
+    parser.add_argument("--devices", type=int, default=8, help="Dispositivos BLE falsos")
+    parser.add_argument("--frames", type=int, default=20000, help="Tramas IMU por dispositivo")
+    parser.add_argument("--timeout", type=float, default=120.0, help="Segundos máximos por configuración")
+    parser.add_argument("--no-analytics", dest="analytics", action="store_false",
+                        help="Sin proceso lector de la memoria compartida")
+    parser.add_argument("--no-verify", dest="verify", action="store_false", help="Sin motor de caídas")
+    args = parser.parse_args()
+
+    # Solo avisos, aquí y en los procesos hijos (log_level)
+    logging.getLogger().setLevel(logging.WARNING)
+
+    print(f"Núcleos disponibles: {os.cpu_count()}; {args.devices} dispositivos x {args.frames} tramas IMU "
+          f"({MAX_IMU_SAMPLES} muestras), motor {'sí' if args.verify else 'no'}, "
+          f"lector {'sí' if args.analytics else 'no'}")
+    print(f"{'procesos':>8} {'notif/s':>10} {'muestras/s':>12} {'CPU (s)':>8} {'aceleración':>12}")
+    base = None
+    for workers in (int(w) for w in args.workers.split(",")):
+        result = run_case(workers, args)
+        if result is None:
+            print(f"{workers:>8} sin datos (¿no arrancaron los procesos?)")
+            continue
+        base = base or result["notif_rate"]
+        speedup = f"{result['notif_rate'] / base:>11.2f}x" if base else f"{'-':>12}"
+        note = "" if result["complete"] else f"  (incompleto: {result['notifications']} notificaciones)"
+        print(f"{workers:>8} {result['notif_rate']:>10.0f} {result['sample_rate']:>12.0f} "
+              f"{result['cpu']:>8.1f} {speedup}{note}")
+
+
+if __name__ == "__main__":
+    main()
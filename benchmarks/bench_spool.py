@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Benchmark del spool en disco (ws_spool.py).
+
+Mide el ritmo de escritura de telemetría y de alertas (cada alerta hace msync),
+el coste medio de cada fsync y el ritmo de reenvío del backlog.
+
+Uso:
+python3 benchmarks/bench_spool.py --messages 50000 --dir /tmp/spool_bench
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from ws_spool import MessageSpool
+
+
+def sample_message(i):
+    return {
+        "type": "sensor_data",
+        "timestamp": "2025-10-15T10:30:00.000000",
+        "device_id": "Nano33BLE-FallDetector",
+        "temperature": 22.5,
+        "humidity": 55.1,
+        "pressure": 1013.2,
+        "acceleration": {"x": 0.01, "y": -0.02, "z": 0.98},
+        "gyroscope": {"x": 1.5, "y": -0.3, "z": 0.2},
+        "seq": i
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del spool en disco")
+    parser.add_argument("--messages", type=int, default=50000, help="Mensajes de telemetría a escribir")
+    parser.add_argument("--alerts", type=int, default=500, help="Alertas a escribir (msync en cada una)")
+    parser.add_argument("--dir", default="/tmp/spool_bench", help="Directorio temporal del spool")
+    args = parser.parse_args()
+
+    shutil.rmtree(args.dir, ignore_errors=True)
+    spool = MessageSpool(args.dir)
+
+    start = time.perf_counter()
+    for i in range(args.messages):
+        spool.append(sample_message(i), 2)
+    telemetry_elapsed = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for i in range(args.alerts):
+        spool.append({"type": "fall_alert", "alert_id": f"fall_{i}", "severity": "high"}, 0)
+    alerts_elapsed = time.perf_counter() - start
+
+    write_stats = spool.get_stats()
+    spool.close()
+
+    spool = MessageSpool(args.dir)
+    start = time.perf_counter()
+    backlog = spool.replay()
+    replay_elapsed = time.perf_counter() - start
+    spool.clear(replayed=len(backlog))
+
+    print(f"Telemetría: {args.messages / telemetry_elapsed:,.0f} msg/s escritos")
+    print(f"Alertas (msync por alerta): {args.alerts / alerts_elapsed:,.0f} msg/s escritos")
+    print(f"Reenvío: {len(backlog) / replay_elapsed:,.0f} msg/s leídos y ordenados ({len(backlog)} mensajes)")
+    print(f"Primer mensaje reenviado: {backlog[0]['type']}")
+    print(f"fsync: {write_stats['fsyncs']} llamadas, {write_stats.get('fsync_avg_ms', 0)} ms de media, "
+          f"{write_stats['fsync_seconds']:.3f}s en total")
+
+    shutil.rmtree(args.dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Benchmark del micro-batching de telemetría (telemetry_batch.py).
+
+Compara el camino actual (un mensaje sensor_data por lectura, con timestamp ISO
+y claves anidadas) con lotes sensor_data_batch columnares: bytes por muestra,
+mensajes por segundo en el enlace y coste de serialización por muestra.
+
+Uso:
+python3 benchmarks/bench_telemetry_batch.py --samples 20000 --rate 100 --batch-size 50
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from telemetry_batch import TelemetryBatcher
+
+
+def reading():
+    """Lectura con el mismo formato que envía arduino_ble_sense_reader.ino"""
+    return {
+        "temperature": round(20 + random.uniform(-5, 15), 2),
+        "humidity": round(50 + random.uniform(-20, 30), 2),
+        "pressure": round(1013 + random.uniform(-10, 20), 2),
+        "acceleration": {
+            "x": round(random.uniform(-2, 2), 3),
+            "y": round(random.uniform(-2, 2), 3),
+            "z": round(random.uniform(-2, 2), 3)
+        },
+        "gyroscope": {
+            "x": round(random.uniform(-50, 50), 3),
+            "y": round(random.uniform(-50, 50), 3),
+            "z": round(random.uniform(-50, 50), 3)
+        }
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de micro-batching de telemetría")
+    parser.add_argument("--samples", type=int, default=20000, help="Lecturas a serializar")
+    parser.add_argument("--rate", type=float, default=100.0, help="Frecuencia de muestreo simulada (Hz)")
+    parser.add_argument("--batch-size", type=int, default=50, help="Lecturas por lote")
+    args = parser.parse_args()
+
+    random.seed(1)
+    readings = [reading() for _ in range(args.samples)]
+    base = time.time()
+    timestamps = [base + i / args.rate for i in range(args.samples)]
+
+    # Camino actual: un mensaje por lectura
+    start = time.perf_counter()
+    single_bytes = 0
+    for sensor_data in readings:
+        message = {"type": "sensor_data", "timestamp": datetime.now().isoformat(), **sensor_data}
+        single_bytes += len(json.dumps(message))
+    single_elapsed = time.perf_counter() - start
+
+    # Micro-batching
+    batcher = TelemetryBatcher(max_samples=args.batch_size, max_age=float("inf"))
+    start = time.perf_counter()
+    batch_bytes = 0
+    batches = 0
+    for sensor_data, timestamp in zip(readings, timestamps):
+        batch = batcher.add(sensor_data, timestamp)
+        if batch:
+            batch_bytes += len(json.dumps(batch, separators=(",", ":")))
+            batches += 1
+    batch = batcher.flush()
+    if batch:
+        batch_bytes += len(json.dumps(batch, separators=(",", ":")))
+        batches += 1
+    batch_elapsed = time.perf_counter() - start
+
+    print(f"Muestras: {args.samples} a {args.rate:g} Hz, lotes de {args.batch_size}")
+    print(f"{'':22}{'bytes/muestra':>15}{'msg/s enlace':>15}{'µs/muestra':>13}")
+    print(f"{'sensor_data':22}{single_bytes / args.samples:>15.1f}{args.rate:>15.1f}"
+          f"{1e6 * single_elapsed / args.samples:>13.2f}")
+    print(f"{'sensor_data_batch':22}{batch_bytes / args.samples:>15.1f}"
+          f"{args.rate * batches / args.samples:>15.1f}{1e6 * batch_elapsed / args.samples:>13.2f}")
+    print(f"Reducción de bytes: {100 * (1 - batch_bytes / single_bytes):.1f}%")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,374 @@
+#!/usr/bin/env python3
+"""
+Suite de benchmarks de los caminos calientes de la Raspberry Pi.
+
+Mide de extremo a extremo, sin Arduino ni servidor real, los handlers por los
+que pasa cada mensaje:
+- notification_handler con tramas binarias STATUS y FALL y con JSON, entregadas
+  por un BleakClient falso (stream_replay.FakeBleakClient) a velocidad máxima.
+- process_json_message, handle_detailed_fall y handle_status_update llamados
+  directamente.
+- parse_sensor_string y send_sensor_data de SensorDataSender.
+
+Los mensajes salen por el WebSocketChannel real hacia un servidor WebSocket
+local (en un hilo propio) que solo los cuenta; el tiempo de cada caso incluye
+vaciar la cola de envío. El log de los handlers se formatea a /dev/null con el
+mismo nivel INFO que en producción.
+
+Por caso se informa de mensajes/s, latencia p50/p99 de cada llamada y KB
+asignados por mensaje (pico de tracemalloc durante cada llamada, en una pasada
+aparte de ALLOC_SAMPLES mensajes sin ceder el bucle; en el sender el canal se
+sustituye por ReplayChannel para no contar lo que asigna el hilo del WebSocket). Los
+resultados se guardan en JSON y, con una línea base guardada, se marcan las
+regresiones (--tolerance).
+
+Uso:
+python3 benchmarks/run_benchmarks.py
+python3 benchmarks/run_benchmarks.py --save-baseline          # benchmarks/baseline.json
+python3 benchmarks/run_benchmarks.py --fail-on-regression     # código de salida 1 si algo empeora
+python3 benchmarks/run_benchmarks.py --cases ble_status_bin,send_sensor_data --messages 5000
+"""
+
+import argparse
+import asyncio
+import gc
+import json
+import logging
+import os
+import platform
+import sys
+import threading
+import time
+import tracemalloc
+from datetime import datetime
+
+import websockets
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, ".."))
+
+from ble_frames import encode_fall_frame, encode_status_frame
+from message_codec import JSON_BACKEND
+from raspberry_fall_detection import FallDetectionSystem
+from raspberry_sensor_sender import SensorDataSender
+from stream_replay import KIND_BLE, FakeBleakClient, Record, ReplayChannel
+
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, "baseline.json")
+DEFAULT_OUTPUT = os.path.join(BENCH_DIR, "results", "latest.json")
+ALLOC_SAMPLES = 100          # Mensajes medidos con tracemalloc por caso (caben en la cola de alertas)
+YIELD_EVERY = 64             # Llamadas entre cesiones al bucle (escritor del canal y workers)
+DEVICE = "AA:BB:CC:DD:EE:01"
+
+STATUS_JSON = (b'{"t":"STATUS","ts":123456789,"sa":1,"fc":12,"bl":1.01,"ca":0.98,'
+               b'"env":[22.5,45.1,1013.2]}')
+FALL_DICT = {"t": "FALL", "ts": 123456789, "fc": 12, "sev": "high", "mag": 3.87,
+             "acc": [1.23, -2.87, 0.45], "env": [22.5, 45.1, 1013.2]}
+STATUS_DICT = {"t": "STATUS", "ts": 123456789, "sa": 1, "fc": 12, "bl": 1.01, "ca": 0.98,
+               "env": [22.5, 45.1, 1013.2]}
+SENSOR_LINE = "temp:25.5,hum:60.2,press:1013.2,acc_x:0.012,acc_y:-0.998,acc_z:0.034,gyro_x:1.22,gyro_y:-0.61,gyro_z:0.12"
+
+
+class LocalWebSocketServer:
+    """Servidor WebSocket local que cuenta los mensajes recibidos"""
+
+    def __init__(self):
+        self.received = 0
+        self.port = None
+        self.loop = None
+        self.stop_event = None
+        self.ready = threading.Event()
+        self.thread = threading.Thread(target=lambda: asyncio.run(self.main()), name="ws-local", daemon=True)
+
+    async def handler(self, ws):
+        async for _ in ws:
+            self.received += 1
+
+    async def main(self):
+        self.loop = asyncio.get_running_loop()
+        self.stop_event = asyncio.Event()
+        async with websockets.serve(self.handler, "127.0.0.1", 0) as server:
+            self.port = server.sockets[0].getsockname()[1]
+            self.ready.set()
+            await self.stop_event.wait()
+
+    @property
+    def url(self):
+        return f"ws://127.0.0.1:{self.port}"
+
+    def start(self):
+        self.thread.start()
+        self.ready.wait()
+        return self
+
+    def stop(self):
+        self.loop.call_soon_threadsafe(self.stop_event.set)
+        self.thread.join(timeout=2)
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def memory_per_call(call, count):
+    """KB de pico asignados durante una llamada"""
+    gc.collect()
+    tracemalloc.start()
+    peak_total = 0
+    for i in range(count):
+        before = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        call(i)
+        peak_total += tracemalloc.get_traced_memory()[1] - before
+    tracemalloc.stop()
+    return peak_total / count / 1024
+
+
+def result(count, elapsed, latencies, alloc_kb):
+    return {
+        "messages": count,
+        "seconds": round(elapsed, 4),
+        "msg_per_s": round(count / elapsed, 1),
+        "p50_us": round(1e6 * percentile(latencies, 0.50), 2),
+        "p99_us": round(1e6 * percentile(latencies, 0.99), 2),
+        "alloc_kb_per_msg": round(alloc_kb, 3),
+    }
+
+
+# ---------------------------------------------------------------------------
+# Casos del detector (asyncio)
+# ---------------------------------------------------------------------------
+
+def status_frame(i):
+    return encode_status_frame(i, 1, 12, 1.01, 0.98 + (i % 7) / 100, (22.5, 45.1, 1013.2))
+
+
+def fall_frame(i):
+    # fall_count distinto en cada trama: alert_id único, sin deduplicar
+    return encode_fall_frame(i, 1000 + i, "high", 3.87, (1.23, -2.87, 0.45), (10.0, -4.0, 2.0),
+                             (22.5, 45.1, 1013.2))
+
+
+async def new_system(url):
+    system = FallDetectionSystem(ws_url=url, device_address=DEVICE, spool_dir=None, capture_dir=None)
+    system.running = True
+    if not await system.connect_websocket():
+        raise ConnectionError(f"No se pudo conectar a {url}")
+    system.alert_fanout.start()
+    return system
+
+
+async def drain(system):
+    """Espera a que las colas de alertas y del WebSocket queden vacías"""
+    while len(system.channel.queue) or any(sink.queue.qsize() for sink in system.alert_fanout.sinks):
+        await asyncio.sleep(0.0005)
+
+
+async def ble_case(url, payload, count):
+    """notification_handler alimentado por un BleakClient falso"""
+    system = await new_system(url)
+    records = [Record(0.0, KIND_BLE, DEVICE, payload(i)) for i in range(count)]
+    client = FakeBleakClient(DEVICE, records, speed=0)
+    system.ble_client_class = lambda address, **kwargs: client
+    latencies = []
+    handler = system.notification_handler
+
+    async def timed(sender, data):
+        start = time.perf_counter()
+        await handler(sender, data)
+        latencies.append(time.perf_counter() - start)
+
+    system.notification_handler = timed
+    start = time.perf_counter()
+    await system.connect_ble()
+    await client.finished.wait()
+    await drain(system)
+    elapsed = time.perf_counter() - start
+
+    extra = [payload(count + i) for i in range(ALLOC_SAMPLES)]
+    alloc_kb = memory_per_call(lambda i: run_now(handler(None, bytearray(extra[i]))), ALLOC_SAMPLES)
+    await drain(system)
+    await system.stop()
+    return result(count, elapsed, latencies, alloc_kb)
+
+
+def run_now(coroutine):
+    """Ejecuta una corrutina que no se suspende sin pasar por el bucle de eventos"""
+    try:
+        coroutine.send(None)
+    except StopIteration:
+        return
+    raise RuntimeError("el handler se suspendió")
+
+
+async def direct_case(url, call, count):
+    """Llamadas directas a un handler async del detector"""
+    system = await new_system(url)
+    latencies = []
+    start = time.perf_counter()
+    for i in range(count):
+        t = time.perf_counter()
+        await call(system, i)
+        latencies.append(time.perf_counter() - t)
+        if i % YIELD_EVERY == 0:
+            await asyncio.sleep(0)
+    await drain(system)
+    elapsed = time.perf_counter() - start
+
+    alloc_kb = memory_per_call(lambda i: run_now(call(system, count + i)), ALLOC_SAMPLES)
+    await drain(system)
+    await system.stop()
+    return result(count, elapsed, latencies, alloc_kb)
+
+
+def process_fall(system, i):
+    return system.process_json_message({**FALL_DICT, "fc": 1000 + i})
+
+
+def process_status(system, i):
+    return system.process_json_message(STATUS_DICT)
+
+
+def detailed_fall(system, i):
+    return system.handle_detailed_fall("high", 3.87, 1000 + i, i, [1.23, -2.87, 0.45], [22.5, 45.1, 1013.2],
+                                       [10.0, -4.0, 2.0])
+
+
+def status_update(system, i):
+    return system.handle_status_update(1, 12, 1.01, 0.98, i, [22.5, 45.1, 1013.2])
+
+
+# ---------------------------------------------------------------------------
+# Casos del sender serial (síncronos, canal en su propio hilo)
+# ---------------------------------------------------------------------------
+
+def sender_case(url, count, send):
+    sender = SensorDataSender(ws_url=url, spool_dir=None, rollups=True)
+    if not sender.connect_websocket():
+        raise ConnectionError(f"No se pudo conectar a {url}")
+    reading = sender.parse_sensor_string(SENSOR_LINE)
+    call = (lambda i: sender.send_sensor_data(reading)) if send else (lambda i: sender.parse_sensor_string(SENSOR_LINE))
+    latencies = []
+    start = time.perf_counter()
+    for i in range(count):
+        t = time.perf_counter()
+        call(i)
+        latencies.append(time.perf_counter() - t)
+    while send and len(sender.channel.queue):
+        time.sleep(0.0005)
+    elapsed = time.perf_counter() - start
+
+    channel, sender.channel = sender.channel, ReplayChannel()
+    alloc_kb = memory_per_call(call, ALLOC_SAMPLES)
+    channel.close()
+    return result(count, elapsed, latencies, alloc_kb)
+
+
+CASES = {
+    "ble_status_bin": lambda url, n: asyncio.run(ble_case(url, status_frame, n)),
+    "ble_fall_bin": lambda url, n: asyncio.run(ble_case(url, fall_frame, n)),
+    "ble_status_json": lambda url, n: asyncio.run(ble_case(url, lambda i: STATUS_JSON, n)),
+    "process_json_fall": lambda url, n: asyncio.run(direct_case(url, process_fall, n)),
+    "process_json_status": lambda url, n: asyncio.run(direct_case(url, process_status, n)),
+    "handle_detailed_fall": lambda url, n: asyncio.run(direct_case(url, detailed_fall, n)),
+    "handle_status_update": lambda url, n: asyncio.run(direct_case(url, status_update, n)),
+    "parse_sensor_string": lambda url, n: sender_case(url, n, send=False),
+    "send_sensor_data": lambda url, n: sender_case(url, n, send=True),
+}
+
+
+def environment():
+    return {
+        "date": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "machine": platform.machine(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "json_backend": JSON_BACKEND,
+    }
+
+
+def compare(results, baseline, tolerance):
+    """Devuelve {caso: [regresiones]} comparando con la línea base"""
+    regressions = {}
+    for name, current in results.items():
+        reference = baseline.get("cases", {}).get(name)
+        if not reference:
+            continue
+        found = []
+        if current["msg_per_s"] < reference["msg_per_s"] * (1 - tolerance):
+            found.append(f"msg/s {reference['msg_per_s']:.0f} -> {current['msg_per_s']:.0f}")
+        if current["p99_us"] > reference["p99_us"] * (1 + tolerance):
+            found.append(f"p99 {reference['p99_us']:.1f} -> {current['p99_us']:.1f} µs")
+        if current["alloc_kb_per_msg"] > reference["alloc_kb_per_msg"] * (1 + tolerance) + 0.05:
+            found.append(f"KB/msg {reference['alloc_kb_per_msg']:.2f} -> {current['alloc_kb_per_msg']:.2f}")
+        if found:
+            regressions[name] = found
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Suite de benchmarks de los caminos calientes")
+    parser.add_argument("--messages", type=int, default=20000, help="Mensajes por caso")
+    parser.add_argument("--cases", help=f"Casos separados por comas (por defecto todos: {', '.join(CASES)})")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="Archivo JSON de resultados")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="Línea base con la que comparar")
+    parser.add_argument("--save-baseline", action="store_true", help="Guardar los resultados como línea base")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="Empeoramiento tolerado (0.15 = 15%%)")
+    parser.add_argument("--fail-on-regression", action="store_true", help="Código de salida 1 si hay regresiones")
+    args = parser.parse_args()
+
+    # Mismo nivel de log que en producción, sin ensuciar la salida
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s',
+                        stream=open(os.devnull, "w"), force=True)
+
+    names = args.cases.split(",") if args.cases else list(CASES)
+    unknown = [name for name in names if name not in CASES]
+    if unknown:
+        parser.error(f"casos desconocidos: {', '.join(unknown)}")
+
+    baseline = None
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    server = LocalWebSocketServer().start()
+    env = environment()
+    print(f"Python {env['python']} en {env['machine']} ({env['cpus']} CPU), JSON: {env['json_backend']}, "
+          f"{args.messages} mensajes por caso")
+    print(f"{'caso':24}{'msg/s':>10}{'p50 µs':>9}{'p99 µs':>9}{'KB/msg':>8}  {'vs línea base'}")
+
+    results = {}
+    for name in names:
+        results[name] = row = CASES[name](server.url, args.messages)
+        delta = ""
+        reference = (baseline or {}).get("cases", {}).get(name)
+        if reference:
+            delta = f"{100 * (row['msg_per_s'] / reference['msg_per_s'] - 1):+.1f}% msg/s"
+        print(f"{name:24}{row['msg_per_s']:>10.0f}{row['p50_us']:>9.1f}{row['p99_us']:>9.1f}"
+              f"{row['alloc_kb_per_msg']:>8.2f}  {delta}")
+    server.stop()
+
+    report = {"environment": env, "messages": args.messages, "cases": results}
+    path = args.baseline if args.save_baseline else args.output
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"Resultados guardados en {path}")
+
+    if baseline is None:
+        return
+    if baseline.get("environment", {}).get("machine") != env["machine"]:
+        print(f"Aviso: la línea base es de otra máquina ({baseline['environment'].get('machine')})")
+    regressions = compare(results, baseline, args.tolerance)
+    for name, found in regressions.items():
+        print(f"REGRESIÓN {name}: {'; '.join(found)}")
+    if not regressions:
+        print(f"Sin regresiones respecto a {args.baseline} (tolerancia {args.tolerance:.0%})")
+    elif args.fail_on_regression:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
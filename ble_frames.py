@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Formato binario de tramas BLE del Arduino Nano 33 BLE Sense.
+
+Convive con los mensajes de texto actuales ("CAIDA", "OK", JSON compacto): una
+trama binaria siempre empieza por el byte FRAME_MAGIC (0xFD), que nunca aparece
+al inicio de un mensaje de texto UTF-8. Todos los campos son little-endian y
+cada trama cabe en una sola notificación (característica de 200 bytes), así que
+ya no se truncan alertas ni estados.
+
+Cabecera común (3 bytes): magic u8 | versión u8 | tipo u8
+
+FALL   (50 bytes): ts u32 | fall_count u16 | severidad u8 | magnitud f32 |
+                   acc 3×f32 | gyro 3×f32 | env 3×f32 (temp, hum, presión; NaN = sin dato)
+STATUS (30 bytes): ts u32 | system_active u8 | fall_count u16 | baseline f32 |
+                   current_accel f32 | env 3×f32
+IMU    (10 + 12·n bytes): ts u32 del primer sample | n u8 | periodo_ms u16 |
+                   n × (ax ay az gx gy gz) i16 (acc en mg, gyro en 0.1 °/s)
+
+El decodificador trabaja sobre memoryview con struct.unpack_from, sin copiar el
+payload; las muestras IMU se devuelven como una vista int16 sobre el buffer. Los
+float32 se devuelven tal cual: redondear es cosa de quien los serializa.
+
+Autor: Tu nombre
+Fecha: Octubre 2025
+"""
+
+import math
+import struct
+
+FRAME_MAGIC = 0xFD
+FRAME_VERSION = 1
+
+FRAME_FALL = 1
+FRAME_STATUS = 2
+FRAME_IMU = 3
+
+SEVERITIES = ("low", "medium", "high", "critical")
+SEVERITY_CODES = {name: code for code, name in enumerate(SEVERITIES)}
+
+ACC_SCALE = 1000.0   # int16 -> g (mg)
+GYRO_SCALE = 10.0    # int16 -> °/s (0.1 °/s)
+IMU_AXES = 6
+MAX_IMU_SAMPLES = 15  # (200 - 10) // 12
+
+HEADER = struct.Struct("<BBB")
+FALL_FRAME = struct.Struct("<BBBIHBf3f3f3f")
+STATUS_FRAME = struct.Struct("<BBBIBHff3f")
+IMU_HEADER = struct.Struct("<BBBIBH")
+IMU_SAMPLE = struct.Struct("<6h")
+
+
+class FrameError(ValueError):
+    """Trama binaria inválida o de una versión no soportada"""
+
+
+def is_binary_frame(data):
+    return len(data) >= HEADER.size and data[0] == FRAME_MAGIC
+
+
+def env_list(temperature, humidity, pressure):
+    """Datos ambientales como [temp, hum, presión]; lista vacía si no hay sensores"""
+    values = [None if math.isnan(v) else v for v in (temperature, humidity, pressure)]
+    return values if any(v is not None for v in values) else []
+
+
+def decode_frame(data):
+    """
+    Decodifica una trama binaria. Devuelve (tipo, campos) donde campos es:
+      FALL:   (timestamp, fall_count, severidad, magnitud, acc[3], gyro[3], env)
+      STATUS: (timestamp, system_active, fall_count, baseline, current_accel, env)
+      IMU:    (timestamp, periodo_ms, muestras) con muestras como memoryview int16
+              de n × 6 valores (ax ay az gx gy gz) sin copiar
+    """
+    view = memoryview(data)
+    if len(view) < HEADER.size:
+        raise FrameError("Trama demasiado corta")
+    magic, version, frame_type = HEADER.unpack_from(view, 0)
+    if magic != FRAME_MAGIC:
+        raise FrameError("No es una trama binaria")
+    if version != FRAME_VERSION:
+        raise FrameError(f"Versión de trama no soportada: {version}")
+
+    if frame_type == FRAME_FALL:
+        if len(view) < FALL_FRAME.size:
+            raise FrameError("Trama FALL incompleta")
+        (_, _, _, timestamp, fall_count, severity, magnitude,
+         ax, ay, az, gx, gy, gz, temp, hum, press) = FALL_FRAME.unpack_from(view, 0)
+        severity_name = SEVERITIES[severity] if severity < len(SEVERITIES) else "medium"
+        return FRAME_FALL, (timestamp, fall_count, severity_name, magnitude,
+                            [ax, ay, az], [gx, gy, gz], env_list(temp, hum, press))
+
+    if frame_type == FRAME_STATUS:
+        if len(view) < STATUS_FRAME.size:
+            raise FrameError("Trama STATUS incompleta")
+        (_, _, _, timestamp, system_active, fall_count, baseline, current_accel,
+         temp, hum, press) = STATUS_FRAME.unpack_from(view, 0)
+        return FRAME_STATUS, (timestamp, system_active, fall_count, baseline, current_accel,
+                              env_list(temp, hum, press))
+
+    if frame_type == FRAME_IMU:
+        if len(view) < IMU_HEADER.size:
+            raise FrameError("Trama IMU incompleta")
+        _, _, _, timestamp, count, period_ms = IMU_HEADER.unpack_from(view, 0)
+        end = IMU_HEADER.size + count * IMU_SAMPLE.size
+        if len(view) < end:
+            raise FrameError("Trama IMU incompleta")
+        samples = view[IMU_HEADER.size:end].cast("h")
+        return FRAME_IMU, (timestamp, period_ms, samples)
+
+    raise FrameError(f"Tipo de trama desconocido: {frame_type}")
+
+
+def encode_fall_frame(timestamp, fall_count, severity, magnitude, acc, gyro=(0.0, 0.0, 0.0), env=None):
+    """Codifica una trama FALL (la misma estructura que envía el Arduino)"""
+    env = env or (math.nan, math.nan, math.nan)
+    return FALL_FRAME.pack(FRAME_MAGIC, FRAME_VERSION, FRAME_FALL, timestamp, fall_count,
+                           SEVERITY_CODES.get(severity, 1), magnitude, *acc, *gyro, *env)
+
+
+def encode_status_frame(timestamp, system_active, fall_count, baseline, current_accel, env=None):
+    """Codifica una trama STATUS"""
+    env = env or (math.nan, math.nan, math.nan)
+    return STATUS_FRAME.pack(FRAME_MAGIC, FRAME_VERSION, FRAME_STATUS, timestamp,
+                             int(bool(system_active)), fall_count, baseline, current_accel, *env)
+
+
+def encode_imu_frame(timestamp, period_ms, samples):
+    """Codifica una trama IMU; samples es una lista de (ax, ay, az, gx, gy, gz) en g y °/s"""
+    samples = samples[:MAX_IMU_SAMPLES]
+    frame = bytearray(IMU_HEADER.pack(FRAME_MAGIC, FRAME_VERSION, FRAME_IMU, timestamp, len(samples), period_ms))
+    for ax, ay, az, gx, gy, gz in samples:
+        frame += IMU_SAMPLE.pack(
+            *(max(-32768, min(32767, round(v * ACC_SCALE))) for v in (ax, ay, az)),
+            *(max(-32768, min(32767, round(v * GYRO_SCALE))) for v in (gx, gy, gz))
+        )
+    return bytes(frame)
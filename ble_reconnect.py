@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Reconexión BLE rápida para el detector y el gateway.
+
+Tras una desconexión el orden de intentos es:
+
+1. Conexión directa a la última dirección conocida del dispositivo. AddressCache
+   la guarda en disco (nombre BLE -> dirección), así que también sirve tras
+   reiniciar el script. Con BlueZ, conectar por dirección solo escanea hasta que
+   esa dirección se anuncia, sin recorrer todos los dispositivos cercanos.
+2. Si falla, un escaneo filtrado (find_device) que se detiene en cuanto el
+   dispositivo con ese nombre se anuncia, con SCAN_TIMEOUT como máximo.
+3. Si también falla, espera con backoff exponencial con jitter (Backoff) antes
+   del siguiente intento, para no sincronizar los reintentos de varios
+   dispositivos ni saturar el adaptador.
+
+La desconexión se detecta con el disconnected_callback de BleakClient, sin
+consultar is_connected periódicamente: un dispositivo conectado no despierta el
+bucle de eventos hasta que llega una notificación o se cae el enlace. Cada
+sesión recorre estos estados (gauge ble_session_state del endpoint de métricas):
+
+  disconnected  sin conexión ni intentos (al arrancar o tras detenerse)
+  connecting    conexión directa o escaneo en curso
+  connected     enlace establecido, suscribiéndose a las notificaciones
+  subscribed    recibiendo notificaciones; se espera el aviso de desconexión
+  degraded      enlace perdido o suscripción fallida, liberando el cliente
+  backoff       esperando antes del siguiente intento
+
+La ventana ciega (desde que se detecta la desconexión hasta que se vuelven a
+recibir notificaciones) se registra en el histograma ble_blind_window_seconds
+del endpoint de métricas (metrics.py).
+
+Autor: Tu nombre
+Fecha: Octubre 2025
+"""
+
+import json
+import logging
+import os
+import random
+
+from bleak import BleakScanner
+
+from metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+ADDRESS_CACHE_FILE = "ble_address_cache.json"
+CONNECT_TIMEOUT = 5.0        # Segundos del intento de conexión directa por dirección
+SCAN_TIMEOUT = 10.0          # Máximo del escaneo filtrado (termina antes si el dispositivo se anuncia)
+BACKOFF_INITIAL = 0.5        # Segundos de espera tras el primer fallo
+BACKOFF_MAX = 30.0           # Espera máxima entre intentos
+
+# Estados de la conexión BLE de cada sesión
+STATE_DISCONNECTED = "disconnected"
+STATE_CONNECTING = "connecting"
+STATE_CONNECTED = "connected"
+STATE_SUBSCRIBED = "subscribed"
+STATE_DEGRADED = "degraded"
+STATE_BACKOFF = "backoff"
+BLE_STATES = (STATE_DISCONNECTED, STATE_CONNECTING, STATE_CONNECTED, STATE_SUBSCRIBED, STATE_DEGRADED,
+              STATE_BACKOFF)
+
+# Límites de los buckets de la ventana ciega (segundos)
+BLIND_WINDOW_BUCKETS = (0.5, 1.0, 2.0, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0, 300.0)
+
+BLIND_WINDOW = REGISTRY.histogram(
+    "ble_blind_window_seconds",
+    "Tiempo sin notificaciones desde que se detecta una desconexión BLE hasta la reconexión",
+    buckets=BLIND_WINDOW_BUCKETS
+)
+
+
+class AddressCache:
+    """Última dirección conocida de cada dispositivo BLE, persistida en un JSON"""
+
+    def __init__(self, path=ADDRESS_CACHE_FILE):
+        self.path = path
+        self.addresses = {}
+        try:
+            with open(path) as f:
+                self.addresses = json.load(f)
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            logger.warning(f"Caché de direcciones BLE ilegible ({path}): {e}")
+
+    def get(self, name):
+        return self.addresses.get(name)
+
+    def items(self):
+        return self.addresses.items()
+
+    def put(self, name, address):
+        """Guarda la dirección si cambió (escritura atómica: archivo temporal + rename)"""
+        if not name or self.addresses.get(name) == address:
+            return
+        self.addresses[name] = address
+        tmp_path = f"{self.path}.tmp"
+        try:
+            with open(tmp_path, "w") as f:
+                json.dump(self.addresses, f, indent=2)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.warning(f"No se pudo guardar la caché de direcciones BLE: {e}")
+
+
+class Backoff:
+    """Espera exponencial con jitter entre intentos de conexión"""
+
+    def __init__(self, initial=BACKOFF_INITIAL, maximum=BACKOFF_MAX, factor=2.0):
+        self.initial = initial
+        self.maximum = maximum
+        self.factor = factor
+        self.attempts = 0
+
+    def next(self):
+        """Segundos a esperar: un valor al azar entre la mitad y el total del tramo actual"""
+        delay = min(self.maximum, self.initial * self.factor ** self.attempts)
+        if delay < self.maximum:
+            self.attempts += 1  # Tope alcanzado: sin seguir creciendo (factor ** attempts desbordaría)
+        return random.uniform(delay / 2, delay)
+
+    def reset(self):
+        self.attempts = 0
+
+
+async def find_device(name, timeout=SCAN_TIMEOUT, scanner_class=BleakScanner):
+    """Escanea hasta que se anuncia un dispositivo con ese nombre (o None al agotar timeout)"""
+    return await scanner_class.find_device_by_filter(
+        lambda device, advertisement: (advertisement.local_name or device.name) == name,
+        timeout=timeout
+    )
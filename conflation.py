@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Último valor por dispositivo y métrica para los dashboards (conflación).
+
+Un dashboard en el navegador solo muestra el último valor de cada dispositivo;
+recibir cada lectura a 50-100 Hz solo gasta ancho de banda y CPU de la pestaña.
+LatestValues guarda, por (tipo de mensaje, dispositivo), la fusión de todas las
+lecturas recibidas: cada campo (temperature, acceleration, fall_count...)
+conserva su valor más reciente, aunque la última lectura no lo traiga.
+
+ws_relay_server.py actualiza LatestValues con cada sensor_data y system_status y
+marca la clave como pendiente en los dashboards que la siguen. Cada dashboard
+con frame_rate recibe, a esa frecuencia, solo las claves que cambiaron desde el
+envío anterior; el mensaje fusionado se codifica una sola vez por cambio,
+aunque lo reciban cientos de dashboards. Así el tráfico hacia cada dashboard
+queda acotado a dispositivos x frame_rate, por rápido que reporten los sensores.
+
+Las alertas de caída y el resto de mensajes no pasan por aquí: se envían en el
+momento y nunca se fusionan.
+
+Autor: Tu nombre
+Fecha: Octubre 2025
+"""
+
+from message_codec import dumps
+
+FRAME_RATE = 4.0         # Envíos por segundo al dashboard del navegador (useWebSocket.js)
+MAX_FRAME_RATE = 30.0    # Tope de frame_rate que puede pedir un cliente
+
+
+class LatestValues:
+    """Mensaje fusionado más reciente por clave (tipo, dispositivo)"""
+
+    def __init__(self):
+        self.entries = {}  # clave -> [mensaje fusionado, texto codificado o None]
+        self.stats = {"updates": 0, "encoded": 0}
+
+    def __len__(self):
+        return len(self.entries)
+
+    def update(self, key, message):
+        """Fusiona una lectura: sus campos sustituyen a los anteriores de la misma clave"""
+        self.stats["updates"] += 1
+        entry = self.entries.get(key)
+        if entry is None:
+            self.entries[key] = [dict(message), None]
+        else:
+            entry[0].update(message)
+            entry[1] = None
+
+    def payload(self, key):
+        """Mensaje fusionado codificado (una vez por cambio, compartido por todos los dashboards)"""
+        entry = self.entries[key]
+        if entry[1] is None:
+            entry[1] = dumps(entry[0])
+            self.stats["encoded"] += 1
+        return entry[1]
+
+    def keys_matching(self, predicate):
+        """Claves cuyo mensaje cumple predicate (estado inicial de un dashboard nuevo)"""
+        return {key for key, entry in self.entries.items() if predicate(entry[0])}
+
+
+def parse_frame_rate(value, default=0.0):
+    """frame_rate pedido por un cliente: 0 = cada lectura, acotado a MAX_FRAME_RATE"""
+    try:
+        rate = float(value if value is not None else default)
+    except (TypeError, ValueError):
+        rate = default
+    return min(max(rate, 0.0), MAX_FRAME_RATE)
@@ -184,6 +184,12 @@ CREATE TABLE daily_stats (
     max_acceleration DECIMAL(8,4),
     activity_level ENUM('low', 'moderate', 'high') DEFAULT 'moderate',
     
+    -- Lecturas con valor de cada métrica (peso de su media)
+    temperature_n INT DEFAULT 0,
+    humidity_n INT DEFAULT 0,
+    pressure_n INT DEFAULT 0,
+    acceleration_n INT DEFAULT 0,
+    
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
     
@@ -196,6 +202,55 @@ CREATE TABLE daily_stats (
     INDEX idx_date (date)
 );
 
+-- =====================================================
+-- Tabla: Agregados por Resolución (rollups.py en la Raspberry Pi)
+-- =====================================================
+-- Un bucket terminado por dispositivo y resolución (1s, 1m, 1h, 1d). Los de 1h
+-- se combinan además en daily_stats (POST /api/rollups).
+CREATE TABLE sensor_rollups (
+    id BIGINT PRIMARY KEY AUTO_INCREMENT,
+    device_id VARCHAR(50) NOT NULL,
+    user_id VARCHAR(50),
+    resolution ENUM('1s', '1m', '1h', '1d') NOT NULL,
+    bucket_start DATETIME NOT NULL,
+    bucket_end DATETIME NOT NULL,
+    
+    -- Contadores
+    readings INT DEFAULT 0,
+    falls INT DEFAULT 0,
+    false_positives INT DEFAULT 0,
+    uptime_minutes INT DEFAULT 0,
+    
+    -- n / media / desviación / mínimo / máximo por métrica
+    temperature_n INT DEFAULT 0,
+    avg_temperature DECIMAL(5,2),
+    std_temperature DECIMAL(6,3),
+    min_temperature DECIMAL(5,2),
+    max_temperature DECIMAL(5,2),
+    humidity_n INT DEFAULT 0,
+    avg_humidity DECIMAL(5,2),
+    std_humidity DECIMAL(6,3),
+    min_humidity DECIMAL(5,2),
+    max_humidity DECIMAL(5,2),
+    pressure_n INT DEFAULT 0,
+    avg_pressure DECIMAL(7,2),
+    std_pressure DECIMAL(7,3),
+    min_pressure DECIMAL(7,2),
+    max_pressure DECIMAL(7,2),
+    acceleration_n INT DEFAULT 0,
+    avg_acceleration DECIMAL(8,4),
+    std_acceleration DECIMAL(8,4),
+    min_acceleration DECIMAL(8,4),
+    max_acceleration DECIMAL(8,4),
+    
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    
+    UNIQUE KEY unique_device_bucket (device_id, resolution, bucket_start),
+    FOREIGN KEY (device_id) REFERENCES devices(device_id) ON DELETE CASCADE,
+    
+    INDEX idx_resolution_start (resolution, bucket_start)
+);
+
 -- =====================================================
 -- Tabla: Configuración del Sistema
 -- =====================================================
@@ -260,23 +315,23 @@ WHERE fa.fall_timestamp >= DATE_SUB(NOW(), INTERVAL 7 DAY)
 ORDER BY fa.fall_timestamp DESC;
 
 -- Vista: Estadísticas del último mes
+-- Se calcula sobre daily_stats (una fila por dispositivo y día, alimentada por
+-- los agregados de la Raspberry Pi) en lugar de recorrer sensor_data.
 CREATE VIEW monthly_summary AS
 SELECT 
     u.user_id,
     u.name,
     d.device_id,
     d.device_name,
-    COUNT(fa.id) as total_falls,
-    AVG(sd.temperature) as avg_temperature,
-    AVG(sd.humidity) as avg_humidity,
-    AVG(sd.pressure) as avg_pressure,
-    MAX(sd.timestamp) as last_reading
+    COALESCE(SUM(ds.total_falls), 0) as total_falls,
+    SUM(ds.avg_temperature * ds.temperature_n) / NULLIF(SUM(ds.temperature_n), 0) as avg_temperature,
+    SUM(ds.avg_humidity * ds.humidity_n) / NULLIF(SUM(ds.humidity_n), 0) as avg_humidity,
+    SUM(ds.avg_pressure * ds.pressure_n) / NULLIF(SUM(ds.pressure_n), 0) as avg_pressure,
+    MAX(ds.updated_at) as last_reading
 FROM users u
 JOIN devices d ON u.user_id = d.user_id
-LEFT JOIN fall_alerts fa ON d.device_id = fa.device_id 
-    AND fa.fall_timestamp >= DATE_SUB(NOW(), INTERVAL 30 DAY)
-LEFT JOIN sensor_data sd ON d.device_id = sd.device_id 
-    AND sd.timestamp >= DATE_SUB(NOW(), INTERVAL 30 DAY)
+LEFT JOIN daily_stats ds ON d.device_id = ds.device_id 
+    AND ds.date >= DATE_SUB(CURDATE(), INTERVAL 30 DAY)
 GROUP BY u.user_id, d.device_id;
 
 -- =====================================================
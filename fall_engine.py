@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+"""
+Motor de detección de caídas en la Raspberry Pi sobre el IMU crudo.
+
+El Arduino solo aplica un umbral de magnitud (FALL_THRESHOLD = 2.5 g), así que
+sentarse de golpe o dar un salto también genera FALL. Este motor recibe las
+muestras IMU de cada dispositivo (tramas IMU de ble_frames.py) y busca el patrón
+completo de una caída en una ventana deslizante:
+
+  caída libre (|a| < 0.6 g) -> impacto (|a| > 2.5 g) -> inactividad (poca
+  variación de |a| y del giroscopio durante 1.5 s)
+
+Con él se confirma o rechaza el FALL del Arduino antes de escalarlo, y también
+se detectan caídas que el Arduino no reportó. Todas las ventanas de todos los
+dispositivos se evalúan en un único cálculo NumPy por tick.
+
+Dependencias:
+pip install numpy
+
+Autor: Tu nombre
+Fecha: Octubre 2025
+"""
+
+import logging
+import time
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Muestreo (las tramas IMU del Arduino van a 20 Hz: IMU_SAMPLE_PERIOD = 50 ms)
+SAMPLE_RATE = 20.0           # Hz
+WINDOW_SECONDS = 6.0         # Historia que se guarda por dispositivo
+MAX_DEVICES = 16             # Filas reservadas en la matriz de ventanas
+TICK_INTERVAL = 0.25         # Segundos entre evaluaciones
+
+# Patrón de caída
+FREEFALL_G = 0.6             # |a| por debajo de este valor = caída libre
+FREEFALL_MIN_SECONDS = 0.1   # Duración mínima de la caída libre
+IMPACT_G = 2.5               # Mismo umbral que FALL_THRESHOLD en el Arduino
+FREEFALL_TO_IMPACT = 1.0     # Segundos máximos entre caída libre e impacto
+SETTLE_SECONDS = 0.5         # Rebote tras el impacto que no se evalúa
+INACTIVITY_SECONDS = 1.5     # Duración de la inactividad tras el impacto
+INACTIVITY_STD_G = 0.15      # Desviación típica máxima de |a| en inactividad
+INACTIVITY_GYRO_DPS = 30.0   # Velocidad angular media máxima en inactividad
+
+# Verificación de los FALL del Arduino
+VERIFY_TIMEOUT = 5.0         # Sin datos IMU suficientes en este tiempo se escala igualmente
+STREAM_TIMEOUT = 3.0         # Segundos sin muestras para considerar que no hay streaming IMU
+FRAME_SAMPLES = 15           # Muestras que el Arduino acumula por trama IMU
+DUPLICATE_WINDOW = 1.0       # FALL + CAIDA del mismo evento llegan con menos de 1 s
+
+ACC_SCALE = 1000.0           # int16 -> g
+GYRO_SCALE = 10.0            # int16 -> °/s
+SCALE = np.array([1 / ACC_SCALE] * 3 + [1 / GYRO_SCALE] * 3, dtype=np.float32)
+REST_SAMPLE = np.array([0, 0, 1, 0, 0, 0], dtype=np.float32)  # relleno: en reposo
+
+
+class FallEngine:
+    """Ventanas IMU de todos los dispositivos en una matriz (dispositivos × muestras × 6)"""
+
+    def __init__(self, sample_rate=SAMPLE_RATE, window_seconds=WINDOW_SECONDS, max_devices=MAX_DEVICES,
+                 verify_timeout=VERIFY_TIMEOUT):
+        self.sample_rate = sample_rate
+        self.window_size = int(round(window_seconds * sample_rate))
+        self.max_devices = max_devices
+        self.verify_timeout = verify_timeout
+
+        self.freefall_samples = max(1, int(round(FREEFALL_MIN_SECONDS * sample_rate)))
+        self.impact_gap = max(1, int(round(FREEFALL_TO_IMPACT * sample_rate)))
+        self.settle_samples = int(round(SETTLE_SECONDS * sample_rate))
+        self.inactive_samples = max(2, int(round(INACTIVITY_SECONDS * sample_rate)))
+        # Muestras posteriores al FALL necesarias para decidir
+        self.post_samples = self.settle_samples + self.inactive_samples + FRAME_SAMPLES
+
+        self.windows = np.tile(REST_SAMPLE, (max_devices, self.window_size, 1))
+        self.totals = np.zeros(max_devices, dtype=np.int64)       # muestras recibidas por dispositivo
+        self.consumed = np.full(max_devices, -1, dtype=np.int64)  # última muestra ya usada en un evento
+        self.last_sample = np.zeros(max_devices)                  # instante de la última muestra
+        self.slots = {}    # clave de dispositivo -> fila
+        self.pending = {}  # clave -> lista de [alerta, muestras objetivo, límite, inicio]
+        self.stats = {
+            "ticks": 0, "tick_seconds": 0.0, "tick_max_ms": 0.0, "cpu_seconds": 0.0,
+            "samples": 0, "confirmed": 0, "rejected": 0, "unverified": 0, "detected": 0,
+            "verify_seconds": 0.0
+        }
+        self.started = time.monotonic()
+
+    def slot_for(self, key):
+        slot = self.slots.get(key)
+        if slot is None:
+            if len(self.slots) >= self.max_devices:
+                return None
+            slot = self.slots[key] = len(self.slots)
+        return slot
+
+    def add_samples(self, key, samples):
+        """Añade muestras (n × 6: ax ay az en g, gx gy gz en °/s) a la ventana de un dispositivo"""
+        slot = self.slot_for(key)
+        if slot is None:
+            return
+        n = len(samples)
+        if not n:
+            return
+        window = self.windows[slot]
+        if n >= self.window_size:
+            window[:] = samples[-self.window_size:]
+        else:
+            window[:-n] = window[n:]
+            window[-n:] = samples
+        self.totals[slot] += n
+        self.last_sample[slot] = time.monotonic()
+        self.stats["samples"] += n
+
+    def add_raw(self, key, samples):
+        """Añade muestras int16 de una trama IMU (acc en mg, gyro en 0.1 °/s) sin copias intermedias"""
+        raw = np.frombuffer(samples, dtype=np.int16).reshape(-1, 6)
+        self.add_samples(key, raw * SCALE)
+
+    def has_stream(self, key):
+        """Indica si el dispositivo está enviando muestras IMU"""
+        slot = self.slots.get(key)
+        return slot is not None and time.monotonic() - self.last_sample[slot] < STREAM_TIMEOUT
+
+    def verify(self, key, alert):
+        """
+        Deja una alerta FALL del Arduino pendiente de confirmación. Devuelve False
+        si ya hay otra pendiente del mismo evento (el Arduino envía FALL y CAIDA)
+        """
+        slot = self.slots[key]
+        now = time.monotonic()
+        queue = self.pending.setdefault(key, [])
+        if queue and now - queue[-1][3] < DUPLICATE_WINDOW:
+            return False
+        target = self.totals[slot] + self.post_samples
+        queue.append([alert, target, now + self.verify_timeout, now])
+        return True
+
+    def detect(self, count):
+        """
+        Busca caída libre -> impacto -> inactividad en las ventanas de los primeros
+        `count` dispositivos a la vez. Devuelve (detectado, índice del impacto,
+        magnitudes |a|, desviación tras el impacto) por dispositivo.
+        """
+        W = self.window_size
+        window = self.windows[:count]
+        mag = np.sqrt(np.einsum("dwk,dwk->dw", window[:, :, :3], window[:, :, :3]))
+        gyro = np.sqrt(np.einsum("dwk,dwk->dw", window[:, :, 3:], window[:, :, 3:]))
+        idx = np.arange(W)
+        zeros = np.zeros((count, 1))
+
+        # Caída libre: k muestras seguidas por debajo del umbral, terminando en j
+        k = self.freefall_samples
+        ff = np.concatenate([zeros, np.cumsum(mag < FREEFALL_G, axis=1)], axis=1)
+        ff_run = np.zeros((count, W), dtype=bool)
+        ff_run[:, k - 1:] = (ff[:, k:] - ff[:, :-k]) == k
+
+        # Impacto en j precedido de caída libre en [j - gap, j)
+        runs = np.concatenate([zeros, np.cumsum(ff_run, axis=1)], axis=1)
+        low = np.maximum(idx - self.impact_gap, 0)
+        preceded = (runs[:, idx] - runs[:, low]) > 0
+        impact = (mag > IMPACT_G) & preceded
+
+        # Inactividad en [j + settle, j + settle + L): medias por sumas acumuladas
+        L = self.inactive_samples
+        start = idx + self.settle_samples
+        fits = start + L <= W
+        start = np.minimum(start, W - L)
+        sums = np.concatenate([zeros, np.cumsum(mag, axis=1, dtype=np.float64)], axis=1)
+        squares = np.concatenate([zeros, np.cumsum(mag.astype(np.float64) ** 2, axis=1)], axis=1)
+        gyro_sums = np.concatenate([zeros, np.cumsum(gyro, axis=1, dtype=np.float64)], axis=1)
+        mean = (sums[:, start + L] - sums[:, start]) / L
+        std = np.sqrt(np.maximum((squares[:, start + L] - squares[:, start]) / L - mean ** 2, 0))
+        gyro_mean = (gyro_sums[:, start + L] - gyro_sums[:, start]) / L
+        inactive = fits & (std < INACTIVITY_STD_G) & (gyro_mean < INACTIVITY_GYRO_DPS)
+
+        # Solo muestras reales y no usadas ya en un evento anterior
+        absolute = self.totals[:count, None] - W + idx
+        event = impact & inactive & (absolute >= 0) & (absolute > self.consumed[:count, None])
+        first = np.argmax(event, axis=1)
+        rows = np.arange(count)
+        return event[rows, first], first, mag, std[rows, first]
+
+    def tick(self):
+        """
+        Evalúa todas las ventanas y resuelve las verificaciones pendientes.
+        Devuelve una lista de eventos (tipo, clave, alerta o None, características)
+        con tipo "confirmed", "rejected", "unverified" o "detected"
+        """
+        events = []
+        count = len(self.slots)
+        if not count:
+            return events
+
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        detected, first, mag, post_std = self.detect(count)
+        now = time.monotonic()
+
+        for key, slot in self.slots.items():
+            queue = self.pending.get(key)
+            if detected[slot]:
+                j = int(first[slot])
+                impact_at = int(self.totals[slot]) - self.window_size + j
+                self.consumed[slot] = impact_at + self.settle_samples + self.inactive_samples
+                low = max(0, j - self.impact_gap)
+                features = {
+                    "freefall_min_g": round(float(mag[slot, low:j].min()), 3),
+                    "impact_g": round(float(mag[slot, j:j + self.settle_samples + 1].max()), 3),
+                    "post_std_g": round(float(post_std[slot]), 3)
+                }
+                if queue:
+                    alert, _, _, started = queue.pop(0)
+                    self.stats["confirmed"] += 1
+                    self.stats["verify_seconds"] += now - started
+                    events.append(("confirmed", key, alert, features))
+                else:
+                    self.stats["detected"] += 1
+                    events.append(("detected", key, None, features))
+
+            # Verificaciones que ya no pueden confirmarse
+            while queue:
+                alert, target, deadline, started = queue[0]
+                if self.totals[slot] >= target:
+                    kind = "rejected"
+                elif now >= deadline:
+                    kind = "unverified"
+                else:
+                    break
+                queue.pop(0)
+                self.stats[kind] += 1
+                self.stats["verify_seconds"] += now - started
+                events.append((kind, key, alert, {}))
+
+        elapsed = time.perf_counter() - wall_start
+        self.stats["ticks"] += 1
+        self.stats["tick_seconds"] += elapsed
+        self.stats["tick_max_ms"] = max(self.stats["tick_max_ms"], 1000 * elapsed)
+        self.stats["cpu_seconds"] += time.process_time() - cpu_start
+        return events
+
+    def get_stats(self):
+        stats = dict(self.stats)
+        stats["devices"] = len(self.slots)
+        stats["pending"] = sum(len(queue) for queue in self.pending.values())
+        if stats["ticks"]:
+            stats["tick_avg_ms"] = round(1000 * stats["tick_seconds"] / stats["ticks"], 3)
+        elapsed = time.monotonic() - self.started
+        if elapsed:
+            stats["cpu_percent"] = round(100 * stats["cpu_seconds"] / elapsed, 2)
+        verified = stats["confirmed"] + stats["rejected"] + stats["unverified"]
+        if verified:
+            stats["verify_avg_ms"] = round(1000 * stats["verify_seconds"] / verified, 1)
+        stats["tick_max_ms"] = round(stats["tick_max_ms"], 3)
+        return stats
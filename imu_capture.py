@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Captura del IMU antes y después de cada caída.
+
+Cada dispositivo guarda sus últimas muestras IMU crudas (tramas IMU de
+ble_frames.py) en un buffer circular de tamaño fijo: un array int16 de
+(PRE_SECONDS + POST_SECONDS) segundos × 6 ejes, reservado una sola vez. Añadir
+muestras es una copia de memoria a memoria sobre ese array, sin crear buffers.
+
+Cuando se genera una alerta de caída se marca el instante y, al completarse la
+ventana posterior, se extrae la captura (PRE_SECONDS antes y POST_SECONDS
+después del aviso). La captura se guarda en disco como <alert_id>.json y se
+envía al dashboard como mensaje "fall_capture" con el mismo alert_id; la alerta
+sale sin esperar a la captura y lleva "imu_capture" para indicar que llegará.
+
+Formato de las muestras: int16 little-endian en base64, 6 valores por muestra
+(ax ay az en mg, gx gy gz en 0.1 °/s), igual que en la trama IMU.
+
+Autor: Tu nombre
+Fecha: Octubre 2025
+"""
+
+import base64
+import logging
+import os
+import time
+from array import array
+
+from ble_frames import ACC_SCALE, GYRO_SCALE, IMU_AXES, MAX_IMU_SAMPLES
+from message_codec import dumps, iso_now
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_RATE = 20.0          # Hz de las tramas IMU (IMU_SAMPLE_PERIOD = 50 ms en el Arduino)
+PRE_SECONDS = 5.0           # Historia anterior a la alerta que se adjunta
+POST_SECONDS = 2.0          # Ventana posterior a la alerta
+POST_TIMEOUT = 5.0          # Segundos extra antes de cerrar una captura si el streaming se corta
+CAPTURE_DIR = "captures_fall_detection"
+
+
+class ImuRingBuffer:
+    """Últimas `capacity` muestras IMU de un dispositivo en un array int16 fijo"""
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.data = array("h", bytes(2 * IMU_AXES * capacity))
+        self.view = memoryview(self.data)
+        self.total = 0  # Muestras escritas desde el inicio (índice absoluto)
+
+    def write(self, samples):
+        """Copia muestras int16 (memoryview "h" o bytes, n × 6 valores) al buffer"""
+        if not isinstance(samples, memoryview) or samples.format != "h":
+            samples = memoryview(samples).cast("B").cast("h")
+        count = len(samples) // IMU_AXES
+        size = self.capacity * IMU_AXES
+        if count > self.capacity:
+            # Solo caben las últimas: las anteriores cuentan como escritas y sobrescritas
+            samples = samples[(count - self.capacity) * IMU_AXES:count * IMU_AXES]
+            self.total += count - self.capacity
+            count = self.capacity
+        values = count * IMU_AXES
+        position = (self.total % self.capacity) * IMU_AXES
+        first = min(values, size - position)
+        self.view[position:position + first] = samples[:first]
+        if first < values:
+            self.view[:values - first] = samples[first:values]
+        self.total += count
+
+    def window(self, start, stop):
+        """Copia de las muestras con índice absoluto en [start, stop) que siguen en el buffer"""
+        start = max(start, self.total - self.capacity, 0)
+        stop = min(stop, self.total)
+        result = array("h")
+        if stop <= start:
+            return result, start
+        size = self.capacity * IMU_AXES
+        first = (start % self.capacity) * IMU_AXES
+        last = first + (stop - start) * IMU_AXES
+        result.frombytes(self.view[first:min(last, size)].cast("B"))
+        if last > size:
+            result.frombytes(self.view[:last - size].cast("B"))
+        return result, start
+
+    @property
+    def nbytes(self):
+        return self.view.nbytes
+
+
+class ImuCapture:
+    """Buffer circular y capturas pendientes de un dispositivo"""
+
+    def __init__(self, device_id, sample_rate=SAMPLE_RATE, pre_seconds=PRE_SECONDS,
+                 post_seconds=POST_SECONDS, capture_dir=CAPTURE_DIR):
+        self.device_id = device_id
+        self.sample_rate = sample_rate
+        self.pre_samples = int(round(pre_seconds * sample_rate))
+        self.post_samples = int(round(post_seconds * sample_rate))
+        self.post_timeout = post_seconds + POST_TIMEOUT
+        self.capture_dir = capture_dir
+        # Una trama de margen para que la ventana posterior no pise la anterior
+        self.buffer = ImuRingBuffer(self.pre_samples + self.post_samples + MAX_IMU_SAMPLES)
+        self.pending = []  # [alert_id, muestra del aviso, límite]
+        self.stats = {"captures": 0, "incomplete": 0, "stored": 0}
+
+    def add(self, samples):
+        self.buffer.write(samples)
+
+    def trigger(self, alert_id):
+        """
+        Marca el inicio de una captura para una alerta. Devuelve la referencia que
+        se añade a la alerta, o None si el dispositivo no envía muestras IMU
+        """
+        if not self.buffer.total:
+            return None
+        self.pending.append([alert_id, self.buffer.total, time.monotonic() + self.post_timeout])
+        return {
+            "sample_rate": self.sample_rate,
+            "pre_seconds": round(self.pre_samples / self.sample_rate, 2),
+            "post_seconds": round(self.post_samples / self.sample_rate, 2)
+        }
+
+    def collect(self):
+        """
+        Devuelve los mensajes fall_capture cuya ventana posterior ya está completa.
+        No escribe en disco: quien llama guarda cada una con store() fuera del bucle
+        de eventos
+        """
+        captures = []
+        now = time.monotonic()
+        while self.pending:
+            alert_id, at, deadline = self.pending[0]
+            complete = self.buffer.total >= at + self.post_samples
+            if not complete and now < deadline:
+                break
+            self.pending.pop(0)
+            samples, start = self.buffer.window(at - self.pre_samples, at + self.post_samples)
+            count = len(samples) // IMU_AXES
+            self.stats["captures"] += 1
+            if not complete:
+                self.stats["incomplete"] += 1
+            capture = {
+                "type": "fall_capture",
+                "timestamp": iso_now(),
+                "alert_id": alert_id,
+                "device_id": self.device_id,
+                "sample_rate": self.sample_rate,
+                "pre_samples": at - start,
+                "post_samples": count - (at - start),
+                "complete": complete,
+                "acc_scale": ACC_SCALE,
+                "gyro_scale": GYRO_SCALE,
+                "encoding": "int16le-base64",
+                "samples": base64.b64encode(samples.tobytes()).decode("ascii")
+            }
+            captures.append(capture)
+        return captures
+
+    def store(self, capture):
+        """Guarda la captura en disco para el equipo de ajuste (<alert_id>.json)"""
+        if not self.capture_dir:
+            return
+        try:
+            os.makedirs(self.capture_dir, exist_ok=True)
+            path = os.path.join(self.capture_dir, f"{capture['alert_id']}.json")
+            with open(path, "w") as f:
+                f.write(dumps(capture))
+            self.stats["stored"] += 1
+        except OSError as e:
+            logger.error(f"Error guardando la captura {capture['alert_id']}: {e}")
+
+    def get_stats(self):
+        stats = dict(self.stats)
+        stats["buffer_bytes"] = self.buffer.nbytes
+        stats["pending"] = len(self.pending)
+        return stats
@@ -0,0 +1,425 @@
+#!/usr/bin/env python3
+"""
+Generador de carga para el servidor WebSocket del dashboard.
+
+Simula miles de dispositivos virtuales desde un solo proceso asyncio (o
+repartidos en varios procesos con --processes). Los dispositivos se agrupan en
+conexiones WebSocket como lo hace ble_gateway.py (DEVICES_PER_CONNECTION por
+conexión, cada una con su WebSocketChannel) y un único planificador con un heap
+de eventos decide qué mensaje toca enviar, así el coste por mensaje no depende
+del número de dispositivos.
+
+Cada dispositivo envía lecturas sensor_data, estados system_status y alertas
+fall_alert con el mismo formato que los scripts de la Raspberry Pi (con
+"platform": "Windows" para que la base de datos los marque como simulados), a
+las frecuencias del perfil activo. Un escenario es una lista de fases en JSON:
+
+{"phases": [
+  {"name": "rampa", "duration": 60, "devices": 500, "profile": "residencia"},
+  {"name": "pico", "duration": 120, "devices": 2000, "profile": "residencia", "sensor_hz": 2},
+  {"name": "tormenta", "duration": 30, "devices": 2000, "profile": "tormenta"}
+]}
+
+Latencia extremo a extremo: cada mensaje lleva "load_sent" (time.time() al
+generarlo). En modo "observer" una conexión adicional se identifica como
+cliente React y mide cuándo le llega la retransmisión del servidor; en modo
+"echo" se mide sobre lo que devuelve la propia conexión (servidores de eco).
+Con varios procesos solo el primero abre el observador.
+
+Autor: Tu nombre
+Fecha: Octubre 2025
+"""
+
+import asyncio
+import heapq
+import json
+import logging
+import math
+import multiprocessing
+import random
+import time
+from bisect import bisect_left
+from datetime import datetime
+
+from message_codec import loads
+from ws_outbound import WebSocketChannel
+
+logger = logging.getLogger(__name__)
+
+DEVICES_PER_CONNECTION = 7   # Como un gateway con MAX_DEVICES dispositivos
+CONNECT_TIMEOUT = 30         # Segundos para abrir todas las conexiones
+REPORT_INTERVAL = 10         # Segundos entre informes de progreso
+DRAIN_SECONDS = 2            # Espera final para recibir las últimas retransmisiones
+
+# Frecuencias por dispositivo: lecturas/s, segundos entre estados y caídas/hora
+PROFILES = {
+    "residencia": {"sensor_hz": 0.5, "status_interval": 30, "falls_per_hour": 0.05},
+    "telemetria": {"sensor_hz": 10, "status_interval": 30, "falls_per_hour": 0.0},
+    "tormenta": {"sensor_hz": 0.5, "status_interval": 5, "falls_per_hour": 120},
+    "simulador": {"sensor_hz": 0.0, "status_interval": 30, "falls_per_hour": 40},
+}
+DEFAULT_PROFILE = "residencia"
+
+# Límites superiores de los buckets del histograma de latencia (ms)
+LATENCY_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, math.inf)
+
+
+class LatencyHistogram:
+    """Histograma de latencias con buckets fijos (combinable entre procesos)"""
+
+    def __init__(self):
+        self.counts = [0] * len(LATENCY_BUCKETS)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, latency_ms):
+        self.counts[bisect_left(LATENCY_BUCKETS, latency_ms)] += 1
+        self.count += 1
+        self.total += latency_ms
+        if latency_ms > self.max:
+            self.max = latency_ms
+
+    def merge(self, other):
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+
+    def percentile(self, fraction):
+        """Límite superior del bucket que contiene el percentil"""
+        target = fraction * self.count
+        seen = 0
+        for bound, count in zip(LATENCY_BUCKETS, self.counts):
+            seen += count
+            if count and seen >= target:
+                return round(min(bound, self.max), 1)
+        return 0.0
+
+    def to_dict(self):
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total / self.count, 2) if self.count else None,
+            "p50_ms": self.percentile(0.5),
+            "p95_ms": self.percentile(0.95),
+            "p99_ms": self.percentile(0.99),
+            "max_ms": round(self.max, 2)
+        }
+
+    def format(self):
+        """Tabla de texto del histograma"""
+        lines = []
+        lower = 0
+        for bound, count in zip(LATENCY_BUCKETS, self.counts):
+            if count:
+                share = count / self.count
+                label = f"{lower:g}-{bound:g} ms" if bound != math.inf else f">{lower:g} ms"
+                lines.append(f"  {label:>16} {count:>9} {share:>7.1%} {'#' * int(share * 40)}")
+            lower = bound
+        return "\n".join(lines)
+
+
+def load_scenario(path=None, profile=DEFAULT_PROFILE, devices=100, duration=60, **overrides):
+    """Fases del escenario: archivo JSON o una sola fase con el perfil indicado"""
+    if path:
+        with open(path) as f:
+            phases = json.load(f)["phases"]
+    else:
+        phases = [{"name": profile, "duration": duration, "devices": devices, "profile": profile}]
+    result = []
+    for phase in phases:
+        rates = dict(PROFILES[phase.get("profile", profile)])
+        rates.update({key: value for key, value in overrides.items() if value is not None})
+        rates.update({key: phase[key] for key in rates if key in phase})
+        result.append({"name": phase.get("name", phase.get("profile", profile)),
+                       "duration": phase["duration"], "devices": phase["devices"], **rates})
+    return result
+
+
+class VirtualDevice:
+    """Estado de un dispositivo simulado (contadores y última lectura)"""
+
+    __slots__ = ("device_id", "user_id", "channel", "fall_count", "temperature", "humidity", "pressure")
+
+    def __init__(self, device_id, user_id, channel):
+        self.device_id = device_id
+        self.user_id = user_id
+        self.channel = channel
+        self.fall_count = 0
+        self.temperature = random.uniform(20, 25)
+        self.humidity = random.uniform(35, 55)
+        self.pressure = random.uniform(1005, 1020)
+
+    def drift(self):
+        self.temperature += random.uniform(-0.05, 0.05)
+        self.humidity += random.uniform(-0.1, 0.1)
+        self.pressure += random.uniform(-0.05, 0.05)
+
+    def sensor_data(self):
+        self.drift()
+        return {
+            "type": "sensor_data",
+            "timestamp": datetime.now().isoformat(),
+            "device_id": self.device_id,
+            "user_id": self.user_id,
+            "platform": "Windows",
+            "temperature": round(self.temperature, 1),
+            "humidity": round(self.humidity, 1),
+            "pressure": round(self.pressure, 1),
+            "acceleration": {"x": round(random.gauss(0, 0.05), 3), "y": round(random.gauss(0, 0.05), 3),
+                             "z": round(random.gauss(1, 0.05), 3)},
+            "gyroscope": {"x": round(random.gauss(0, 2), 2), "y": round(random.gauss(0, 2), 2),
+                          "z": round(random.gauss(0, 2), 2)},
+            "load_sent": time.time()
+        }
+
+    def system_status(self):
+        return {
+            "type": "system_status",
+            "timestamp": datetime.now().isoformat(),
+            "ble_status": "simulated",
+            "device_name": self.device_id,
+            "device_id": self.device_id,
+            "user_id": self.user_id,
+            "platform": "Windows",
+            "fall_count": self.fall_count,
+            "baseline_acceleration": 1.0,
+            "current_acceleration": round(random.uniform(0.95, 1.05), 3),
+            "system_active": True,
+            "sensor_data": {"environment": {"temperature": round(self.temperature, 1),
+                                            "humidity": round(self.humidity, 1),
+                                            "pressure": round(self.pressure, 1)}},
+            "load_sent": time.time()
+        }
+
+    def fall_alert(self):
+        self.fall_count += 1
+        magnitude = random.uniform(2.8, 4.5)
+        return {
+            "type": "fall_alert",
+            "timestamp": datetime.now().isoformat(),
+            "alert_id": f"fall_{self.device_id}_{self.fall_count}_{int(time.time())}",
+            "device_id": self.device_id,
+            "user_id": self.user_id,
+            "platform": "Windows",
+            "severity": "high" if magnitude > 3.5 else "medium",
+            "magnitude": round(magnitude, 2),
+            "fall_count": self.fall_count,
+            "sensor_data": {"acceleration": {"x": round(magnitude * 0.6, 3), "y": round(magnitude * 0.6, 3),
+                                             "z": round(magnitude * 0.5, 3)}},
+            "load_sent": time.time()
+        }
+
+
+class LoadGenerator:
+    """Dispositivos virtuales, sus conexiones y el planificador de envíos de un proceso"""
+
+    def __init__(self, ws_url, phases, devices_per_connection=DEVICES_PER_CONNECTION,
+                 latency_mode="observer", worker=0, report_interval=REPORT_INTERVAL):
+        self.ws_url = ws_url
+        self.phases = phases
+        self.devices_per_connection = max(1, devices_per_connection)
+        self.latency_mode = latency_mode
+        self.worker = worker
+        self.report_interval = report_interval
+        self.devices = []
+        self.channels = []
+        self.observer = None
+        self.events = []  # heap de (instante, secuencia, tipo, índice del dispositivo)
+        self.sequence = 0
+        self.phase = None
+        self.max_lag = 0.0  # Retraso máximo del planificador (s): el generador no da abasto
+        self.latency = LatencyHistogram()
+        self.stats = {"sensor_data": 0, "system_status": 0, "fall_alert": 0, "rejected": 0,
+                      "connect_failures": 0, "received": 0}
+
+    def on_message(self, raw):
+        """Mide la latencia de los mensajes propios que vuelven (retransmisión o eco)"""
+        try:
+            message = loads(raw)
+        except ValueError:
+            return
+        sent = message.get("load_sent") if isinstance(message, dict) else None
+        if sent is not None:
+            self.stats["received"] += 1
+            self.latency.add(1000 * (time.time() - sent))
+
+    async def connect(self, count):
+        """Abre las conexiones de `count` dispositivos (y el observador)"""
+        connections = math.ceil(count / self.devices_per_connection)
+        on_message = self.on_message if self.latency_mode == "echo" else None
+        for index in range(connections):
+            channel = WebSocketChannel(self.ws_url, {
+                "type": "identify",
+                "client": "raspberry_fall_detection",
+                "device": "Load Generator",
+                "platform": "Windows Testing",
+                "devices": self.devices_per_connection
+            }, on_message=on_message)
+            channel.start()
+            self.channels.append(channel)
+        if self.latency_mode == "observer" and self.worker == 0:
+            self.observer = WebSocketChannel(self.ws_url, {"type": "identify", "client": "react"},
+                                             on_message=self.on_message)
+            self.observer.start()
+
+        waits = [channel.wait_connected(CONNECT_TIMEOUT) for channel in self.channels]
+        if self.observer:
+            waits.append(self.observer.wait_connected(CONNECT_TIMEOUT))
+        connected = await asyncio.gather(*waits)
+        self.stats["connect_failures"] = connected.count(False)
+
+        for index in range(count):
+            channel = self.channels[index // self.devices_per_connection]
+            device_id = f"load-{self.worker:02d}-{index:05d}"
+            self.devices.append(VirtualDevice(device_id, f"residente_{self.worker:02d}_{index:05d}", channel))
+
+    def schedule(self, when, kind, index):
+        self.sequence += 1
+        heapq.heappush(self.events, (when, self.sequence, kind, index))
+
+    def start_phase(self, phase, now):
+        """Reprograma los envíos con las frecuencias de la fase (desfase aleatorio por dispositivo)"""
+        self.events = []
+        self.phase = phase
+        for index in range(min(phase["devices"], len(self.devices))):
+            if phase["sensor_hz"] > 0:
+                self.schedule(now + random.uniform(0, 1 / phase["sensor_hz"]), "sensor_data", index)
+            if phase["status_interval"] > 0:
+                self.schedule(now + random.uniform(0, phase["status_interval"]), "system_status", index)
+            if phase["falls_per_hour"] > 0:
+                self.schedule(now + random.expovariate(phase["falls_per_hour"] / 3600), "fall_alert", index)
+
+    def next_time(self, kind, when):
+        phase = self.phase
+        if kind == "sensor_data":
+            return when + 1 / phase["sensor_hz"]
+        if kind == "system_status":
+            return when + phase["status_interval"]
+        return when + random.expovariate(phase["falls_per_hour"] / 3600)
+
+    async def run_phase(self, phase):
+        start = time.monotonic()
+        end = start + phase["duration"]
+        self.start_phase(phase, start)
+        last_report = start
+        last_counts = self.sent_total()
+        logger.info(f"Fase '{phase['name']}': {min(phase['devices'], len(self.devices))} dispositivos, "
+                    f"{phase['sensor_hz']} lecturas/s, estado cada {phase['status_interval']} s, "
+                    f"{phase['falls_per_hour']} caídas/h por dispositivo")
+        while True:
+            now = time.monotonic()
+            if now >= end:
+                break
+            # Enviar todo lo vencido y ceder el bucle para que escriban los canales
+            sent = 0
+            while self.events and self.events[0][0] <= now and sent < 1000:
+                when, _, kind, index = heapq.heappop(self.events)
+                self.max_lag = max(self.max_lag, now - when)
+                device = self.devices[index]
+                message = getattr(device, kind)()
+                if device.channel.send(message):
+                    self.stats[kind] += 1
+                else:
+                    self.stats["rejected"] += 1
+                self.schedule(self.next_time(kind, when), kind, index)
+                sent += 1
+            if now - last_report >= self.report_interval:
+                total = self.sent_total()
+                logger.info(f"[{phase['name']}] {(total - last_counts) / (now - last_report):.0f} msg/s, "
+                            f"en cola: {self.queued()}, latencia: {self.latency.to_dict()}")
+                last_report, last_counts = now, total
+            if sent < 1000:
+                delay = self.events[0][0] - time.monotonic() if self.events else end - now
+                await asyncio.sleep(min(max(delay, 0), end - now, 0.05))
+            else:
+                await asyncio.sleep(0)
+
+    def sent_total(self):
+        return self.stats["sensor_data"] + self.stats["system_status"] + self.stats["fall_alert"]
+
+    def queued(self):
+        return sum(len(channel.queue) for channel in self.channels)
+
+    async def run(self):
+        devices = max(phase["devices"] for phase in self.phases)
+        await self.connect(devices)
+        started = time.monotonic()
+        for phase in self.phases:
+            await self.run_phase(phase)
+        elapsed = time.monotonic() - started
+        await asyncio.sleep(DRAIN_SECONDS)
+
+        channel_stats = [channel.get_stats() for channel in self.channels]
+        for channel in self.channels + ([self.observer] if self.observer else []):
+            await channel.aclose(drain_timeout=0)
+        return {
+            "stats": dict(self.stats),
+            "delivered": sum(stats["sent"] for stats in channel_stats),
+            "dropped": sum(stats.get("dropped", 0) for stats in channel_stats),
+            "coalesced": sum(stats.get("coalesced", 0) for stats in channel_stats),
+            "connections": len(self.channels),
+            "devices": len(self.devices),
+            "elapsed": elapsed,
+            "max_lag": self.max_lag,
+            "latency": self.latency
+        }
+
+
+def run_worker(ws_url, phases, devices_per_connection, latency_mode, worker):
+    """Punto de entrada de cada proceso del pool"""
+    logging.getLogger("ws_outbound").setLevel(logging.WARNING)
+    generator = LoadGenerator(ws_url, phases, devices_per_connection, latency_mode, worker)
+    return asyncio.run(generator.run())
+
+
+def run_load(ws_url, phases, devices_per_connection=DEVICES_PER_CONNECTION, latency_mode="observer",
+             processes=1):
+    """Ejecuta el escenario en `processes` procesos y combina los resultados"""
+    if processes <= 1:
+        results = [run_worker(ws_url, phases, devices_per_connection, latency_mode, 0)]
+    else:
+        # Cada proceso simula su parte de los dispositivos de cada fase
+        split = [[dict(phase, devices=phase["devices"] // processes + (worker < phase["devices"] % processes))
+                  for phase in phases] for worker in range(processes)]
+        with multiprocessing.Pool(processes) as pool:
+            results = pool.starmap(run_worker, [(ws_url, split[worker], devices_per_connection, latency_mode, worker)
+                                                for worker in range(processes)])
+
+    total = {"stats": {}, "delivered": 0, "dropped": 0, "coalesced": 0, "connections": 0, "devices": 0,
+             "elapsed": 0.0, "max_lag": 0.0, "latency": LatencyHistogram()}
+    for result in results:
+        for key, value in result["stats"].items():
+            total["stats"][key] = total["stats"].get(key, 0) + value
+        for key in ("delivered", "dropped", "coalesced", "connections", "devices"):
+            total[key] += result[key]
+        total["elapsed"] = max(total["elapsed"], result["elapsed"])
+        total["max_lag"] = max(total["max_lag"], result["max_lag"])
+        total["latency"].merge(result["latency"])
+    return total
+
+
+def print_report(result):
+    stats = result["stats"]
+    generated = stats["sensor_data"] + stats["system_status"] + stats["fall_alert"]
+    elapsed = result["elapsed"] or 1
+    print("=" * 60)
+    print(f"Dispositivos: {result['devices']} en {result['connections']} conexiones "
+          f"({stats['connect_failures']} sin conectar)")
+    print(f"Generados: {generated} ({stats['sensor_data']} sensor_data, {stats['system_status']} system_status, "
+          f"{stats['fall_alert']} fall_alert) en {elapsed:.1f} s -> {generated / elapsed:.0f} msg/s")
+    print(f"Enviados por el socket: {result['delivered']} ({result['delivered'] / elapsed:.0f} msg/s), "
+          f"fusionados: {result['coalesced']}, descartados: {result['dropped'] + stats['rejected']}")
+    if result["max_lag"] > 1:
+        print(f"⚠️  El planificador llegó a ir {result['max_lag']:.1f} s por detrás: la carga pedida supera "
+              f"la capacidad del generador (más --processes o un equipo aparte para el generador)")
+    latency = result["latency"]
+    if latency.count:
+        summary = latency.to_dict()
+        print(f"Latencia extremo a extremo ({latency.count} mensajes): media {summary['mean_ms']} ms, "
+              f"p50 ≤{summary['p50_ms']:g} ms, p95 ≤{summary['p95_ms']:g} ms, p99 ≤{summary['p99_ms']:g} ms, "
+              f"máx {summary['max_ms']} ms")
+        print(latency.format())
+    else:
+        print("Latencia: sin mensajes de vuelta (¿el servidor retransmite a clientes React?)")
+    print("=" * 60)
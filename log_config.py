@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Modos de logging para los scripts de la Raspberry Pi.
+
+Con --log-mode full (por defecto) todo se escribe en el momento, desde el hilo
+que registra, como hasta ahora. Con --log-mode fast:
+
+- El registro solo crea el LogRecord y lo deja en una cola; el formateo y la
+  escritura (consola, archivo en la tarjeta SD...) los hace un QueueListener en
+  un hilo aparte. Los argumentos inmutables (str, números) se formatean en ese
+  hilo; los mutables (dict, list) en el momento, para no ver cambios posteriores.
+- Los logs repetitivos de cada mensaje llevan una clave de muestreo
+  (extra=sampled("clave")). De cada clave se escriben como mucho SAMPLE_LIMIT
+  registros por ventana de SAMPLE_WINDOW segundos; el primero de la ventana
+  siguiente indica cuántos se omitieron.
+- Los WARNING y superiores nunca se muestrean: las alertas de caída se
+  escriben siempre completas.
+
+Con --ws-trace se activa el log de depuración de la librería websockets (tramas
+enviadas y recibidas), equivalente al antiguo websocket.enableTrace(True).
+
+Uso:
+python3 raspberry_fall_detection.py --log-mode fast --log-sample 5/30
+python3 benchmarks/bench_logging.py   # CPU por notificación con cada modo
+
+Autor: Tu nombre
+Fecha: Octubre 2025
+"""
+
+import atexit
+import logging
+import queue
+import threading
+import time
+from logging.handlers import QueueHandler, QueueListener
+
+logger = logging.getLogger(__name__)
+
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+LOG_MODES = ("full", "fast")
+SAMPLE_LIMIT = 5      # Registros por clave y ventana en modo fast
+SAMPLE_WINDOW = 30.0  # Segundos de cada ventana de muestreo
+
+# Tipos de argumento que se pueden formatear más tarde en el hilo del listener
+IMMUTABLE_ARGS = (str, int, float, bool, bytes, type(None))
+
+
+def sampled(key):
+    """extra= de un log repetitivo del camino caliente (crearlo una vez, no en cada llamada)"""
+    return {"sample": key}
+
+
+def parse_sample(value):
+    """'5/30' -> (5, 30.0): registros por clave y segundos de ventana"""
+    limit, _, window = value.partition("/")
+    return int(limit), float(window) if window else SAMPLE_WINDOW
+
+
+class SampleFilter(logging.Filter):
+    """Deja pasar como mucho limit registros por clave de muestreo y ventana"""
+
+    def __init__(self, limit=SAMPLE_LIMIT, window=SAMPLE_WINDOW):
+        super().__init__()
+        self.limit = limit
+        self.window = window
+        self.windows = {}  # clave -> [inicio de la ventana, escritos, omitidos]
+        self.skipped = {}  # clave -> omitidos en total
+        self.lock = threading.Lock()
+
+    def filter(self, record):
+        key = getattr(record, "sample", None)
+        if key is None or record.levelno >= logging.WARNING:
+            return True
+        current = time.monotonic()
+        with self.lock:
+            state = self.windows.get(key)
+            if state is None or current - state[0] >= self.window:
+                if state is not None and state[2]:
+                    record.msg = f"{record.msg} ({state[2]} similares omitidos en {self.window:g}s)"
+                state = self.windows[key] = [current, 0, 0]
+            if state[1] < self.limit:
+                state[1] += 1
+                return True
+            state[2] += 1
+            self.skipped[key] = self.skipped.get(key, 0) + 1
+            return False
+
+
+class DeferredQueueHandler(QueueHandler):
+    """QueueHandler que deja el formateo del mensaje al hilo del listener"""
+
+    def prepare(self, record):
+        args = record.args
+        # Con un único dict como argumento, LogRecord guarda el propio dict en args
+        if args and (isinstance(args, dict) or not all(isinstance(value, IMMUTABLE_ARGS) for value in args)):
+            record.msg = record.getMessage()
+            record.args = None
+        return record
+
+
+class FastLogging:
+    """Cola + QueueListener sobre los handlers actuales del logger raíz"""
+
+    def __init__(self, limit=SAMPLE_LIMIT, window=SAMPLE_WINDOW):
+        self.queue = queue.SimpleQueue()
+        self.handler = DeferredQueueHandler(self.queue)
+        self.sampler = SampleFilter(limit, window)
+        self.handler.addFilter(self.sampler)
+        self.handlers = []
+        self.listener = None
+
+    def start(self):
+        root = logging.getLogger()
+        self.handlers = root.handlers[:]
+        if not self.handlers:
+            console = logging.StreamHandler()
+            console.setFormatter(logging.Formatter(LOG_FORMAT))
+            self.handlers = [console]
+        for handler in self.handlers:
+            root.removeHandler(handler)
+        root.addHandler(self.handler)
+        self.listener = QueueListener(self.queue, *self.handlers, respect_handler_level=True)
+        self.listener.start()
+        atexit.register(self.stop)
+        return self
+
+    def get_stats(self):
+        with self.sampler.lock:
+            return dict(self.sampler.skipped)
+
+    def stop(self):
+        """Vacía la cola y devuelve los handlers originales al logger raíz"""
+        if self.listener is None:
+            return
+        skipped = self.get_stats()
+        if skipped:
+            logger.info(f"Logs omitidos por muestreo: {skipped}")
+        self.listener.stop()
+        self.listener = None
+        root = logging.getLogger()
+        root.removeHandler(self.handler)
+        for handler in self.handlers:
+            root.addHandler(handler)
+
+
+def configure_logging(mode="full", sample=(SAMPLE_LIMIT, SAMPLE_WINDOW), ws_trace=False):
+    """Aplica el modo de logging; devuelve el FastLogging a detener al salir (o None)"""
+    if ws_trace:
+        logging.getLogger("websockets").setLevel(logging.DEBUG)
+    if mode != "fast":
+        return None
+    return FastLogging(*sample).start()
+
+
+def add_logging_arguments(parser):
+    """Opciones de logging comunes a los scripts de la Raspberry Pi"""
+    parser.add_argument("--log-mode", choices=LOG_MODES, default="full",
+                        help="full: todo en el momento; fast: cola en otro hilo y muestreo de los logs por mensaje")
+    parser.add_argument("--log-sample", type=parse_sample, default=(SAMPLE_LIMIT, SAMPLE_WINDOW),
+                        metavar="N/SEG",
+                        help=f"En modo fast, registros por tipo de mensaje y ventana (por defecto "
+                             f"{SAMPLE_LIMIT}/{SAMPLE_WINDOW:g})")
+    parser.add_argument("--ws-trace", action="store_true",
+                        help="Log de depuración de la librería websockets (tramas enviadas y recibidas)")
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Codec de mensajes JSON del sistema de detección de caídas.
+
+Entrada (Arduino → Raspberry Pi): normaliza en una sola pasada los formatos
+compacto ({"t":"FALL","sev":...,"acc":[...]}) y extendido ({"type":"FALL_ALERT",
+"severity":...,"acceleration":{...}}) a los nombres de parámetro de los
+handlers, para despacharlos con una tabla indexada por tipo de mensaje.
+
+Salida (Raspberry Pi → WebSocket): JSON compacto con orjson si está instalado
+(o el encoder C de la librería estándar) y timestamps ISO cacheados por segundo.
+Se probaron plantillas precompiladas por forma de mensaje, pero en Python no
+mejoran a un encoder en C: ver benchmarks/bench_message_codec.py.
+
+Dependencias opcionales:
+pip install orjson
+
+Autor: Tu nombre
+Fecha: Octubre 2025
+"""
+
+import json
+import time
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+if orjson is not None:
+    JSON_BACKEND = "orjson"
+
+    def dumps_bytes(obj):
+        return orjson.dumps(obj)
+
+    def dumps(obj):
+        return orjson.dumps(obj).decode("utf-8")
+
+    loads = orjson.loads
+else:
+    JSON_BACKEND = "json"
+    _encoder = json.JSONEncoder(separators=(",", ":"))
+
+    def dumps(obj):
+        return _encoder.encode(obj)
+
+    def dumps_bytes(obj):
+        return _encoder.encode(obj).encode("utf-8")
+
+    loads = json.loads
+
+
+# ---------------------------------------------------------------------------
+# Entrada: normalización de mensajes del Arduino
+# ---------------------------------------------------------------------------
+
+# Tipo recibido -> tipo canónico usado en la tabla de despacho
+MESSAGE_KINDS = {
+    "FALL": "FALL",
+    "FALL_ALERT": "FALL",
+    "STATUS": "STATUS",
+}
+
+# Clave compacta o extendida -> nombre del parámetro del handler
+FIELD_ALIASES = {
+    "ts": "timestamp", "timestamp": "timestamp",
+    "fc": "fall_count", "fall_count": "fall_count",
+    "sev": "severity", "severity": "severity",
+    "mag": "magnitude", "magnitude": "magnitude",
+    "acc": "acc_data", "acceleration": "acc_data",
+    "gyro": "gyro_data", "gyroscope": "gyro_data",
+    "env": "env_data", "environment": "env_data",
+    "sa": "system_active", "system_active": "system_active",
+    "bl": "baseline", "baseline": "baseline",
+    "ca": "current_accel", "current_accel": "current_accel",
+}
+
+# Campos del formato extendido que llegan como objeto en vez de lista
+VECTOR_KEYS = {
+    "acc_data": ("x", "y", "z"),
+    "gyro_data": ("x", "y", "z"),
+    "env_data": ("temperature", "humidity", "pressure"),
+}
+
+# Valores por defecto de cada tipo (también definen qué campos acepta)
+FIELD_DEFAULTS = {
+    "FALL": {
+        "severity": "medium", "magnitude": 0, "fall_count": 0, "timestamp": 0,
+        "acc_data": [0, 0, 0], "env_data": [], "gyro_data": None
+    },
+    "STATUS": {
+        "system_active": True, "fall_count": 0, "baseline": 1.0, "current_accel": 1.0,
+        "timestamp": 0, "env_data": []
+    },
+}
+
+
+def normalize_message(json_data):
+    """
+    Devuelve (tipo, campos) con los nombres de parámetro de los handlers, o
+    (None, None) si el tipo no se reconoce. Recorre el mensaje una sola vez.
+    """
+    kind = MESSAGE_KINDS.get(json_data.get("t") or json_data.get("type"))
+    if kind is None:
+        return None, None
+    fields = dict(FIELD_DEFAULTS[kind])
+    for key, value in json_data.items():
+        name = FIELD_ALIASES.get(key)
+        if name is None or name not in fields:
+            continue
+        if value.__class__ is dict:
+            if name == "acc_data":
+                # En el formato extendido la magnitud viaja dentro de "acceleration"
+                fields["magnitude"] = fields["magnitude"] or value.get("magnitude", 0)
+            value = [value.get(axis, 0) for axis in VECTOR_KEYS[name]]
+        fields[name] = value
+    return kind, fields
+
+
+# ---------------------------------------------------------------------------
+# Salida
+# ---------------------------------------------------------------------------
+
+_iso_second = None
+_iso_prefix = ""
+
+
+def iso_now():
+    """Equivalente a datetime.now().isoformat() que solo formatea la fecha una vez por segundo"""
+    global _iso_second, _iso_prefix
+    now = time.time()
+    second = int(now)
+    if second != _iso_second:
+        _iso_second = second
+        _iso_prefix = time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(second))
+    return f"{_iso_prefix}.{int((now - second) * 1000000):06d}"
+
+
+def encode_message(message):
+    """Serializa un mensaje saliente (JSON compacto con el backend más rápido disponible)"""
+    return dumps(message)
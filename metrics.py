@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+"""
+Métricas de latencia y contadores en formato de texto de Prometheus.
+
+Los scripts de la Raspberry Pi marcan cada notificación BLE (o línea serial)
+al recibirla y registran la duración de cada etapa en el histograma
+pipeline_stage_seconds:
+
+  decode      recepción -> mensaje decodificado (trama binaria, JSON o texto)
+  handler     decodificado -> mensaje encolado en el canal WebSocket
+  queue       encolado -> escrito en el socket (espera en la cola de prioridad)
+  end_to_end  recepción -> escrito en el socket
+
+Registrar una observación es una búsqueda binaria y tres sumas bajo un lock,
+del orden de un microsegundo. Los contadores que ya existen (mensajes enviados,
+descartados, reconexiones, profundidad de la cola...) no se duplican: se leen
+con funciones en el momento del scrape.
+
+MetricsServer sirve el registro en http://<host>:<puerto>/metrics:
+python3 ble_gateway.py --metrics-port 9108
+curl http://localhost:9108/metrics
+
+Autor: Tu nombre
+Fecha: Octubre 2025
+"""
+
+import logging
+import threading
+import time
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+logger = logging.getLogger(__name__)
+
+METRICS_PORT = 9108
+# Límites de los buckets de latencia (segundos): de 50 µs a 10 s
+LATENCY_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                   0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+now = time.perf_counter  # Reloj de todas las marcas de tiempo del pipeline
+
+
+def format_labels(labelnames, values, extra=None):
+    pairs = list(zip(labelnames, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"') for _, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+
+def format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(int(value))
+
+
+class HistogramChild:
+    """Histograma de una combinación de etiquetas"""
+
+    __slots__ = ("bounds", "counts", "sum", "count", "lock")
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self.lock = threading.Lock()
+
+    def observe(self, seconds):
+        index = bisect_left(self.bounds, seconds)
+        with self.lock:
+            self.counts[index] += 1
+            self.sum += seconds
+            self.count += 1
+
+    def snapshot(self):
+        with self.lock:
+            return list(self.counts), self.sum, self.count
+
+
+class Histogram:
+    """Familia de histogramas con etiquetas (labels() devuelve el hijo, cachearlo en el camino caliente)"""
+
+    type = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.bounds = tuple(buckets)
+        self.children = {}
+        self.lock = threading.Lock()
+
+    def labels(self, *values):
+        child = self.children.get(values)
+        if child is None:
+            with self.lock:
+                child = self.children.setdefault(values, HistogramChild(self.bounds))
+        return child
+
+    def observe(self, seconds):
+        self.labels().observe(seconds)
+
+    def collect(self):
+        lines = []
+        for values, child in sorted(self.children.items()):
+            counts, total, count = child.snapshot()
+            cumulative = 0
+            for bound, bucket in zip(self.bounds + (float("inf"),), counts):
+                cumulative += bucket
+                labels = format_labels(self.labelnames, values, ("le", format_value(bound)))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = format_labels(self.labelnames, values)
+            lines.append(f"{self.name}_sum{labels} {format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class Counter:
+    """Contador con etiquetas que se incrementa en el código"""
+
+    type = "counter"
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def inc(self, *values, amount=1):
+        with self.lock:
+            self.values[values] = self.values.get(values, 0) + amount
+
+    def collect(self):
+        return [f"{self.name}{format_labels(self.labelnames, values)} {format_value(value)}"
+                for values, value in sorted(self.values.items())]
+
+
+class Callback:
+    """Contador o gauge cuyo valor se lee al hacer el scrape"""
+
+    def __init__(self, name, documentation, metric_type, function, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.type = metric_type
+        self.function = function  # Devuelve un número o {valores de etiquetas: número}
+        self.labelnames = tuple(labelnames)
+
+    def collect(self):
+        try:
+            result = self.function()
+        except Exception as e:
+            logger.debug(f"Métrica {self.name} no disponible: {e}")
+            return []
+        if result is None:
+            return []
+        if not isinstance(result, dict):
+            result = {(): result}
+        return [f"{self.name}{format_labels(self.labelnames, values)} {format_value(value)}"
+                for values, value in sorted(result.items()) if value is not None]
+
+
+class MetricsRegistry:
+    """Conjunto de métricas de un proceso"""
+
+    def __init__(self):
+        self.metrics = {}
+        self.lock = threading.Lock()
+
+    def register(self, metric):
+        """Registra una métrica (una con el mismo nombre se sustituye)"""
+        with self.lock:
+            self.metrics[metric.name] = metric
+        return metric
+
+    def histogram(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        existing = self.metrics.get(name)
+        return existing if existing is not None else self.register(
+            Histogram(name, documentation, labelnames, buckets))
+
+    def counter(self, name, documentation, labelnames=()):
+        existing = self.metrics.get(name)
+        return existing if existing is not None else self.register(Counter(name, documentation, labelnames))
+
+    def counter_func(self, name, documentation, function, labelnames=()):
+        return self.register(Callback(name, documentation, "counter", function, labelnames))
+
+    def gauge_func(self, name, documentation, function, labelnames=()):
+        return self.register(Callback(name, documentation, "gauge", function, labelnames))
+
+    def render(self):
+        """Texto de exposición de Prometheus (versión 0.0.4)"""
+        with self.lock:
+            metrics = list(self.metrics.values())
+        lines = []
+        for metric in metrics:
+            samples = metric.collect()
+            if not samples:
+                continue
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            lines.extend(samples)
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+# Etapas del pipeline BLE/serial -> WebSocket (hijos cacheados para el camino caliente)
+PIPELINE_STAGES = REGISTRY.histogram(
+    "pipeline_stage_seconds",
+    "Duración de cada etapa desde la recepción BLE/serial hasta la escritura en el WebSocket",
+    ("stage",)
+)
+STAGE_DECODE = PIPELINE_STAGES.labels("decode")
+STAGE_HANDLER = PIPELINE_STAGES.labels("handler")
+STAGE_QUEUE = PIPELINE_STAGES.labels("queue")
+STAGE_END_TO_END = PIPELINE_STAGES.labels("end_to_end")
+
+
+def register_channel(channel, registry=REGISTRY):
+    """Contadores y profundidad de la cola de un WebSocketChannel (ws_outbound.py)"""
+    def stat(key):
+        return lambda: channel.get_stats().get(key)
+
+    registry.counter_func("ws_messages_sent_total", "Mensajes escritos en el WebSocket", stat("sent"))
+    registry.counter_func("ws_messages_enqueued_total", "Mensajes aceptados en la cola saliente", stat("enqueued"))
+    registry.counter_func("ws_messages_coalesced_total", "Telemetría sustituida en la cola por una más reciente",
+                          stat("coalesced"))
+    registry.counter_func("ws_messages_dropped_total", "Mensajes descartados por la cola llena", stat("dropped"))
+    registry.counter_func("ws_reconnects_total", "Reconexiones del WebSocket", stat("reconnects"))
+    registry.gauge_func("ws_connected", "1 si el WebSocket está conectado", lambda: int(channel.connected))
+    registry.gauge_func("ws_queue_depth", "Mensajes pendientes por prioridad (0 = alertas)",
+                        lambda: {(str(level),): depth for level, depth in enumerate(channel.queue.depth())},
+                        ("priority",))
+    if channel.spool is not None:
+        registry.gauge_func("ws_spool_pending", "Mensajes pendientes en el spool en disco",
+                            lambda: len(channel.spool))
+
+
+def register_fanout(fanout, registry=REGISTRY):
+    """Entregas y colas por destino de un AlertFanout (alert_fanout.py)"""
+    def deliveries():
+        return {(name, result): value for name, stats in fanout.get_stats().items()
+                for result, value in stats.items() if result != "queued"}
+
+    registry.counter_func("alert_deliveries_total", "Alertas por destino y resultado", deliveries,
+                          ("sink", "result"))
+    registry.gauge_func("alert_queue_depth", "Alertas pendientes por destino",
+                        lambda: {(name,): stats["queued"] for name, stats in fanout.get_stats().items()},
+                        ("sink",))
+
+
+def register_stats(prefix, get_stats, keys, registry=REGISTRY, metric_type="counter"):
+    """Publica valores numéricos de un get_stats() existente como métricas prefix_<clave>"""
+    for key in keys:
+        name = f"{prefix}_{key}_total" if metric_type == "counter" else f"{prefix}_{key}"
+        function = (lambda key=key: get_stats().get(key))
+        if metric_type == "counter":
+            registry.counter_func(name, f"{prefix}: {key}", function)
+        else:
+            registry.gauge_func(name, f"{prefix}: {key}", function)
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        logger.debug(format % args)
+
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/metrics", "/"):
+            self.send_error(404)
+            return
+        body = self.server.registry.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class MetricsServer(ThreadingHTTPServer):
+    """Endpoint HTTP /metrics en un hilo demonio"""
+
+    daemon_threads = True
+
+    def __init__(self, port=METRICS_PORT, host="0.0.0.0", registry=REGISTRY):
+        super().__init__((host, port), MetricsHandler)
+        self.registry = registry
+        self.thread = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self.serve_forever, name="metrics", daemon=True)
+        self.thread.start()
+        logger.info(f"Métricas en http://{self.server_address[0]}:{self.server_address[1]}/metrics")
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+"""
+Agregación en streaming de las lecturas por dispositivo (rollups).
+
+Cada lectura entra en un bucket de 1 s; al cerrarse, el bucket se combina en el
+de 1 min, este en el de 1 h y este en el de 1 día (hora local, igual que
+daily_stats.date). Cada métrica guarda n, media, varianza (algoritmo de
+Welford), mínimo y máximo, que se combinan sin perder precisión, además de los
+contadores de lecturas, caídas y falsos positivos.
+
+Solo se envían los buckets terminados de las resoluciones configuradas (por
+defecto 1 min, 1 h y 1 día) como mensajes "sensor_rollup"; el servidor los
+guarda en sensor_rollups y combina los de 1 h en daily_stats, así MySQL no
+tiene que recalcular las estadísticas diarias sobre millones de filas de
+sensor_data.
+
+Ejemplo de mensaje:
+{"type":"sensor_rollup","device_id":"AA:BB:...","user_id":"cliente123",
+ "resolution":"1m","start":"2025-10-14 10:31:00","end":"2025-10-14 10:32:00",
+ "date":"2025-10-14","readings":30,"falls":0,"false_positives":0,"minutes":1,
+ "metrics":{"temperature":{"n":30,"mean":22.51,"std":0.03,"min":22.4,"max":22.6},...}}
+
+Autor: Tu nombre
+Fecha: Octubre 2025
+"""
+
+import logging
+import math
+import time
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+# Resoluciones de agregación (nombre, segundos), de la más fina a la más gruesa
+RESOLUTIONS = (("1s", 1), ("1m", 60), ("1h", 3600), ("1d", 86400))
+SHIP_RESOLUTIONS = ("1m", "1h", "1d")   # Buckets que se envían al servidor
+METRICS = ("temperature", "humidity", "pressure", "acceleration")
+CLOSE_GRACE = 2.0            # Segundos de margen para lecturas que llegan tarde
+ROLLUP_POLL_INTERVAL = 1.0   # Segundos entre comprobaciones de buckets vencidos
+
+
+def period(timestamp, size):
+    """Inicio y fin del bucket de `size` segundos que contiene timestamp (hora local)"""
+    offset = time.localtime(timestamp).tm_gmtoff
+    start = (timestamp + offset) // size * size - offset
+    return start, start + size
+
+
+def local_time(timestamp):
+    return datetime.fromtimestamp(timestamp).strftime("%Y-%m-%d %H:%M:%S")
+
+
+class Welford:
+    """n, media, suma de cuadrados de las desviaciones, mínimo y máximo combinables"""
+
+    __slots__ = ("count", "mean", "m2", "min", "max")
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    def merge(self, other):
+        """Combina otro acumulador (Chan et al.): mismo resultado que añadir sus valores"""
+        if not other.count:
+            return
+        if not self.count:
+            self.count, self.mean, self.m2 = other.count, other.mean, other.m2
+            self.min, self.max = other.min, other.max
+            return
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / count
+        self.m2 += other.m2 + delta * delta * self.count * other.count / count
+        self.count = count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    @property
+    def variance(self):
+        return self.m2 / self.count if self.count else 0.0
+
+    def to_dict(self):
+        if not self.count:
+            return None
+        return {
+            "n": self.count,
+            "mean": round(self.mean, 4),
+            "std": round(math.sqrt(self.variance), 4),
+            "min": round(self.min, 4),
+            "max": round(self.max, 4)
+        }
+
+
+class Bucket:
+    """Agregados de un dispositivo en un intervalo [start, end)"""
+
+    __slots__ = ("start", "end", "readings", "falls", "false_positives", "minutes", "metrics")
+
+    def __init__(self, start, end):
+        self.start = start
+        self.end = end
+        self.readings = 0
+        self.falls = 0
+        self.false_positives = 0
+        self.minutes = 0   # Minutos con lecturas (uptime_minutes de daily_stats)
+        self.metrics = [Welford() for _ in METRICS]
+
+    def merge(self, other):
+        self.readings += other.readings
+        self.falls += other.falls
+        self.false_positives += other.false_positives
+        self.minutes += other.minutes
+        for mine, theirs in zip(self.metrics, other.metrics):
+            mine.merge(theirs)
+
+
+class DeviceRollup:
+    """Buckets abiertos de un dispositivo, uno por resolución"""
+
+    def __init__(self, device_id, user_id=None):
+        self.device_id = device_id
+        self.user_id = user_id
+        self.open = [None] * len(RESOLUTIONS)
+
+    def current(self, timestamp, finished):
+        """Bucket de 1 s para timestamp (cierra el anterior si ya terminó)"""
+        bucket = self.open[0]
+        if bucket is None or timestamp >= bucket.end:
+            if bucket is not None:
+                self.close(0, finished)
+            bucket = self.open[0] = Bucket(*period(timestamp, RESOLUTIONS[0][1]))
+        return bucket
+
+    def close(self, level, finished):
+        """Cierra el bucket de un nivel y lo combina en el nivel superior"""
+        bucket = self.open[level]
+        self.open[level] = None
+        name, size = RESOLUTIONS[level]
+        if size == 60:
+            bucket.minutes = int(bucket.readings > 0)
+        finished.append((name, bucket))
+        if level + 1 == len(RESOLUTIONS):
+            return
+        parent = self.open[level + 1]
+        if parent is not None and bucket.start >= parent.end:
+            self.close(level + 1, finished)
+            parent = None
+        if parent is None:
+            parent = self.open[level + 1] = Bucket(*period(bucket.start, RESOLUTIONS[level + 1][1]))
+        parent.merge(bucket)
+
+    def expire(self, now, finished, force=False):
+        """Cierra los buckets cuyo intervalo terminó (todos con force)"""
+        for level in range(len(RESOLUTIONS)):
+            bucket = self.open[level]
+            if bucket is not None and (force or now >= bucket.end + CLOSE_GRACE):
+                self.close(level, finished)
+
+
+class RollupAggregator:
+    """Rollups de todos los dispositivos de un proceso (compartido en modo gateway)"""
+
+    def __init__(self, ship_resolutions=SHIP_RESOLUTIONS):
+        self.ship_resolutions = set(ship_resolutions)
+        self.devices = {}
+        self.finished = []  # (dispositivo, resolución, bucket) pendientes de enviar
+        self.stats = {"readings": 0, "falls": 0, "buckets": 0, "shipped": 0}
+
+    def device(self, device_id, user_id=None):
+        rollup = self.devices.get(device_id)
+        if rollup is None:
+            rollup = self.devices[device_id] = DeviceRollup(device_id, user_id)
+        elif user_id is not None:
+            rollup.user_id = user_id
+        return rollup
+
+    def add_values(self, device_id, timestamp=None, temperature=None, humidity=None, pressure=None,
+                   acceleration=None, user_id=None):
+        """Añade una lectura (acceleration es la magnitud en g)"""
+        rollup = self.device(device_id, user_id)
+        finished = []
+        bucket = rollup.current(timestamp if timestamp is not None else time.time(), finished)
+        bucket.readings += 1
+        for accumulator, value in zip(bucket.metrics, (temperature, humidity, pressure, acceleration)):
+            if value is not None:
+                accumulator.add(value)
+        self.stats["readings"] += 1
+        if finished:
+            self.collect(rollup, finished)
+
+    def add_reading(self, device_id, reading, timestamp=None, user_id=None):
+        """Añade una lectura en el formato estándar de sensor_data"""
+        acc = reading.get("acceleration")
+        magnitude = None
+        if acc:
+            magnitude = math.sqrt(acc.get("x", 0) ** 2 + acc.get("y", 0) ** 2 + acc.get("z", 0) ** 2)
+        self.add_values(device_id, timestamp, reading.get("temperature"), reading.get("humidity"),
+                        reading.get("pressure"), magnitude, user_id)
+
+    def add_fall(self, device_id, timestamp=None, false_positive=False, user_id=None):
+        """Cuenta una caída (o un FALL descartado por la verificación)"""
+        rollup = self.device(device_id, user_id)
+        finished = []
+        bucket = rollup.current(timestamp if timestamp is not None else time.time(), finished)
+        if false_positive:
+            bucket.false_positives += 1
+        else:
+            bucket.falls += 1
+            self.stats["falls"] += 1
+        if finished:
+            self.collect(rollup, finished)
+
+    def collect(self, rollup, finished):
+        self.stats["buckets"] += len(finished)
+        for name, bucket in finished:
+            if name in self.ship_resolutions:
+                self.finished.append((rollup, name, bucket))
+
+    def poll(self, now=None, force=False):
+        """Devuelve los mensajes sensor_rollup de los buckets terminados"""
+        now = time.time() if now is None else now
+        for rollup in self.devices.values():
+            finished = []
+            rollup.expire(now, finished, force)
+            if finished:
+                self.collect(rollup, finished)
+        messages = [self.message(rollup, name, bucket) for rollup, name, bucket in self.finished]
+        self.finished = []
+        self.stats["shipped"] += len(messages)
+        return messages
+
+    def flush(self):
+        """Cierra todos los buckets abiertos (al detener el proceso)"""
+        return self.poll(force=True)
+
+    def message(self, rollup, resolution, bucket):
+        return {
+            "type": "sensor_rollup",
+            "device_id": rollup.device_id,
+            "user_id": rollup.user_id,
+            "resolution": resolution,
+            "start": local_time(bucket.start),
+            "end": local_time(bucket.end),
+            "date": datetime.fromtimestamp(bucket.start).strftime("%Y-%m-%d"),
+            "readings": bucket.readings,
+            "falls": bucket.falls,
+            "false_positives": bucket.false_positives,
+            "minutes": bucket.minutes,
+            "metrics": {name: accumulator.to_dict() for name, accumulator in zip(METRICS, bucket.metrics)}
+        }
+
+    def get_stats(self):
+        stats = dict(self.stats)
+        stats["devices"] = len(self.devices)
+        return stats
@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+"""
+Lector serial en streaming para el Arduino Nano 33 BLE Sense.
+
+Un hilo dedicado lee el puerto en bloques (todo lo que haya en el buffer de la
+UART de una vez), separa las líneas de forma incremental y parsea en lote las
+líneas "clave:valor" (o JSON). Las lecturas se entregan por una cola acotada,
+así el bucle de envío nunca frena la lectura y nada se acumula en la UART.
+
+Formato de línea en modo streaming (arduino_ble_sense_reader.ino, STREAM_MODE):
+  seq:1234,ms:56789,acc_x:0.012,acc_y:-0.998,acc_z:0.034,gyro_x:1.22,gyro_y:-0.61,gyro_z:0.12
+  (temp, hum y press se añaden una vez por segundo)
+
+El contador seq permite medir las lecturas perdidas en el enlace serial; las
+que se descartan porque la cola está llena se cuentan aparte.
+
+Dependencias:
+pip install pyserial
+
+Autor: Tu nombre
+Fecha: Octubre 2025
+"""
+
+import json
+import logging
+import queue
+import threading
+import time
+
+import serial
+
+from metrics import STAGE_DECODE
+from stream_replay import KIND_SERIAL_CHUNK
+
+logger = logging.getLogger(__name__)
+
+STREAM_BAUD_RATE = 460800    # ~46 kB/s: holgura para >100 Hz con líneas de ~100 bytes
+READ_TIMEOUT = 0.02          # Segundos que espera read() si no hay datos
+READ_CHUNK = 4096            # Bytes mínimos pedidos en cada lectura
+MAX_LINE = 1024              # Líneas más largas se consideran basura y se descartan
+STREAM_QUEUE_SIZE = 1000     # Bloques de lecturas pendientes de enviar
+SEQ_MODULO = 65536           # El Arduino envía seq como uint16
+CLOCK_RESYNC = 1.0           # Segundos de deriva tolerados entre reloj del Arduino y del host
+
+IMU_KEYS = frozenset(("acc_x", "acc_y", "acc_z", "gyro_x", "gyro_y", "gyro_z"))  # Obligatorias en cada línea
+KV_KEYS = IMU_KEYS | {"seq", "ms", "temp", "hum", "press"}
+
+
+class LineFramer:
+    """Separa un flujo de bytes en líneas completas de forma incremental"""
+
+    def __init__(self, max_line=MAX_LINE):
+        self.max_line = max_line
+        self.buffer = bytearray()
+        self.discarded = 0
+
+    def feed(self, chunk):
+        """Añade bytes y devuelve el bloque de líneas completas (bytes, sin la última línea parcial)"""
+        self.buffer += chunk
+        end = self.buffer.rfind(b"\n")
+        if end < 0:
+            if len(self.buffer) > self.max_line:
+                self.buffer.clear()
+                self.discarded += 1
+            return b""
+        block = bytes(self.buffer[:end])
+        del self.buffer[:end + 1]
+        return block
+
+
+def reading_from_values(data):
+    """Convierte un dict clave:valor del Arduino al formato estándar de sensor_data"""
+    return {
+        "temperature": data.get("temp"),
+        "humidity": data.get("hum"),
+        "pressure": data.get("press"),
+        "acceleration": {
+            "x": data.get("acc_x", 0),
+            "y": data.get("acc_y", 0),
+            "z": data.get("acc_z", 0)
+        },
+        "gyroscope": {
+            "x": data.get("gyro_x", 0),
+            "y": data.get("gyro_y", 0),
+            "z": data.get("gyro_z", 0)
+        }
+    }
+
+
+def parse_kv_line(line):
+    """
+    Parsea "temp:25.5,hum:60.2,..." en un dict de floats (una sola pasada en C).
+    Lanza ValueError si la línea está cortada (p. ej. la primera tras abrir el
+    puerto) o trae claves desconocidas, repetidas o le falta algún eje del IMU
+    """
+    fields = line.replace(":", ",").split(",")
+    if len(fields) % 2:
+        raise ValueError(f"Línea incompleta: {line!r}")
+    values = dict(zip(fields[::2], map(float, fields[1::2])))
+    keys = values.keys()
+    if len(values) * 2 != len(fields) or not IMU_KEYS <= keys or not keys <= KV_KEYS:
+        raise ValueError(f"Claves inválidas: {line!r}")
+    return values
+
+
+def parse_block(block):
+    """
+    Parsea un bloque de líneas. Devuelve (lecturas, errores), donde cada lectura
+    es (valores clave:valor o None, lectura en formato estándar)
+    """
+    readings = []
+    errors = 0
+    for line in block.decode("ascii", "replace").split("\n"):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            if line[0] == "{":
+                readings.append((None, json.loads(line)))
+            else:
+                values = parse_kv_line(line)
+                readings.append((values, reading_from_values(values)))
+        except (ValueError, TypeError):
+            errors += 1
+    return readings, errors
+
+
+class SerialStreamReader:
+    """Hilo lector del puerto serial con entrega de lecturas por cola acotada"""
+
+    def __init__(self, port, baud_rate=STREAM_BAUD_RATE, queue_size=STREAM_QUEUE_SIZE,
+                 serial_connection=None, recorder=None):
+        self.port = port
+        self.baud_rate = baud_rate
+        self.serial_connection = serial_connection  # Se puede inyectar un puerto ya abierto
+        self.recorder = recorder  # StreamRecorder opcional: graba cada bloque leído
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.framer = LineFramer()
+        self.running = False
+        self.thread = None
+        self.last_seq = None
+        self.clock_offset = None
+        self.started = None
+        self.last_received = None  # perf_counter del bloque más antiguo de la última entrega
+        self.stats = {
+            "bytes": 0, "reads": 0, "lines": 0, "errors": 0,
+            "lost": 0, "dropped": 0, "queue_max": 0
+        }
+
+    def open(self):
+        if self.serial_connection is None:
+            # serial_for_url acepta rutas de dispositivo y también "loop://" o "socket://host:puerto"
+            self.serial_connection = serial.serial_for_url(self.port, self.baud_rate, timeout=READ_TIMEOUT)
+        return self.serial_connection
+
+    def start(self):
+        self.open()
+        self.running = True
+        self.started = time.monotonic()
+        self.thread = threading.Thread(target=self.run, name="serial-stream", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.running = False
+        if self.thread:
+            self.thread.join(timeout=2)
+        if self.serial_connection:
+            self.serial_connection.close()
+
+    def track_sequence(self, seq):
+        """Cuenta los huecos en el contador de secuencia del Arduino"""
+        if self.last_seq is not None:
+            gap = (seq - self.last_seq - 1) % SEQ_MODULO
+            if gap < SEQ_MODULO // 2:
+                self.stats["lost"] += gap
+            # Un salto hacia atrás grande es un reinicio del Arduino: no se cuenta como pérdida
+        self.last_seq = seq
+
+    def timestamp_for(self, arduino_ms, now):
+        """Timestamp del host para una muestra a partir de los ms del Arduino"""
+        if arduino_ms is None:
+            return now
+        timestamp = None if self.clock_offset is None else self.clock_offset + arduino_ms / 1000
+        if timestamp is None or abs(now - timestamp) > CLOCK_RESYNC:
+            self.clock_offset = now - arduino_ms / 1000
+            timestamp = now
+        return timestamp
+
+    def process_block(self, block, now):
+        readings, errors = parse_block(block)
+        self.stats["errors"] += errors
+        self.stats["lines"] += len(readings) + errors
+        batch = []
+        for values, reading in readings:
+            arduino_ms = None
+            if values is not None:
+                seq = values.get("seq")
+                if seq is not None:
+                    self.track_sequence(int(seq))
+                arduino_ms = values.get("ms")
+            else:
+                arduino_ms = reading.get("arduino_millis")
+            batch.append((self.timestamp_for(arduino_ms, now), reading))
+        return batch
+
+    def run(self):
+        """Bucle del hilo lector: lectura en bloque, framing y parseo"""
+        connection = self.serial_connection
+        while self.running:
+            try:
+                chunk = connection.read(max(READ_CHUNK, connection.in_waiting))
+            except Exception as e:
+                logger.error(f"Error leyendo el puerto serial: {e}")
+                time.sleep(1)
+                continue
+            if not chunk:
+                continue
+            received = time.perf_counter()
+            if self.recorder is not None:
+                self.recorder.record(KIND_SERIAL_CHUNK, self.port, chunk)
+            now = time.time()
+            self.stats["bytes"] += len(chunk)
+            self.stats["reads"] += 1
+            block = self.framer.feed(chunk)
+            if not block:
+                continue
+            batch = self.process_block(block, now)
+            if not batch:
+                continue
+            STAGE_DECODE.observe(time.perf_counter() - received)
+            try:
+                self.queue.put_nowait((received, batch))
+                self.stats["queue_max"] = max(self.stats["queue_max"], self.queue.qsize())
+            except queue.Full:
+                self.stats["dropped"] += len(batch)
+
+    def get_readings(self, timeout=None):
+        """Devuelve todas las lecturas pendientes como lista de (timestamp, lectura)
+
+        last_received queda con el instante de lectura del bloque más antiguo entregado.
+        """
+        readings = []
+        self.last_received = None
+        try:
+            self.last_received, batch = self.queue.get(timeout=timeout)
+            readings.extend(batch)
+            while True:
+                readings.extend(self.queue.get_nowait()[1])
+        except queue.Empty:
+            pass
+        return readings
+
+    def get_stats(self):
+        stats = dict(self.stats)
+        stats["discarded"] = self.framer.discarded
+        elapsed = time.monotonic() - self.started if self.started else 0
+        parsed = stats["lines"] - stats["errors"]
+        if elapsed:
+            stats["rate_hz"] = round(parsed / elapsed, 1)
+        expected = parsed + stats["lost"]
+        if expected:
+            stats["drop_rate"] = round((stats["lost"] + stats["dropped"]) / expected, 5)
+        return stats
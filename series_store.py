@@ -0,0 +1,544 @@
+#!/usr/bin/env python3
+"""
+Almacén local de series temporales en la Raspberry Pi (IMU crudo y ambiente).
+
+Hasta ahora el único histórico es MySQL, a través de la API PHP en otro equipo,
+y el IMU crudo no se guarda en ningún sitio. SeriesStore guarda por dispositivo
+dos series en disco, en columnas separadas (un archivo por columna) y por
+trozos de tamaño fijo:
+
+  imu   ts ax ay az gx gy gz      int64 ms de época + int16 como en la trama IMU
+                                  (ax ay az en mg, gx gy gz en 0.1 °/s)
+  env   ts temperature humidity pressure   int64 + float32 (NaN si no hay dato)
+
+Diseño:
+- Cada trozo es un directorio <raíz>/<dispositivo>/<serie>/<ts inicial>/ con un
+  archivo <columna>.col por columna, reservado con ftruncate para chunk_rows
+  filas (archivo disperso: solo ocupa lo escrito) y mapeado con numpy.memmap.
+  Añadir filas es copiar memoria a memoria sobre el mapa; no hay formato ni
+  serialización. Las filas escritas se reconocen porque ts > 0 (el resto del
+  archivo son ceros), así que no hace falta un índice aparte que mantener
+  consistente: tras una caída del proceso se pierde como mucho lo que no llegó
+  a la caché de páginas.
+- Solo se añade al final (append-only) y ts no decrece dentro de una serie: las
+  filas anteriores a la última escrita se descartan y se cuentan. Un trozo se
+  cierra al llenarse o al abarcar chunk_span segundos y se abre otro.
+- Índice temporal: la lista ordenada de trozos (ts inicial, ts final) localiza
+  con bisect los trozos de un rango y, dentro de cada uno, np.searchsorted sobre
+  la columna ts las filas exactas. read() devuelve vistas numpy del propio mapa,
+  sin copiar ni crear objetos Python por fila.
+- Retención: se borran los trozos cerrados más antiguos que max_age_days o, si el
+  total supera max_bytes (espacio real en disco), los más antiguos de todos los
+  dispositivos. Un hilo aplica la retención y hace msync cada FLUSH_INTERVAL.
+  Las vistas de un trozo borrado siguen siendo válidas (el archivo desaparece al
+  soltar el mapa).
+
+Las marcas de tiempo del Arduino (millis() desde su arranque) se convierten a ms
+de época con DeviceClock, que se reancla al reloj del Pi si el Arduino se
+reinicia o deriva más de CLOCK_SLACK_MS, sin volver atrás.
+
+Dependencias:
+pip install numpy
+
+Uso:
+python3 raspberry_fall_detection.py --store series/
+python3 ble_gateway.py --store series/ --store-max-age 30 --store-max-gb 20
+python3 series_store.py series/ --info
+python3 series_store.py series/ --device AA:BB:CC:DD:EE:01 --last 60 --output ultimo_minuto.csv
+
+Autor: Tu nombre
+Fecha: Octubre 2025
+"""
+
+import bisect
+import logging
+import math
+import os
+import shutil
+import threading
+import time
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+STORE_DIR = "series_store"
+CHUNK_SPAN = 3600            # Segundos como máximo por trozo
+FLUSH_INTERVAL = 5.0         # Segundos entre msync y retención
+MAX_AGE_DAYS = 30            # Trozos más antiguos se borran (None = sin límite)
+MAX_BYTES = None             # Espacio total en disco como máximo (None = sin límite)
+READ_CACHE = 64              # Trozos cerrados mapeados a la vez para lecturas
+CLOCK_SLACK_MS = 2000        # Desfase que indica que el Arduino se reinició
+
+IMU_COLUMNS = (("ts", "<i8"), ("ax", "<i2"), ("ay", "<i2"), ("az", "<i2"),
+               ("gx", "<i2"), ("gy", "<i2"), ("gz", "<i2"))
+ENV_COLUMNS = (("ts", "<i8"), ("temperature", "<f4"), ("humidity", "<f4"), ("pressure", "<f4"))
+
+# Serie -> (columnas, filas por trozo)
+SERIES = {
+    "imu": (IMU_COLUMNS, 360000),   # 1 h a 100 Hz
+    "env": (ENV_COLUMNS, 86400),    # 1 día a 1 Hz (el trozo se cierra antes por CHUNK_SPAN)
+}
+
+
+def device_key(device):
+    """Nombre de directorio de un dispositivo (AA:BB:... -> aabb...)"""
+    return "".join(c for c in device.lower() if c.isalnum() or c in "-_") or "unknown"
+
+
+def filled_rows(ts):
+    """Filas escritas de un trozo: prefijo con ts > 0 (búsqueda binaria, toca pocas páginas)"""
+    lo, hi = 0, len(ts)
+    if hi and ts[hi - 1] != 0:
+        return hi
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if ts[mid] != 0:
+            lo = mid + 1
+        else:
+            hi = mid
+    return lo
+
+
+def disk_bytes(path):
+    """Espacio real ocupado (los archivos de trozo son dispersos)"""
+    try:
+        return os.stat(path).st_blocks * 512
+    except FileNotFoundError:
+        return 0
+
+
+class Chunk:
+    """Un trozo de una serie: una columna por archivo, mapeadas en memoria"""
+
+    def __init__(self, path, columns, capacity=None):
+        self.path = path
+        self.first_ts = int(os.path.basename(path))
+        self.writable = capacity is not None
+        self.maps = {}
+        for name, dtype in columns:
+            file_path = os.path.join(path, f"{name}.col")
+            if self.writable:
+                size = capacity * np.dtype(dtype).itemsize
+                with open(file_path, "ab") as f:
+                    if f.tell() < size:
+                        f.truncate(size)  # Reserva dispersa, sin escribir ceros
+                self.maps[name] = np.memmap(file_path, dtype=dtype, mode="r+", shape=(capacity,))
+            else:
+                self.maps[name] = np.memmap(file_path, dtype=dtype, mode="r")
+        self.capacity = len(self.maps["ts"])
+        self.rows = filled_rows(self.maps["ts"])
+        self.last_ts = int(self.maps["ts"][self.rows - 1]) if self.rows else self.first_ts
+
+    @property
+    def full(self):
+        return self.rows >= self.capacity
+
+    def append(self, ts, values, names):
+        """Copia hasta llenar el trozo; devuelve las filas escritas"""
+        n = min(len(ts), self.capacity - self.rows)
+        if n <= 0:
+            return 0
+        end = self.rows + n
+        for j, name in enumerate(names):
+            self.maps[name][self.rows:end] = values[:n, j]
+        self.maps["ts"][self.rows:end] = ts[:n]  # Después de los valores: marca las filas como escritas
+        self.rows = end
+        self.last_ts = int(ts[n - 1])
+        return n
+
+    def view(self, start, end, columns=None):
+        """Vistas de las filas con start <= ts < end (sin copiar)"""
+        ts = self.maps["ts"][:self.rows]
+        lo = int(np.searchsorted(ts, start, "left")) if start is not None else 0
+        hi = int(np.searchsorted(ts, end, "left")) if end is not None else self.rows
+        return {name: self.maps[name][lo:hi] for name in (columns or self.maps)}
+
+    def flush(self):
+        if self.writable:
+            for column in self.maps.values():
+                column.flush()
+
+    def disk_bytes(self):
+        return sum(disk_bytes(column.filename) for column in self.maps.values())
+
+
+class Series:
+    """Una serie (imu o env) de un dispositivo: trozos ordenados por tiempo"""
+
+    def __init__(self, path, columns, chunk_rows, chunk_span=CHUNK_SPAN):
+        self.path = path
+        self.columns = columns
+        self.names = [name for name, _ in columns[1:]]
+        self.chunk_rows = chunk_rows
+        self.chunk_span_ms = int(chunk_span * 1000)
+        self.firsts = []   # ts inicial de cada trozo cerrado (índice temporal)
+        self.lasts = []    # ts final de cada trozo cerrado
+        self.paths = []
+        self.sizes = []    # Bytes en disco de cada trozo cerrado (medidos al cerrarlo)
+        self.closed_bytes = 0
+        self.active = None
+        self.last_ts = 0
+        names = os.listdir(path) if os.path.isdir(path) else []
+        chunks = sorted((int(name), name) for name in names if name.isdigit())
+        for i, (first, name) in enumerate(chunks):
+            chunk_path = os.path.join(path, name)
+            try:
+                if i == len(chunks) - 1:
+                    self.active = Chunk(chunk_path, columns, chunk_rows)
+                    self.last_ts = self.active.last_ts
+                else:
+                    self.index_chunk(Chunk(chunk_path, columns))
+            except (OSError, ValueError) as e:
+                # Trozo a medio crear (el proceso murió entre mkdir y ftruncate)
+                logger.warning(f"Trozo ilegible {chunk_path}, se descarta: {e}")
+                shutil.rmtree(chunk_path, ignore_errors=True)
+
+    def index_chunk(self, chunk):
+        if not chunk.rows:
+            shutil.rmtree(chunk.path, ignore_errors=True)
+            return
+        self.firsts.append(chunk.first_ts)
+        self.lasts.append(chunk.last_ts)
+        self.paths.append(chunk.path)
+        size = chunk.disk_bytes()
+        self.sizes.append(size)
+        self.closed_bytes += size
+        self.last_ts = max(self.last_ts, chunk.last_ts)
+
+    def rotate(self, first_ts):
+        """Cierra el trozo activo y abre otro que empieza en first_ts"""
+        if self.active is not None:
+            # Sin msync aquí (bucle BLE): el kernel escribe las páginas pendientes del trozo cerrado
+            self.index_chunk(self.active)
+        path = os.path.join(self.path, f"{first_ts:013d}")
+        os.makedirs(path, exist_ok=True)
+        self.active = Chunk(path, self.columns, self.chunk_rows)
+
+    def append(self, ts, values):
+        """Añade filas (ts int64 ordenado, values n × columnas); devuelve (escritas, descartadas)"""
+        n = len(ts)
+        skip = 0
+        if n and ts[0] < max(self.last_ts, 1):
+            skip = int(np.searchsorted(ts, max(self.last_ts, 1), "left"))
+        written = 0
+        position = skip
+        while position < n:
+            active = self.active
+            if active is None or active.full or ts[position] - active.first_ts >= self.chunk_span_ms:
+                self.rotate(int(ts[position]))
+                active = self.active
+            # Hasta llenar el trozo o salir de su intervalo (al menos una fila)
+            limit = position + int(np.searchsorted(ts[position:], active.first_ts + self.chunk_span_ms, "left"))
+            count = active.append(ts[position:limit], values[position:limit], self.names)
+            position += count
+            written += count
+        if written:
+            self.last_ts = self.active.last_ts
+        return written, skip
+
+    def locate(self, start, end):
+        """Índices de los trozos cerrados que pueden contener [start, end)"""
+        lo = bisect.bisect_left(self.lasts, start) if start is not None else 0
+        hi = bisect.bisect_left(self.firsts, end) if end is not None else len(self.firsts)
+        return range(lo, hi)
+
+    def expire(self, count):
+        """Quita del índice los count trozos cerrados más antiguos; devuelve (rutas a borrar, bytes)"""
+        paths = self.paths[:count]
+        freed = sum(self.sizes[:count])
+        del self.firsts[:count], self.lasts[:count], self.paths[:count], self.sizes[:count]
+        self.closed_bytes -= freed
+        return paths, freed
+
+    def disk_bytes(self):
+        return self.closed_bytes + (self.active.disk_bytes() if self.active is not None else 0)
+
+    def close(self):
+        if self.active is not None:
+            self.active.flush()
+            self.active = None
+
+
+class DeviceClock:
+    """Convierte los millis() del Arduino a ms de época sin volver nunca atrás"""
+
+    def __init__(self, slack_ms=CLOCK_SLACK_MS):
+        self.slack_ms = slack_ms
+        self.offset = None
+        self.next_ts = None  # Primer ts libre tras la última trama
+
+    def to_epoch(self, device_ms, span_ms=0):
+        """ts de época de una trama que empieza en device_ms y abarca span_ms"""
+        offset = time.time() * 1000.0 - device_ms
+        if self.offset is None or abs(offset - self.offset) > self.slack_ms:
+            # Primera trama, Arduino reiniciado o deriva acumulada: reanclar al reloj del Pi,
+            # pero sin solapar lo ya escrito (el almacén descartaría esas filas)
+            self.offset = offset if self.next_ts is None else max(offset, self.next_ts - device_ms)
+        epoch = int(device_ms + self.offset)
+        self.next_ts = epoch + span_ms + 1
+        return epoch
+
+
+class SeriesStore:
+    """Series imu y env por dispositivo en columnas mapeadas en memoria"""
+
+    def __init__(self, root=STORE_DIR, max_age_days=MAX_AGE_DAYS, max_bytes=MAX_BYTES, chunk_span=CHUNK_SPAN,
+                 chunk_rows=None, flush_interval=FLUSH_INTERVAL, read_cache=READ_CACHE):
+        self.root = root
+        self.max_age_days = max_age_days
+        self.max_bytes = max_bytes
+        self.chunk_span = chunk_span
+        self.chunk_rows = chunk_rows or {}  # Serie -> filas por trozo (por defecto, SERIES)
+        self.flush_interval = flush_interval
+        self.read_cache = read_cache
+        self.series = {}    # (dispositivo, serie) -> Series
+        self.clocks = {}    # dispositivo -> DeviceClock
+        self.readers = {}   # ruta del trozo -> Chunk de solo lectura (orden de uso)
+        self.lock = threading.Lock()  # Escritura (bucle BLE) frente a retención (hilo)
+        self.running = False
+        self.thread = None
+        self.stats = {"rows": 0, "out_of_order": 0, "chunks": 0, "expired": 0, "expired_bytes": 0, "reads": 0}
+        os.makedirs(root, exist_ok=True)
+
+    def get_series(self, device, name):
+        key = (device_key(device), name)
+        series = self.series.get(key)
+        if series is None:
+            columns, rows = SERIES[name]
+            series = self.series[key] = Series(os.path.join(self.root, key[0], name), columns,
+                                               self.chunk_rows.get(name, rows), self.chunk_span)
+        return series
+
+    # ------------------------------------------------------------------
+    # Escritura
+    # ------------------------------------------------------------------
+
+    def append(self, device, name, ts, values):
+        """Añade filas a una serie: ts en ms de época (ordenado), values n × columnas"""
+        ts = np.asarray(ts, dtype=np.int64)
+        with self.lock:
+            series = self.get_series(device, name)
+            before = len(series.paths)
+            written, skipped = series.append(ts, values)
+            self.stats["chunks"] += len(series.paths) - before
+        self.stats["rows"] += written
+        self.stats["out_of_order"] += skipped
+        return written
+
+    def clock(self, device):
+        clock = self.clocks.get(device)
+        if clock is None:
+            clock = self.clocks[device] = DeviceClock()
+        return clock
+
+    def append_imu(self, device, timestamp, period_ms, samples):
+        """Muestras de una trama IMU (millis() del Arduino, vista int16 de n × 6 valores)"""
+        raw = np.frombuffer(samples, dtype=np.int16).reshape(-1, 6)
+        if len(raw):
+            first = self.clock(device).to_epoch(timestamp, period_ms * (len(raw) - 1))
+            self.append(device, "imu", first + period_ms * np.arange(len(raw), dtype=np.int64), raw)
+
+    def append_env(self, device, timestamp, environment):
+        """Temperatura, humedad y presión de un STATUS (None -> NaN)"""
+        values = np.array([[math.nan if v is None else v for v in environment[:3]]], dtype=np.float32)
+        self.append(device, "env", (self.clock(device).to_epoch(timestamp),), values)
+
+    # ------------------------------------------------------------------
+    # Lectura
+    # ------------------------------------------------------------------
+
+    def devices(self):
+        return sorted(name for name in os.listdir(self.root) if os.path.isdir(os.path.join(self.root, name)))
+
+    def open_chunk(self, path, columns):
+        # readers lo comparten quien lee y la retención; el mapeo se abre fuera del cerrojo
+        with self.lock:
+            chunk = self.readers.pop(path, None)
+        if chunk is None:
+            chunk = Chunk(path, columns)
+        with self.lock:
+            self.readers[path] = chunk  # Al final: usado más recientemente
+            if len(self.readers) > self.read_cache:
+                del self.readers[next(iter(self.readers))]
+        return chunk
+
+    def read(self, device, name, start=None, end=None, columns=None):
+        """
+        Filas con start <= ts < end (ms de época) como una lista de diccionarios
+        columna -> vista numpy, uno por trozo y en orden. No copia los datos
+        """
+        self.stats["reads"] += 1
+        with self.lock:
+            series = self.get_series(device, name)
+            paths = [series.paths[i] for i in series.locate(start, end)]
+            active = series.active
+        parts = []
+        for path in paths:
+            try:
+                chunk = self.open_chunk(path, series.columns)
+            except OSError:
+                continue  # La retención lo borró después de buscarlo en el índice
+            part = chunk.view(start, end, columns)
+            if len(part[next(iter(part))]):
+                parts.append(part)
+        if active is not None and (end is None or active.first_ts < end):
+            part = active.view(start, end, columns)
+            if len(part[next(iter(part))]):
+                parts.append(part)
+        return parts
+
+    def read_concat(self, device, name, start=None, end=None, columns=None):
+        """Como read() pero en un array por columna (una copia si el rango abarca varios trozos)"""
+        parts = self.read(device, name, start, end, columns)
+        names = columns or [column for column, _ in SERIES[name][0]]
+        if len(parts) == 1:
+            return parts[0]
+        if not parts:
+            return {column: np.empty(0, dtype=dict(SERIES[name][0])[column]) for column in names}
+        return {column: np.concatenate([part[column] for part in parts]) for column in names}
+
+    def time_range(self, device, name):
+        """(primer ts, último ts) de una serie o None si está vacía"""
+        with self.lock:
+            series = self.get_series(device, name)
+            if series.firsts:
+                return series.firsts[0], series.last_ts
+            if series.active is not None and series.active.rows:
+                return series.active.first_ts, series.active.last_ts
+        return None
+
+    # ------------------------------------------------------------------
+    # Retención y mantenimiento
+    # ------------------------------------------------------------------
+
+    def apply_retention(self, now_ms=None):
+        """Borra los trozos cerrados vencidos por edad y, si hace falta, por espacio"""
+        now_ms = time.time() * 1000.0 if now_ms is None else now_ms
+        # El sistema de archivos se recorre fuera del cerrojo, que necesita el bucle BLE para escribir
+        found = [(key, name) for key in os.listdir(self.root) for name in SERIES
+                 if os.path.isdir(os.path.join(self.root, key, name))]
+        with self.lock:
+            for key, name in found:
+                self.get_series(key, name)
+            actives = [series.active for series in self.series.values() if series.active is not None]
+        # Los trozos cerrados tienen el tamaño guardado; solo se miden los activos
+        active_bytes = sum(chunk.disk_bytes() for chunk in actives) if self.max_bytes is not None else 0
+        doomed = []
+        expired = freed = 0
+        with self.lock:
+            if self.max_age_days is not None:
+                cutoff = now_ms - self.max_age_days * 86400000
+                for series in self.series.values():
+                    count = bisect.bisect_left(series.lasts, cutoff)
+                    if count:
+                        paths, released = series.expire(count)
+                        doomed += paths
+                        freed += released
+                        expired += count
+            if self.max_bytes is not None:
+                total = active_bytes + sum(series.closed_bytes for series in self.series.values())
+                while total > self.max_bytes:
+                    candidates = [series for series in self.series.values() if series.paths]
+                    if not candidates:
+                        break
+                    oldest = min(candidates, key=lambda series: series.lasts[0])
+                    paths, released = oldest.expire(1)
+                    doomed += paths
+                    total -= released
+                    freed += released
+                    expired += 1
+        for path in doomed:
+            shutil.rmtree(path, ignore_errors=True)
+        if expired:
+            # Soltar los mapas de lectura de lo borrado: el espacio no se libera mientras estén mapeados
+            with self.lock:
+                for path in doomed:
+                    self.readers.pop(path, None)
+            self.stats["expired"] += expired
+            self.stats["expired_bytes"] += freed
+            logger.info(f"Retención: {expired} trozos borrados ({freed / 1e6:.1f} MB)")
+        return expired
+
+    def flush(self):
+        # msync fuera del cerrojo: en la tarjeta SD puede tardar y el bucle BLE lo necesita para escribir
+        with self.lock:
+            actives = [series.active for series in self.series.values() if series.active is not None]
+        for chunk in actives:
+            chunk.flush()
+
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self.run, name="series-store", daemon=True)
+        self.thread.start()
+
+    def run(self):
+        """Hilo de mantenimiento: msync y retención cada flush_interval"""
+        while self.running:
+            time.sleep(self.flush_interval)
+            try:
+                self.flush()
+                self.apply_retention()
+            except Exception as e:
+                logger.error(f"Error en el mantenimiento del almacén: {e}")
+
+    def close(self):
+        self.running = False
+        if self.thread:
+            self.thread.join(timeout=self.flush_interval + 5)
+            self.thread = None
+        with self.lock:
+            for series in self.series.values():
+                series.close()
+            self.readers.clear()
+        logger.info(f"Almacén de series: {self.get_stats()}")
+
+    def get_stats(self):
+        stats = dict(self.stats)
+        stats["series"] = len(self.series)
+        return stats
+
+
+def main():
+    import argparse
+    import csv
+    import sys
+
+    parser = argparse.ArgumentParser(description="Consultar el almacén local de series")
+    parser.add_argument("root", help="Directorio del almacén")
+    parser.add_argument("--info", action="store_true", help="Dispositivos, rangos y espacio ocupado")
+    parser.add_argument("--device", help="Dispositivo (dirección BLE o nombre)")
+    parser.add_argument("--series", choices=sorted(SERIES), default="imu", help="Serie a exportar")
+    parser.add_argument("--last", type=float, default=60.0, help="Segundos finales a exportar")
+    parser.add_argument("--output", help="CSV de salida (por defecto, la salida estándar)")
+    args = parser.parse_args()
+
+    store = SeriesStore(args.root, max_age_days=None)
+    if args.info or not args.device:
+        for device in store.devices():
+            for name in SERIES:
+                span = store.time_range(device, name)
+                if span:
+                    series = store.get_series(device, name)
+                    rows = sum(len(part["ts"]) for part in store.read(device, name, columns=["ts"]))
+                    print(f"{device} {name}: {rows} filas, {(span[1] - span[0]) / 3.6e6:.1f} h, "
+                          f"{len(series.paths) + 1} trozos, {series.disk_bytes() / 1e6:.1f} MB")
+        return
+
+    span = store.time_range(args.device, args.series)
+    if span is None:
+        print(f"Sin datos de {args.device} ({args.series})")
+        return
+    data = store.read_concat(args.device, args.series, span[1] - int(args.last * 1000), None)
+    f = open(args.output, "w", newline="") if args.output else sys.stdout
+    try:
+        writer = csv.writer(f)
+        writer.writerow(list(data))
+        writer.writerows(zip(*(column.tolist() for column in data.values())))
+    finally:
+        if args.output:
+            f.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,742 @@
+#!/usr/bin/env python3
+"""
+Gateway BLE repartido en varios procesos para usar todos los núcleos del Pi.
+
+ble_gateway.py atiende todos los dispositivos desde un único bucle asyncio, que
+como mucho ocupa un núcleo. Este script reparte los dispositivos entre
+--workers procesos (ShardWorker, un FallDetectionGateway cada uno, con su motor
+de caídas, su conexión WebSocket y su cola de alertas) y los vigila desde un
+supervisor:
+
+- Cada dispositivo se asigna al proceso con menos dispositivos. Si un proceso
+  muere, sus dispositivos pasan en el momento a los demás y el proceso se
+  vuelve a lanzar tras RESTART_DELAY segundos; al volver, se equilibra de nuevo
+  (se mueven dispositivos solo si la diferencia entre procesos es mayor de 1).
+- Las conexiones BLE de todos los procesos se serializan con un cerrojo entre
+  procesos (BlueZ no admite conexiones en paralelo en el mismo adaptador).
+- Las muestras IMU crudas de cada dispositivo se publican en un buffer circular
+  en memoria compartida (shm_ring.py) que crea el supervisor. Los procesos
+  lectores las leen sin serializar: --analytics calcula la actividad de cada
+  dispositivo y --record-imu DIR las guarda en DIR/<dispositivo>.imu.
+- Con --metrics-port P, el proceso i publica sus métricas en el puerto P + i.
+
+Dependencias:
+pip install bleak websockets numpy
+
+Requiere ble_gateway.py, shm_ring.py y sus dependencias en el mismo directorio.
+
+Uso:
+python3 sharded_gateway.py --workers 4 --devices dispositivos.json --ws-url ws://192.168.1.100:8080
+python3 sharded_gateway.py --workers 2 --verify-falls --analytics
+python3 sharded_gateway.py --devices dispositivos.json --record-imu imu_crudo/
+python3 benchmarks/bench_sharded_gateway.py   # escalado de 1 a 4 procesos
+
+Formato de un registro de DIR/<dispositivo>.imu (little-endian, 20 bytes):
+int64 marca de tiempo del Arduino en ms + 6 int16 (ax ay az en mg, gx gy gz en 0.1 °/s)
+
+Autor: Tu nombre
+Fecha: Octubre 2025
+"""
+
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+import queue
+import signal
+import time
+from collections import Counter
+from multiprocessing.connection import wait
+
+import numpy as np
+from bleak import BleakScanner
+
+import raspberry_fall_detection
+from ble_frames import ACC_SCALE
+from ble_gateway import DISCOVERY_INTERVAL, DISCOVERY_TIMEOUT, MAX_DEVICES, FallDetectionGateway, GatewayDevice
+from db_sink import DatabaseSink
+from log_config import add_logging_arguments, configure_logging
+from raspberry_fall_detection import DEVICE_NAME, WS_URL
+from shm_ring import RING_PREFIX, RING_SLOTS, RingReader, SampleRing, ring_name
+from stream_replay import ReplayChannel
+
+logger = logging.getLogger(__name__)
+
+WORKERS = min(4, os.cpu_count() or 1)
+SUPERVISE_INTERVAL = 1.0     # Segundos máximos entre revisiones del supervisor
+RESTART_DELAY = 2.0          # Espera antes de relanzar un proceso caído
+STOP_TIMEOUT = 10.0          # Segundos para que cada proceso termine ordenadamente
+REPORT_INTERVAL = 5.0        # Cada cuánto envía cada proceso sus contadores al supervisor
+COMMAND_POLL = 0.2           # Espera máxima de cada lectura de la cola de órdenes
+BLE_LOCK_TIMEOUT = 30.0      # Si otro proceso murió con el cerrojo BLE, se continúa sin él
+READ_INTERVAL = 0.25         # Segundos entre lecturas de los buffers en los lectores
+STATS_INTERVAL = 30          # Segundos entre reportes
+SPOOL_DIR = "spool_shard"    # Spool de cada proceso: spool_shard_<i>
+SHARD_LOG_FORMAT = '%(asctime)s - %(processName)s - %(levelname)s - %(message)s'
+
+# Registro de DIR/<dispositivo>.imu
+IMU_RECORD = np.dtype([("ts", "<i8"), ("imu", "<i2", 6)])
+
+
+class ProcessLock:
+    """Cerrojo entre procesos usable con async with (serializa las conexiones BLE)"""
+
+    def __init__(self, lock, timeout=BLE_LOCK_TIMEOUT):
+        self.lock = lock
+        self.timeout = timeout
+        self.local = asyncio.Lock()  # Una sola sesión del proceso espera el cerrojo a la vez
+        self.acquired = False
+
+    async def __aenter__(self):
+        await self.local.acquire()
+        waiting = asyncio.ensure_future(asyncio.to_thread(self.lock.acquire, True, self.timeout))
+        try:
+            self.acquired = await asyncio.shield(waiting)
+        except asyncio.CancelledError:
+            # El hilo sigue esperando el cerrojo: soltarlo en cuanto lo consiga
+            waiting.add_done_callback(self.release_orphan)
+            self.local.release()
+            raise
+        if not self.acquired:
+            logger.warning(f"Cerrojo BLE ocupado más de {self.timeout:g}s, se continúa sin él")
+        return self
+
+    async def __aexit__(self, *exc_info):
+        if self.acquired:
+            self.lock.release()
+            self.acquired = False
+        self.local.release()
+
+    def release_orphan(self, waiting):
+        """Suelta el cerrojo que obtuvo el hilo de una sesión cancelada mientras esperaba"""
+        if not waiting.cancelled() and waiting.exception() is None and waiting.result():
+            self.lock.release()
+
+
+class ShardDevice(GatewayDevice):
+    """Sesión de un dispositivo que además publica su IMU crudo en memoria compartida"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.sample_ring = None
+
+    async def handle_imu_samples(self, timestamp, period_ms, samples):
+        if self.sample_ring is not None:
+            self.sample_ring.publish(timestamp, period_ms, samples)
+        await super().handle_imu_samples(timestamp, period_ms, samples)
+
+
+class ShardWorker(FallDetectionGateway):
+    """Gateway de un proceso de trabajo: atiende los dispositivos que le asigna el supervisor"""
+
+    device_class = ShardDevice
+
+    def __init__(self, index, commands, reports, ble_lock=None, client_factory=None,
+                 report_interval=REPORT_INTERVAL, **kwargs):
+        super().__init__(**kwargs)
+        self.index = index
+        self.commands = commands
+        self.reports = reports
+        self.client_factory = client_factory  # Clientes BLE falsos (benchmarks)
+        self.report_interval = report_interval
+        self.ble_lock = ProcessLock(ble_lock) if ble_lock is not None else None
+        self.detached = Counter()  # Contadores de los dispositivos que se llevaron a otro proceso
+        self.main_task = None
+        self.started_at = time.time()  # Reloj de pared: comparable entre procesos (benchmarks)
+
+    def get_identification(self):
+        identification = super().get_identification()
+        identification["device"] = f"Raspberry Pi BLE Gateway (proceso {self.index})"
+        identification["shard"] = self.index
+        return identification
+
+    async def connect_websocket(self):
+        if self.ws_url is None:
+            # Sin servidor (benchmarks): los mensajes solo se cuentan
+            self.channel = ReplayChannel()
+            return True
+        return await super().connect_websocket()
+
+    def get_stats(self):
+        stats = super().get_stats()
+        sessions = self.devices.values()
+        stats["imu_samples"] = sum(d.imu_sample_count for d in sessions)
+        for key in ("notifications", "fall_count", "imu_samples"):
+            stats[key] += self.detached[key]
+        stats["cpu_seconds"] = time.process_time()
+        stats["started_at"] = self.started_at
+        return stats
+
+    def attach_device(self, address, device_name, info, shared_ring):
+        """Empieza a atender un dispositivo asignado por el supervisor"""
+        self.device_map[address.upper()] = info
+        session = self.add_device(address, device_name)
+        if shared_ring:
+            session.sample_ring = SampleRing(shared_ring)
+        if self.client_factory is not None:
+            client = self.client_factory(address)
+            session.ble_client_class = lambda address, client=client, **kwargs: client
+
+    async def detach_device(self, address):
+        """Deja de atender un dispositivo (el supervisor lo pasa a otro proceso)"""
+        session = self.devices.pop(address, None)
+        task = self.tasks.pop(address, None)
+        self.device_map.pop(address.upper(), None)
+        if session is None:
+            return
+        session.running = False
+        if task is not None:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+        await session.stop()
+        self.detached.update(notifications=session.notification_count, fall_count=session.fall_count,
+                             imu_samples=session.imu_sample_count)
+        if session.sample_ring is not None:
+            session.sample_ring.close()
+        logger.info(f"Dispositivo {address} liberado")
+
+    def next_command(self):
+        try:
+            return self.commands.get(timeout=COMMAND_POLL)
+        except queue.Empty:
+            return None
+
+    def report(self):
+        try:
+            self.reports.put_nowait((self.index, self.get_stats()))
+        except queue.Full:
+            pass
+
+    async def run_discovery(self):
+        """En lugar de escanear, atiende las órdenes del supervisor y le envía sus contadores"""
+        last_report = 0.0
+        while self.running:
+            command = await asyncio.to_thread(self.next_command)
+            if command is not None:
+                action = command[0]
+                if action == "add":
+                    self.attach_device(*command[1:])
+                elif action == "remove":
+                    await self.detach_device(command[1])
+                elif action == "stop":
+                    self.report()
+                    self.main_task.cancel()
+                    return
+            current = time.monotonic()
+            if current - last_report >= self.report_interval:
+                self.report()
+                last_report = current
+
+    async def run(self):
+        self.main_task = asyncio.current_task()
+        try:
+            await super().run()
+        except asyncio.CancelledError:
+            pass  # Parada pedida por el supervisor (stop() ya se ejecutó)
+
+
+def setup_process_logging(options):
+    """Logging de un proceso hijo: mismo formato con el nombre del proceso"""
+    logging.basicConfig(level=options.get("log_level", logging.INFO), format=SHARD_LOG_FORMAT, force=True)
+    return configure_logging(options.get("log_mode", "full"), options.get("log_sample", (5, 30.0)))
+
+
+def run_worker(index, commands, reports, ble_lock, options):
+    """Punto de entrada de un proceso de trabajo"""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # Ctrl+C lo gestiona el supervisor
+    options = dict(options)
+    logs = setup_process_logging(options)
+    for key in ("log_mode", "log_sample", "log_level"):
+        options.pop(key, None)
+    raspberry_fall_detection.USUARIO_ID = options.pop("user_id", raspberry_fall_detection.USUARIO_ID)
+    db_url = options.pop("db", None)
+    spool_dir = options.pop("spool_dir", None)
+    metrics_port = options.pop("metrics_port", None)
+    worker = ShardWorker(
+        index, commands, reports, ble_lock,
+        spool_dir=f"{spool_dir}_{index}" if spool_dir else None,
+        metrics_port=metrics_port + index if metrics_port else None,
+        db_sink=DatabaseSink(db_url) if db_url else None,
+        **options
+    )
+    try:
+        asyncio.run(worker.run())
+    finally:
+        if logs is not None:
+            logs.stop()
+
+
+class RingAnalytics:
+    """Actividad de cada dispositivo calculada sobre su buffer compartido"""
+
+    def __init__(self, stats_interval=STATS_INTERVAL):
+        self.stats_interval = stats_interval
+        self.window = {}  # dispositivo -> [muestras, perdidas, suma de |a - 1 g|, pico |a|]
+        self.totals = Counter()
+        self.started = time.monotonic()
+
+    def process(self, address, times, samples, lost):
+        acc = samples[:, :3].astype(np.float32) / ACC_SCALE
+        mag = np.sqrt(np.einsum("nk,nk->n", acc, acc))
+        window = self.window.setdefault(address, [0, 0, 0.0, 0.0])
+        window[0] += len(samples)
+        window[1] += lost
+        window[2] += float(np.abs(mag - 1.0).sum())
+        window[3] = max(window[3], float(mag.max()))
+        self.totals["samples"] += len(samples)
+        self.totals["lost"] += lost
+
+    def report(self):
+        elapsed = time.monotonic() - self.started
+        for address, (count, lost, activity, peak) in sorted(self.window.items()):
+            if count:
+                logger.info(f"Análisis {address}: {count / elapsed:.0f} muestras/s, actividad media "
+                            f"{activity / count:.3f} g, pico {peak:.2f} g, perdidas {lost}")
+        self.window = {}
+        self.started = time.monotonic()
+
+    def close(self):
+        logger.info(f"Análisis IMU: {dict(self.totals)}")
+
+
+class RingRecorder:
+    """Copia las muestras de cada buffer compartido a DIR/<dispositivo>.imu"""
+
+    def __init__(self, directory, stats_interval=STATS_INTERVAL):
+        self.directory = directory
+        self.stats_interval = stats_interval
+        self.files = {}
+        self.totals = Counter()
+        os.makedirs(directory, exist_ok=True)
+
+    def process(self, address, times, samples, lost):
+        f = self.files.get(address)
+        if f is None:
+            path = os.path.join(self.directory, ring_name(address)[len(RING_PREFIX):] + ".imu")
+            f = self.files[address] = open(path, "ab")
+        records = np.empty(len(samples), dtype=IMU_RECORD)
+        records["ts"] = times
+        records["imu"] = samples
+        records.tofile(f)
+        self.totals["samples"] += len(samples)
+        self.totals["lost"] += lost
+
+    def report(self):
+        for f in self.files.values():
+            f.flush()
+        logger.info(f"Grabación IMU: {dict(self.totals)}")
+
+    def close(self):
+        for f in self.files.values():
+            f.close()
+        self.files = {}
+        logger.info(f"Grabación IMU terminada: {dict(self.totals)}")
+
+
+READER_CLASSES = {"analytics": RingAnalytics, "recorder": RingRecorder}
+
+
+def run_reader(kind, control, options):
+    """Punto de entrada de un proceso lector de los buffers compartidos"""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    options = dict(options)
+    logs = setup_process_logging(options)
+    for key in ("log_mode", "log_sample", "log_level"):
+        options.pop(key, None)
+    handler = READER_CLASSES[kind](**options)
+    readers = {}  # dirección -> RingReader
+    last_report = time.monotonic()
+    running = True
+    try:
+        while running:
+            try:
+                command = control.get(timeout=READ_INTERVAL)
+                while command is not None:
+                    if command[0] == "add" and command[1] not in readers:
+                        readers[command[1]] = RingReader(SampleRing(command[2]))
+                    elif command[0] == "stop":
+                        running = False
+                    command = control.get_nowait()
+            except queue.Empty:
+                pass
+            for address, reader in readers.items():
+                lost = reader.lost
+                times, samples = reader.read()
+                if len(samples) or reader.lost != lost:
+                    handler.process(address, times, samples, reader.lost - lost)
+            if time.monotonic() - last_report >= handler.stats_interval:
+                handler.report()
+                last_report = time.monotonic()
+    finally:
+        handler.close()
+        for reader in readers.values():
+            reader.ring.close()
+        if logs is not None:
+            logs.stop()
+
+
+class Shard:
+    """Proceso de trabajo visto desde el supervisor"""
+
+    def __init__(self, index):
+        self.index = index
+        self.process = None
+        self.commands = None
+        self.devices = set()
+        self.stats = {}
+        self.restart_at = None
+        self.restarts = 0
+
+    @property
+    def alive(self):
+        return self.process is not None and self.process.is_alive()
+
+
+class ReaderProcess:
+    def __init__(self, kind, options):
+        self.kind = kind
+        self.options = options
+        self.process = None
+        self.control = None
+
+
+class ShardSupervisor:
+    """Reparte los dispositivos entre procesos de trabajo y los reasigna si uno muere"""
+
+    def __init__(self, workers=WORKERS, device_map=None, name_prefix=DEVICE_NAME, max_devices=MAX_DEVICES,
+                 discovery_interval=DISCOVERY_INTERVAL, worker_options=None, analytics=False, record_imu=None,
+                 ring_slots=RING_SLOTS, stats_interval=STATS_INTERVAL, client_factory=None):
+        # spawn: procesos limpios, sin heredar hilos ni el bucle de eventos del padre
+        self.context = multiprocessing.get_context("spawn")
+        self.device_map = {addr.upper(): info for addr, info in (device_map or {}).items()}
+        self.name_prefix = name_prefix
+        self.max_devices = max_devices
+        self.discovery_interval = discovery_interval
+        self.worker_options = dict(worker_options or {})
+        if client_factory is not None:
+            self.worker_options["client_factory"] = client_factory
+        self.ring_slots = ring_slots
+        self.stats_interval = stats_interval
+        self.ble_lock = self.context.Lock()
+        self.reports = self.context.Queue()
+        self.shards = [Shard(i) for i in range(workers)]
+        self.assignments = {}  # dirección -> Shard
+        self.device_info = {}  # dirección -> (nombre, info)
+        self.rings = {}        # dirección -> SampleRing (el supervisor es el dueño)
+        self.readers = []
+        reader_options = {key: self.worker_options[key] for key in ("log_mode", "log_sample", "log_level")
+                          if key in self.worker_options}
+        if analytics:
+            self.readers.append(ReaderProcess("analytics", {**reader_options, "stats_interval": stats_interval}))
+        if record_imu:
+            self.readers.append(ReaderProcess("recorder", {**reader_options, "directory": record_imu,
+                                                           "stats_interval": stats_interval}))
+        self.retired = Counter()  # Contadores de procesos que murieron
+        self.running = False
+        self.next_discovery = 0.0
+        self.next_stats = 0.0
+        self.last_totals = (time.monotonic(), 0)
+
+    # ------------------------------------------------------------------
+    # Procesos
+    # ------------------------------------------------------------------
+
+    def spawn(self, shard):
+        shard.commands = self.context.Queue()
+        shard.process = self.context.Process(
+            target=run_worker, name=f"shard-{shard.index}",
+            args=(shard.index, shard.commands, self.reports, self.ble_lock, self.worker_options)
+        )
+        shard.process.start()
+        shard.restart_at = None
+        logger.info(f"Proceso {shard.index} lanzado (pid {shard.process.pid})")
+
+    def spawn_reader(self, reader):
+        reader.control = self.context.Queue()
+        reader.process = self.context.Process(target=run_reader, name=reader.kind,
+                                              args=(reader.kind, reader.control, reader.options))
+        reader.process.start()
+        for address, ring in self.rings.items():
+            reader.control.put(("add", address, ring.name))
+
+    def live_shards(self):
+        return [shard for shard in self.shards if shard.alive]
+
+    def least_loaded(self):
+        live = self.live_shards()
+        return min(live, key=lambda shard: len(shard.devices)) if live else None
+
+    # ------------------------------------------------------------------
+    # Asignación de dispositivos
+    # ------------------------------------------------------------------
+
+    def add_device(self, address, device_name=None, info=None):
+        """Crea el buffer compartido del dispositivo y lo asigna al proceso con menos carga"""
+        if address in self.device_info or len(self.device_info) >= self.max_devices:
+            return
+        info = info or {}
+        self.device_info[address] = (device_name or info.get("name", address), info)
+        ring = self.rings[address] = SampleRing(ring_name(address), self.ring_slots, create=True)
+        for reader in self.readers:
+            reader.control.put(("add", address, ring.name))
+        shard = self.least_loaded()
+        if shard is not None:
+            self.assign(address, shard)
+
+    def assign(self, address, shard):
+        device_name, info = self.device_info[address]
+        shard.devices.add(address)
+        self.assignments[address] = shard
+        shard.commands.put(("add", address, device_name, info, self.rings[address].name))
+        logger.info(f"Dispositivo {address} -> proceso {shard.index}")
+
+    def move(self, address, source, target):
+        source.devices.discard(address)
+        source.commands.put(("remove", address))
+        self.assign(address, target)
+
+    def rebalance(self):
+        """Asigna los dispositivos huérfanos y deja a cada proceso con ±1 dispositivo del resto"""
+        live = self.live_shards()
+        if not live:
+            return
+        for address in self.device_info:
+            shard = self.assignments.get(address)
+            if shard is None or not shard.alive:
+                self.assign(address, self.least_loaded())
+        while True:
+            most = max(live, key=lambda shard: len(shard.devices))
+            least = min(live, key=lambda shard: len(shard.devices))
+            if len(most.devices) - len(least.devices) <= 1:
+                break
+            self.move(next(iter(most.devices)), most, least)
+
+    def handle_exit(self, shard):
+        """Un proceso de trabajo terminó sin que se le pidiera: reasignar sus dispositivos"""
+        orphans = sorted(shard.devices)
+        logger.error(f"Proceso {shard.index} terminado (código {shard.process.exitcode}); "
+                     f"reasignando {len(orphans)} dispositivos")
+        self.retired.update({key: value for key, value in shard.stats.items()
+                             if key in ("notifications", "imu_samples", "fall_count", "cpu_seconds")})
+        shard.stats = {}
+        shard.devices = set()
+        shard.process.join()
+        shard.process = None
+        shard.restarts += 1
+        shard.restart_at = time.monotonic() + RESTART_DELAY
+        for address in orphans:
+            self.assignments.pop(address, None)
+        self.rebalance()
+
+    # ------------------------------------------------------------------
+    # Descubrimiento
+    # ------------------------------------------------------------------
+
+    def discover(self):
+        """Escaneo BLE desde el supervisor (con el cerrojo BLE) cuando no hay mapa de dispositivos"""
+        if len(self.device_info) >= self.max_devices:
+            return
+        if not self.ble_lock.acquire(True, BLE_LOCK_TIMEOUT):
+            logger.warning("Cerrojo BLE ocupado, se pospone el escaneo")
+            return
+        try:
+            found = asyncio.run(BleakScanner.discover(timeout=DISCOVERY_TIMEOUT))
+        except Exception as e:
+            logger.error(f"Error buscando dispositivos BLE: {e}")
+            return
+        finally:
+            self.ble_lock.release()
+        for device in found:
+            if device.name and device.name.startswith(self.name_prefix):
+                self.add_device(device.address, device.name)
+
+    # ------------------------------------------------------------------
+    # Bucle del supervisor
+    # ------------------------------------------------------------------
+
+    def start(self):
+        self.running = True
+        for shard in self.shards:
+            self.spawn(shard)
+        for reader in self.readers:
+            self.spawn_reader(reader)
+        for address, info in self.device_map.items():
+            self.add_device(address, info.get("name"), info)
+
+    def drain_reports(self):
+        while True:
+            try:
+                index, stats = self.reports.get_nowait()
+            except queue.Empty:
+                return
+            shard = self.shards[index]
+            if shard.alive:
+                shard.stats = stats
+
+    def get_stats(self):
+        totals = Counter(self.retired)
+        for shard in self.shards:
+            totals.update({key: value for key, value in shard.stats.items()
+                           if key in ("notifications", "imu_samples", "fall_count", "cpu_seconds", "connected")})
+        return {
+            "workers": len(self.live_shards()),
+            "devices": len(self.device_info),
+            "per_worker": {shard.index: len(shard.devices) for shard in self.shards},
+            "restarts": sum(shard.restarts for shard in self.shards),
+            **totals
+        }
+
+    def log_stats(self):
+        stats = self.get_stats()
+        current = time.monotonic()
+        last_time, last_count = self.last_totals
+        rate = (stats.get("notifications", 0) - last_count) / (current - last_time)
+        self.last_totals = (current, stats.get("notifications", 0))
+        logger.info(
+            f"Supervisor: {stats['workers']}/{len(self.shards)} procesos, {stats.get('connected', 0)}/"
+            f"{stats['devices']} conectados, {rate:.1f} notif/s, reparto {stats['per_worker']}, "
+            f"reinicios {stats['restarts']}"
+        )
+
+    def poll(self, timeout=SUPERVISE_INTERVAL):
+        """Una vuelta del supervisor: procesos caídos, reinicios, contadores y descubrimiento"""
+        sentinels = [shard.process.sentinel for shard in self.shards if shard.process is not None]
+        sentinels += [reader.process.sentinel for reader in self.readers if reader.process is not None]
+        wait(sentinels, timeout=timeout)
+        if not self.running:
+            return
+
+        for shard in self.shards:
+            if shard.process is not None and not shard.process.is_alive():
+                self.handle_exit(shard)
+        current = time.monotonic()
+        for shard in self.shards:
+            if shard.process is None and shard.restart_at is not None and current >= shard.restart_at:
+                self.spawn(shard)
+                self.rebalance()
+        for reader in self.readers:
+            if not reader.process.is_alive():
+                logger.error(f"Lector {reader.kind} terminado (código {reader.process.exitcode}), relanzando")
+                reader.process.join()
+                self.spawn_reader(reader)
+
+        self.drain_reports()
+        if not self.device_map and current >= self.next_discovery:
+            self.discover()
+            self.next_discovery = time.monotonic() + self.discovery_interval
+        if current >= self.next_stats:
+            if self.next_stats:
+                self.log_stats()
+            self.next_stats = current + self.stats_interval
+
+    def run(self):
+        self.start()
+        try:
+            while self.running:
+                self.poll()
+        except KeyboardInterrupt:
+            logger.info("Deteniendo por interrupción del usuario...")
+        finally:
+            self.stop()
+
+    def stop(self):
+        """Pide a cada proceso que termine ordenadamente y elimina los buffers compartidos"""
+        if not self.running:
+            return
+        self.running = False
+        logger.info("Deteniendo gateway repartido...")
+        for shard in self.shards:
+            if shard.alive:
+                shard.commands.put(("stop",))
+        for reader in self.readers:
+            if reader.process is not None and reader.process.is_alive():
+                reader.control.put(("stop",))
+        deadline = time.monotonic() + STOP_TIMEOUT
+        processes = [shard.process for shard in self.shards] + [reader.process for reader in self.readers]
+        for process in processes:
+            if process is None:
+                continue
+            process.join(max(0.0, deadline - time.monotonic()))
+            if process.is_alive():
+                logger.warning(f"{process.name} no terminó a tiempo, forzando")
+                process.terminate()
+                process.join()
+        self.drain_reports()
+        for ring in self.rings.values():
+            ring.close()
+            ring.unlink()
+        logger.info(f"Gateway repartido detenido: {self.get_stats()}")
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Gateway BLE de detección de caídas repartido en varios procesos")
+    parser.add_argument("--workers", type=int, default=WORKERS, help="Procesos de trabajo (por defecto, núcleos hasta 4)")
+    parser.add_argument("--ws-url", default=WS_URL, help="URL del servidor WebSocket")
+    parser.add_argument("--devices", help="Archivo JSON con el mapa dirección BLE -> usuario (ver ble_gateway.py)")
+    parser.add_argument("--name-prefix", default=DEVICE_NAME, help="Prefijo del nombre BLE si no hay mapa")
+    parser.add_argument("--user-id", default=raspberry_fall_detection.USUARIO_ID,
+                        help="ID de usuario para dispositivos sin mapa")
+    parser.add_argument("--max-devices", type=int, default=MAX_DEVICES,
+                        help="Máximo de dispositivos entre todos los procesos (límite del adaptador)")
+    parser.add_argument("--verify-falls", action="store_true",
+                        help="Confirmar los FALL del Arduino con el IMU crudo en cada proceso")
+    parser.add_argument("--capture-dir", default=raspberry_fall_detection.CAPTURE_DIR,
+                        help="Directorio de capturas IMU de cada caída (vacío para no guardarlas)")
+    parser.add_argument("--spool-dir", default=SPOOL_DIR,
+                        help="Prefijo del spool en disco de cada proceso (vacío para desactivarlo)")
+    parser.add_argument("--db", help="Escribir también en la base de datos (una conexión por proceso)")
+    parser.add_argument("--api-url", help="Guardar también las alertas por la API REST")
+    parser.add_argument("--metrics-port", type=int,
+                        help="Métricas del proceso i en http://0.0.0.0:(PUERTO+i)/metrics")
+    parser.add_argument("--analytics", action="store_true",
+                        help="Proceso lector que calcula la actividad de cada dispositivo desde la memoria compartida")
+    parser.add_argument("--record-imu", metavar="DIR",
+                        help="Proceso lector que guarda el IMU crudo de cada dispositivo en DIR/<dispositivo>.imu")
+    parser.add_argument("--ring-slots", type=int, default=RING_SLOTS, help="Muestras por buffer compartido")
+    parser.add_argument("--stats-interval", type=int, default=STATS_INTERVAL, help="Segundos entre reportes")
+    add_logging_arguments(parser)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format=SHARD_LOG_FORMAT, force=True)
+    logs = configure_logging(args.log_mode, args.log_sample, args.ws_trace)
+
+    device_map = None
+    if args.devices:
+        with open(args.devices) as f:
+            device_map = json.load(f)
+
+    supervisor = ShardSupervisor(
+        workers=args.workers,
+        device_map=device_map,
+        name_prefix=args.name_prefix,
+        max_devices=args.max_devices,
+        analytics=args.analytics,
+        record_imu=args.record_imu,
+        ring_slots=args.ring_slots,
+        stats_interval=args.stats_interval,
+        worker_options={
+            "ws_url": args.ws_url,
+            "user_id": args.user_id,
+            "verify_falls": args.verify_falls,
+            "capture_dir": args.capture_dir or None,
+            "spool_dir": args.spool_dir or None,
+            "db": args.db,
+            "api_url": args.api_url,
+            "metrics_port": args.metrics_port,
+            "stats_interval": args.stats_interval,
+            "log_mode": args.log_mode,
+            "log_sample": args.log_sample,
+        }
+    )
+    try:
+        supervisor.run()
+    finally:
+        if logs is not None:
+            logs.stop()
+
+
+if __name__ == "__main__":
+    main()
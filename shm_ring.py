@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Buffers circulares de muestras IMU en memoria compartida entre procesos.
+
+Cada dispositivo tiene un SampleRing (multiprocessing.shared_memory) con sitio
+para RING_SLOTS muestras int16 (ax ay az en mg, gx gy gz en 0.1 °/s, el mismo
+formato de las tramas IMU de ble_frames.py) y la marca de tiempo del Arduino de
+cada una. El proceso que recibe las notificaciones del dispositivo es el único
+que escribe; cualquier número de procesos de análisis o grabación lee con un
+RingReader propio, directamente de la memoria compartida, sin serializar ni
+pasar las muestras por colas o pipes.
+
+Diseño (un escritor, varios lectores):
+- La cabecera guarda el total de muestras escritas. El escritor copia las
+  muestras y después actualiza el total; el lector lee el total, copia las
+  muestras nuevas y vuelve a leer el total: lo que el escritor haya
+  sobrescrito mientras tanto se descarta y se cuenta como perdido.
+- Un lector que se queda más de RING_SLOTS muestras atrás pierde las más
+  antiguas (no frena al escritor nunca).
+- Python no expone barreras de memoria; en la práctica la actualización del
+  total sucede muchas instrucciones después de la copia de las muestras.
+
+El bloque lo crea (y lo elimina al terminar) el supervisor de
+sharded_gateway.py, así que sobrevive a la caída del proceso que escribe: el
+proceso que hereda el dispositivo sigue escribiendo en el mismo buffer.
+
+Dependencias:
+pip install numpy
+
+Autor: Tu nombre
+Fecha: Octubre 2025
+"""
+
+import logging
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+RING_SLOTS = 4096            # Muestras por dispositivo (~40 s a 100 Hz, ~3 min a 20 Hz)
+RING_PREFIX = "fd_imu_"      # Prefijo del nombre del bloque en /dev/shm
+IMU_AXES = 6
+HEADER_FIELDS = 2            # [muestras escritas, capacidad]
+HEADER_BYTES = 8 * HEADER_FIELDS
+
+
+def ring_name(address):
+    """Nombre del bloque compartido de un dispositivo (AA:BB:... -> fd_imu_aabb...)"""
+    return RING_PREFIX + "".join(c for c in address.lower() if c.isalnum())
+
+
+def ring_size(slots):
+    return HEADER_BYTES + slots * 8 + slots * IMU_AXES * 2
+
+
+class SampleRing:
+    """Buffer circular de muestras IMU int16 en un bloque de memoria compartida"""
+
+    def __init__(self, name, slots=RING_SLOTS, create=False):
+        self.name = name
+        self.slots = slots
+        self.owner = create
+        if create:
+            try:
+                self.shm = shared_memory.SharedMemory(name=name, create=True, size=ring_size(slots))
+            except FileExistsError:
+                # Bloque de una ejecución anterior que no terminó limpiamente
+                stale = shared_memory.SharedMemory(name=name)
+                stale.close()
+                stale.unlink()
+                self.shm = shared_memory.SharedMemory(name=name, create=True, size=ring_size(slots))
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+        # Solo el creador elimina el bloque, con unlink(). Fuera del resource_tracker:
+        # los procesos spawn comparten el del padre y lo borrarían al salir cualquiera
+        # de ellos aunque el supervisor y los lectores lo sigan usando (si el creador
+        # muere sin unlink, la siguiente ejecución limpia el bloque al crearlo)
+        resource_tracker.unregister(self.shm._name, "shared_memory")
+        buf = self.shm.buf
+        self.header = np.ndarray((HEADER_FIELDS,), dtype=np.int64, buffer=buf)
+        if create:
+            self.header[:] = (0, slots)
+        else:
+            slots = self.slots = int(self.header[1])
+        self.timestamps = np.ndarray((slots,), dtype=np.int64, buffer=buf, offset=HEADER_BYTES)
+        self.samples = np.ndarray((slots, IMU_AXES), dtype=np.int16, buffer=buf, offset=HEADER_BYTES + slots * 8)
+
+    @property
+    def written(self):
+        return int(self.header[0])
+
+    def publish(self, timestamp, period_ms, samples):
+        """Escribe las muestras de una trama IMU (vista int16 de n × 6 valores)"""
+        raw = np.frombuffer(samples, dtype=np.int16).reshape(-1, IMU_AXES)
+        n = len(raw)
+        if not n:
+            return
+        total = int(self.header[0]) + n
+        times = timestamp + period_ms * np.arange(n, dtype=np.int64)
+        if n > self.slots:
+            # Solo caben las últimas: los lectores cuentan las demás como perdidas
+            raw, times = raw[-self.slots:], times[-self.slots:]
+            n = self.slots
+        first = (total - n) % self.slots
+        head = min(n, self.slots - first)
+        self.samples[first:first + head] = raw[:head]
+        self.timestamps[first:first + head] = times[:head]
+        if head < n:
+            self.samples[:n - head] = raw[head:]
+            self.timestamps[:n - head] = times[head:]
+        self.header[0] = total  # Publicar después de copiar
+
+    def close(self):
+        # Las vistas numpy retienen el buffer: hay que soltarlas antes de cerrar
+        self.header = self.timestamps = self.samples = None
+        self.shm.close()
+
+    def unlink(self):
+        if self.owner:
+            try:
+                # unlink() también lo quita del resource_tracker: volver a registrarlo antes
+                resource_tracker.register(self.shm._name, "shared_memory")
+                self.shm.unlink()
+            except FileNotFoundError:
+                pass
+
+
+class RingReader:
+    """Posición de lectura propia sobre un SampleRing"""
+
+    def __init__(self, ring, from_start=False):
+        self.ring = ring
+        self.position = 0 if from_start else ring.written
+        self.lost = 0
+
+    def read(self, max_samples=None):
+        """
+        Devuelve (marcas de tiempo, muestras n × 6) escritas desde la lectura
+        anterior, como copias. Las que se sobrescribieron antes de leerlas se
+        suman a self.lost
+        """
+        ring = self.ring
+        slots = ring.slots
+        end = ring.written
+        if end - self.position > slots:
+            self.lost += end - slots - self.position
+            self.position = end - slots
+        if max_samples is not None:
+            end = min(end, self.position + max_samples)
+        n = end - self.position
+        if n <= 0:
+            return ring.timestamps[:0].copy(), ring.samples[:0].copy()
+
+        first = self.position % slots
+        head = min(n, slots - first)
+        if head == n:
+            times = ring.timestamps[first:first + n].copy()
+            samples = ring.samples[first:first + n].copy()
+        else:
+            times = np.concatenate((ring.timestamps[first:], ring.timestamps[:n - head]))
+            samples = np.concatenate((ring.samples[first:], ring.samples[:n - head]))
+
+        # Lo que el escritor sobrescribió durante la copia no es fiable
+        overwritten = ring.written - slots - self.position
+        if overwritten > 0:
+            self.lost += min(overwritten, n)
+            times, samples = times[overwritten:], samples[overwritten:]
+        self.position = end
+        return times, samples
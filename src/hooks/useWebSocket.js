@@ -1,6 +1,10 @@
 import { useState, useEffect, useRef, useCallback } from 'react';
 
-const useWebSocket = (url = 'ws://localhost:8080') => {
+// Refrescos por segundo de la telemetría: el servidor Python (ws_relay_server.py) envía
+// solo el último valor de cada dispositivo a esta frecuencia; las alertas llegan al momento
+const FRAME_RATE = 4;
+
+const useWebSocket = (url = 'ws://localhost:8080', frameRate = FRAME_RATE) => {
     const [socket, setSocket] = useState(null);
     const [isConnected, setIsConnected] = useState(false);
     const [sensorData, setSensorData] = useState(null);
@@ -25,7 +29,8 @@ const useWebSocket = (url = 'ws://localhost:8080') => {
                 // Identificarse como cliente React
                 ws.send(JSON.stringify({
                     type: 'identify',
-                    client: 'react'
+                    client: 'react',
+                    frame_rate: frameRate
                 }));
             };
 
@@ -145,7 +150,7 @@ const useWebSocket = (url = 'ws://localhost:8080') => {
             setError('No se pudo crear la conexión WebSocket');
             setConnectionStatus('Error al conectar');
         }
-    }, [url]);
+    }, [url, frameRate]);
 
     const disconnect = useCallback(() => {
         if (reconnectTimeoutRef.current) {
@@ -0,0 +1,493 @@
+#!/usr/bin/env python3
+"""
+Grabación y reproducción de los flujos BLE y serial del Arduino.
+
+StreamRecorder guarda los bytes crudos tal como llegan (notificaciones BLE en
+notification_handler, líneas de read_sensor_data y bloques del lector en
+streaming) con marcas de tiempo de resolución de microsegundos. El reproductor
+los vuelve a inyectar por los mismos handlers con un BleakClient y un puerto
+serial falsos, a velocidad real (1×), acelerada (N×) o máxima (0), sin el
+Arduino. A velocidad máxima sirve a la vez de prueba de regresión (--expect
+compara el resumen de mensajes con uno guardado) y de benchmark de throughput.
+
+Formato del archivo (little-endian):
+  cabecera:  b"FDREC\\x01" + float64 con el time.time() del inicio
+  registro:  uint32 µs desde el registro anterior, uint8 tipo, uint16 fuente,
+             uint16 longitud, datos
+Un registro SOURCE asigna el siguiente número de fuente a un nombre (dirección
+BLE o puerto serial); los huecos de más de ~71 minutos se rellenan con
+registros PAD vacíos.
+
+Grabar:
+python3 raspberry_fall_detection.py --record incidente.rec
+python3 ble_gateway.py --record residencia.rec
+python3 raspberry_sensor_sender.py --stream --record serial.rec
+
+Reproducir:
+python3 stream_replay.py incidente.rec --info
+python3 stream_replay.py incidente.rec --speed 1            # tiempo real
+python3 stream_replay.py incidente.rec --speed 0 --save-summary ref.json
+python3 stream_replay.py incidente.rec --speed 0 --expect ref.json
+python3 stream_replay.py incidente.rec --ws-url ws://localhost:8080   # contra el servidor real
+
+Autor: Tu nombre
+Fecha: Octubre 2025
+"""
+
+import asyncio
+import logging
+import queue
+import struct
+import sys
+import threading
+import time
+from collections import Counter, namedtuple
+
+from message_codec import dumps, loads
+from metrics import STAGE_END_TO_END, now
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"FDREC\x01"
+FILE_HEADER = struct.Struct("<6sd")
+RECORD_HEADER = struct.Struct("<IBHH")
+MAX_DELTA_US = 0xFFFFFFFF
+MAX_PAYLOAD = 0xFFFF
+FLUSH_INTERVAL = 1.0         # Segundos máximos de datos sin escribir a disco
+RECORDER_QUEUE_SIZE = 100000 # Registros pendientes de escribir como máximo
+
+# Tipos de registro
+KIND_SOURCE = 0              # Nombre de una fuente nueva
+KIND_BLE = 1                 # Notificación BLE
+KIND_SERIAL_LINE = 2         # Línea de read_sensor_data (modo sondeo)
+KIND_SERIAL_CHUNK = 3        # Bloque leído por SerialStreamReader (modo streaming)
+KIND_PAD = 4                 # Relleno de huecos largos
+
+KIND_NAMES = {KIND_BLE: "ble", KIND_SERIAL_LINE: "serial", KIND_SERIAL_CHUNK: "serial_stream"}
+
+# Tipos que dependen del reloj de pared y no se comparan en --expect
+NONDETERMINISTIC_TYPES = {"sensor_rollup"}
+
+Record = namedtuple("Record", "offset kind source data")
+
+
+class StreamRecorder:
+    """
+    Escribe registros crudos en un archivo de grabación (seguro entre hilos).
+    record() solo encola el registro con su marca de tiempo; la escritura y el
+    flush a disco los hace un hilo propio, fuera del bucle BLE
+    """
+
+    def __init__(self, path, queue_size=RECORDER_QUEUE_SIZE):
+        self.path = path
+        self.file = open(path, "wb", buffering=1 << 16)
+        self.file.write(FILE_HEADER.pack(MAGIC, time.time()))
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.sources = {}
+        self.last_us = time.perf_counter_ns() // 1000
+        self.last_flush = time.monotonic()
+        self.stats = {"records": 0, "bytes": 0, "dropped": 0}
+        self.running = True
+        self.thread = threading.Thread(target=self.run, name="stream-recorder", daemon=True)
+        self.thread.start()
+
+    def record(self, kind, source, data):
+        if not self.running:
+            return
+        try:
+            self.queue.put_nowait((time.perf_counter_ns() // 1000, kind, source, bytes(data)))
+        except queue.Full:
+            self.stats["dropped"] += 1
+
+    def run(self):
+        """Hilo escritor: vacía la cola y hace flush como mucho cada FLUSH_INTERVAL"""
+        while True:
+            try:
+                item = self.queue.get(timeout=FLUSH_INTERVAL)
+            except queue.Empty:
+                item = ()
+            if item is None:
+                return
+            if item:
+                current, kind, source, data = item
+                source_id = self.sources.get(source)
+                if source_id is None:
+                    source_id = self.sources[source] = len(self.sources)
+                    self.write(current, KIND_SOURCE, source_id, str(source).encode("utf-8"))
+                for start in range(0, max(len(data), 1), MAX_PAYLOAD):
+                    self.write(current, kind, source_id, data[start:start + MAX_PAYLOAD])
+                self.stats["records"] += 1
+                self.stats["bytes"] += len(data)
+            if time.monotonic() - self.last_flush >= FLUSH_INTERVAL:
+                self.file.flush()
+                self.last_flush = time.monotonic()
+
+    def write(self, current, kind, source_id, payload):
+        delta = max(0, current - self.last_us)
+        self.last_us = max(self.last_us, current)
+        while delta > MAX_DELTA_US:
+            self.file.write(RECORD_HEADER.pack(MAX_DELTA_US, KIND_PAD, 0, 0))
+            delta -= MAX_DELTA_US
+        self.file.write(RECORD_HEADER.pack(delta, kind, source_id, len(payload)))
+        self.file.write(payload)
+
+    def close(self):
+        if not self.running:
+            return
+        self.running = False
+        self.queue.put(None)  # Después de lo pendiente: se escribe todo antes de cerrar
+        self.thread.join()
+        self.file.close()
+        logger.info(f"Grabación {self.path}: {self.stats['records']} registros, "
+                    f"{self.stats['bytes']} bytes de datos"
+                    + (f", {self.stats['dropped']} descartados" if self.stats["dropped"] else ""))
+
+
+def read_recording(path):
+    """Devuelve (inicio time.time(), lista de Record con offset en segundos desde el inicio)"""
+    with open(path, "rb") as f:
+        data = f.read()
+    if len(data) < FILE_HEADER.size:
+        raise ValueError(f"{path}: archivo de grabación vacío")
+    magic, started = FILE_HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError(f"{path}: no es una grabación ({magic!r})")
+
+    records = []
+    names = {}
+    position = FILE_HEADER.size
+    elapsed_us = 0
+    first_us = None
+    while position + RECORD_HEADER.size <= len(data):
+        delta, kind, source_id, length = RECORD_HEADER.unpack_from(data, position)
+        position += RECORD_HEADER.size
+        payload = data[position:position + length]
+        if len(payload) < length:
+            logger.warning(f"{path}: último registro incompleto, se ignora")
+            break
+        position += length
+        elapsed_us += delta
+        if kind == KIND_SOURCE:
+            names[source_id] = payload.decode("utf-8")
+        elif kind != KIND_PAD:
+            if first_us is None:
+                first_us = elapsed_us
+            records.append(Record((elapsed_us - first_us) / 1e6, kind, names.get(source_id, str(source_id)),
+                                  payload))
+    return started, records
+
+
+def describe(records):
+    """Resumen de una grabación por fuente y tipo"""
+    summary = {}
+    for record in records:
+        entry = summary.setdefault((record.source, KIND_NAMES.get(record.kind, record.kind)),
+                                   {"records": 0, "bytes": 0, "first": record.offset})
+        entry["records"] += 1
+        entry["bytes"] += len(record.data)
+        entry["last"] = record.offset
+    return summary
+
+
+class ReplayChannel:
+    """Sustituto de WebSocketChannel que cuenta (y opcionalmente guarda) los mensajes producidos"""
+
+    connected = True
+    spool = None
+
+    def __init__(self, output=None):
+        self.output = open(output, "w") if output else None
+        self.counts = Counter()
+        self.severities = Counter()
+        self.sent_count = 0
+        self.lock = threading.Lock()
+
+    def send(self, message, received=None):
+        with self.lock:
+            msg_type = message.get("type")
+            self.counts[msg_type] += 1
+            self.sent_count += 1
+            if msg_type == "fall_alert":
+                self.severities[message.get("severity")] += 1
+            if self.output is not None:
+                self.output.write(dumps(message) + "\n")
+        if received is not None:
+            STAGE_END_TO_END.observe(now() - received)
+        return True
+
+    def get_stats(self):
+        return {"sent": self.sent_count, "types": dict(self.counts)}
+
+    def summary(self):
+        return {
+            "messages": {key: value for key, value in sorted(self.counts.items())
+                         if key not in NONDETERMINISTIC_TYPES},
+            "fall_alerts": dict(sorted(self.severities.items()))
+        }
+
+    def close(self, drain_timeout=None):
+        if self.output is not None:
+            self.output.close()
+            self.output = None
+
+    async def aclose(self, drain_timeout=None):
+        self.close()
+
+
+class FakeBleakClient:
+    """BleakClient que entrega las notificaciones grabadas de una dirección"""
+
+    def __init__(self, address, records, speed=1.0, start=None):
+        self.address = address
+        self.records = [(record.offset, record.data) for record in records]
+        self.speed = speed  # 0 = tan rápido como se pueda
+        self.start = start  # loop.time() común a todos los clientes de la reproducción
+        self.is_connected = False
+        self.task = None
+        self.finished = None
+        self.delivered = 0
+
+    async def connect(self):
+        self.finished = asyncio.Event()
+        self.is_connected = True
+        return True
+
+    async def start_notify(self, char_uuid, callback):
+        self.task = asyncio.create_task(self.feed(callback))
+
+    async def feed(self, callback):
+        loop = asyncio.get_running_loop()
+        if self.start is None:
+            self.start = loop.time()
+        try:
+            for offset, data in self.records:
+                if self.speed:
+                    delay = self.start + offset / self.speed - loop.time()
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+                elif self.delivered % 64 == 0:
+                    await asyncio.sleep(0)  # Dejar correr a los workers y al escritor del canal
+                await callback(None, bytearray(data))
+                self.delivered += 1
+        finally:
+            self.finished.set()
+
+    async def stop_notify(self, char_uuid):
+        if self.task is not None and not self.task.done():
+            self.task.cancel()
+
+    async def disconnect(self):
+        await self.stop_notify(None)
+        self.is_connected = False
+        return True
+
+
+class FakeSerial:
+    """Puerto serial que entrega los bytes grabados respetando sus tiempos"""
+
+    def __init__(self, records, speed=1.0, timeout=1.0):
+        self.records = [(record.offset, record.data) for record in records]
+        self.speed = speed  # 0 = tan rápido como se pueda
+        self.timeout = timeout
+        self.index = 0
+        self.buffer = bytearray()
+        self.start = None
+        self.is_open = True
+
+    @property
+    def exhausted(self):
+        return self.index >= len(self.records) and not self.buffer
+
+    def release(self):
+        """Pasa al buffer los registros cuyo momento ya llegó"""
+        if self.start is None:
+            self.start = time.monotonic()
+        if not self.speed:
+            while self.index < len(self.records) and len(self.buffer) < 65536:
+                self.buffer += self.records[self.index][1]
+                self.index += 1
+            return
+        elapsed = (time.monotonic() - self.start) * self.speed
+        while self.index < len(self.records) and self.records[self.index][0] <= elapsed:
+            self.buffer += self.records[self.index][1]
+            self.index += 1
+
+    def wait(self, deadline):
+        """Duerme hasta el siguiente registro o el deadline. Devuelve False si no queda nada por esperar"""
+        if self.index >= len(self.records):
+            return False
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return False
+        due = self.start + self.records[self.index][0] / self.speed - time.monotonic()
+        time.sleep(max(0.0, min(due, remaining)))
+        return True
+
+    @property
+    def in_waiting(self):
+        self.release()
+        return len(self.buffer)
+
+    def read(self, size=1):
+        deadline = time.monotonic() + self.timeout
+        self.release()
+        while not self.buffer and self.wait(deadline):
+            self.release()
+        data = bytes(self.buffer[:size])
+        del self.buffer[:size]
+        return data
+
+    def readline(self):
+        deadline = time.monotonic() + self.timeout
+        self.release()
+        while b"\n" not in self.buffer and self.wait(deadline):
+            self.release()
+        end = self.buffer.find(b"\n") + 1 or len(self.buffer)
+        data = bytes(self.buffer[:end])
+        del self.buffer[:end]
+        return data
+
+    def write(self, data):
+        return len(data)
+
+    def reset_input_buffer(self):
+        self.buffer.clear()
+
+    def close(self):
+        self.is_open = False
+
+
+async def replay_ble(records, speed=0.0, ws_url=None, verify_falls=False, output=None):
+    """Reproduce notificaciones BLE a través del gateway (una sesión por dirección grabada)"""
+    from ble_gateway import FallDetectionGateway, GatewayDevice
+    from raspberry_fall_detection import TICK_INTERVAL
+    try:
+        from fall_engine import VERIFY_TIMEOUT
+    except ImportError:
+        VERIFY_TIMEOUT = 0.0
+
+    gateway = FallDetectionGateway(ws_url=ws_url or "ws://localhost:8080", spool_dir=None,
+                                   verify_falls=verify_falls, capture_dir=None)
+    gateway.running = True
+    gateway.ble_lock = asyncio.Lock()
+    if ws_url:
+        if not await gateway.connect_websocket():
+            raise ConnectionError(f"No se pudo conectar a {ws_url}")
+    else:
+        gateway.channel = ReplayChannel(output)
+    gateway.alert_fanout.start()
+    engine_task = asyncio.create_task(gateway.run_fall_engine()) if gateway.owns_engine else None
+
+    by_source = {}
+    for record in records:
+        by_source.setdefault(record.source, []).append(record)
+    start = asyncio.get_running_loop().time()
+    clients = []
+    for address, source_records in by_source.items():
+        session = GatewayDevice(gateway, address, address)
+        session.running = True
+        client = FakeBleakClient(address, source_records, speed, start)
+        session.ble_client_class = lambda address, client=client, **kwargs: client
+        gateway.devices[address] = session
+        await session.connect_ble()
+        clients.append(client)
+
+    await asyncio.gather(*(client.finished.wait() for client in clients))
+    if engine_task is not None:
+        # Veredictos pendientes de las últimas alertas (se resuelven como mucho en VERIFY_TIMEOUT)
+        deadline = time.monotonic() + VERIFY_TIMEOUT + 1
+        while gateway.fall_engine.get_stats()["pending"] and time.monotonic() < deadline:
+            await asyncio.sleep(TICK_INTERVAL)
+        engine_task.cancel()
+    channel = gateway.channel
+    await gateway.stop()
+    return channel, sum(client.delivered for client in clients)
+
+
+def replay_serial(records, speed=0.0, ws_url=None, output=None):
+    """Reproduce líneas o bloques seriales a través de SensorDataSender"""
+    from raspberry_sensor_sender import SensorDataSender
+    from serial_stream import READ_TIMEOUT
+
+    stream = any(record.kind == KIND_SERIAL_CHUNK for record in records)
+    fake = FakeSerial(records, speed, timeout=READ_TIMEOUT if stream else 1.0)
+    sender = SensorDataSender(ws_url=ws_url or "ws://localhost:8080", serial_port=records[0].source,
+                              spool_dir=None, interval=0 if not speed else 0.001, stream=stream,
+                              serial_connection=fake)
+    channel = None
+    if not ws_url:
+        channel = sender.channel = ReplayChannel(output)
+
+    thread = threading.Thread(target=sender.run, name="replay-sender")
+    thread.start()
+    while not fake.exhausted or (sender.reader is not None and not sender.reader.queue.empty()):
+        time.sleep(0.01)
+    time.sleep(0.05)  # Último bloque en vuelo entre el lector y el bucle de envío
+    sender.running = False
+    thread.join()
+    return channel or sender.channel, len(records)
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Reproducir una grabación BLE o serial del Arduino")
+    parser.add_argument("recording", help="Archivo grabado con --record")
+    parser.add_argument("--speed", type=float, default=0.0, help="Velocidad (1 = tiempo real, 0 = máxima)")
+    parser.add_argument("--ws-url", help="Enviar al servidor WebSocket en lugar de contar los mensajes en memoria")
+    parser.add_argument("--verify-falls", action="store_true", help="Confirmar los FALL con el IMU grabado")
+    parser.add_argument("--output", help="Guardar los mensajes producidos en JSON Lines")
+    parser.add_argument("--info", action="store_true", help="Solo mostrar el contenido de la grabación")
+    parser.add_argument("--save-summary", help="Guardar el resumen de mensajes como referencia")
+    parser.add_argument("--expect", help="Comparar el resumen con una referencia (código de salida 1 si difiere)")
+    parser.add_argument("--verbose", action="store_true", help="Mostrar el log de los handlers")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    if not args.verbose:
+        # Los handlers registran cada notificación; a velocidad máxima el log domina el tiempo
+        logging.getLogger().setLevel(logging.WARNING)
+        logger.setLevel(logging.INFO)
+
+    started, records = read_recording(args.recording)
+    duration = records[-1].offset if records else 0.0
+    print(f"{args.recording}: {len(records)} registros en {duration:.1f} s, grabado el "
+          f"{time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(started))}")
+    for (source, kind), entry in sorted(describe(records).items()):
+        print(f"  {source:24} {kind:14} {entry['records']:>8} registros {entry['bytes']:>10} bytes "
+              f"({entry['first']:.1f}-{entry['last']:.1f} s)")
+    if args.info or not records:
+        return
+
+    ble = [record for record in records if record.kind == KIND_BLE]
+    serial_records = [record for record in records if record.kind in (KIND_SERIAL_LINE, KIND_SERIAL_CHUNK)]
+    start = time.perf_counter()
+    if ble:
+        channel, delivered = asyncio.run(replay_ble(ble, args.speed, args.ws_url, args.verify_falls, args.output))
+    else:
+        channel, delivered = replay_serial(serial_records, args.speed, args.ws_url, args.output)
+    elapsed = time.perf_counter() - start
+
+    stats = channel.get_stats()
+    print(f"Reproducidos {delivered} registros en {elapsed:.2f} s "
+          f"({delivered / elapsed:.0f} registros/s, {f'{args.speed:g}×' if args.speed else 'velocidad máxima'}), "
+          f"{stats['sent']} mensajes ({stats['sent'] / elapsed:.0f} msg/s)")
+
+    if not isinstance(channel, ReplayChannel):
+        return
+    summary = channel.summary()
+    print(f"Resumen: {dumps(summary)}")
+    if args.save_summary:
+        with open(args.save_summary, "w") as f:
+            f.write(dumps(summary) + "\n")
+    if args.expect:
+        with open(args.expect) as f:
+            expected = loads(f.read())
+        if expected != summary:
+            print(f"DIFERENCIA con {args.expect}: esperado {dumps(expected)}")
+            sys.exit(1)
+        print(f"Coincide con {args.expect}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Micro-batching de telemetría de sensores.
+
+Agrupa lecturas durante una ventana de tiempo o de tamaño y las emite como un
+único mensaje "sensor_data_batch" en formato columnar con claves cortas: un
+timestamp base (epoch en ms) más desplazamientos en ms por muestra.
+
+Ejemplo de mensaje:
+{"type":"sensor_data_batch","v":1,"t0":1729000000000,"n":3,"dt":[0,10,20],
+ "c":{"tp":[22.5,22.5,22.6],"hu":[...],"pr":[...],"ax":[...],"ay":[...],"az":[...],
+      "gx":[...],"gy":[...],"gz":[...]}}
+
+Autor: Tu nombre
+Fecha: Octubre 2025
+"""
+
+import time
+from datetime import datetime
+
+BATCH_VERSION = 1
+BATCH_MAX_SAMPLES = 50       # Muestras por lote como máximo
+BATCH_MAX_AGE = 1.0          # Segundos como máximo que una muestra espera en el lote
+
+# Columna corta -> función que extrae el valor de una lectura en formato estándar
+COLUMNS = {
+    "tp": lambda r: r.get("temperature"),
+    "hu": lambda r: r.get("humidity"),
+    "pr": lambda r: r.get("pressure"),
+    "ax": lambda r: (r.get("acceleration") or {}).get("x"),
+    "ay": lambda r: (r.get("acceleration") or {}).get("y"),
+    "az": lambda r: (r.get("acceleration") or {}).get("z"),
+    "gx": lambda r: (r.get("gyroscope") or {}).get("x"),
+    "gy": lambda r: (r.get("gyroscope") or {}).get("y"),
+    "gz": lambda r: (r.get("gyroscope") or {}).get("z"),
+}
+
+
+class TelemetryBatcher:
+    """Acumula lecturas y las emite como lotes columnares"""
+
+    def __init__(self, max_samples=BATCH_MAX_SAMPLES, max_age=BATCH_MAX_AGE, device_id=None):
+        self.max_samples = max_samples
+        self.max_age = max_age
+        self.device_id = device_id
+        self.reset()
+
+    def reset(self):
+        self.t0 = None
+        self.started = None
+        self.offsets = []
+        self.columns = {name: [] for name in COLUMNS}
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def add(self, reading, timestamp=None):
+        """Añade una lectura. Devuelve el lote si se llenó, o None"""
+        timestamp_ms = int((timestamp if timestamp is not None else time.time()) * 1000)
+        if self.t0 is None:
+            self.t0 = timestamp_ms
+            self.started = time.monotonic()
+        self.offsets.append(timestamp_ms - self.t0)
+        for name, extract in COLUMNS.items():
+            self.columns[name].append(extract(reading))
+
+        if len(self.offsets) >= self.max_samples:
+            return self.flush()
+        return None
+
+    def poll(self):
+        """Devuelve el lote si la ventana de tiempo expiró, o None"""
+        if self.offsets and time.monotonic() - self.started >= self.max_age:
+            return self.flush()
+        return None
+
+    def flush(self):
+        """Emite el lote actual (o None si está vacío) y empieza uno nuevo"""
+        if not self.offsets:
+            return None
+        batch = {
+            "type": "sensor_data_batch",
+            "v": BATCH_VERSION,
+            "t0": self.t0,
+            "n": len(self.offsets),
+            "dt": self.offsets,
+            "c": self.columns
+        }
+        if self.device_id:
+            batch["device_id"] = self.device_id
+        self.reset()
+        return batch
+
+
+def expand_batch(batch):
+    """Convierte un lote en la lista de mensajes sensor_data equivalentes"""
+    t0 = batch["t0"]
+    columns = batch["c"]
+
+    def value(name, i):
+        values = columns.get(name)
+        return values[i] if values else None
+
+    messages = []
+    for i, offset in enumerate(batch["dt"]):
+        message = {
+            "type": "sensor_data",
+            "timestamp": datetime.fromtimestamp((t0 + offset) / 1000).isoformat(),
+            "temperature": value("tp", i),
+            "humidity": value("hu", i),
+            "pressure": value("pr", i),
+            "acceleration": {"x": value("ax", i), "y": value("ay", i), "z": value("az", i)},
+            "gyroscope": {"x": value("gx", i), "y": value("gy", i), "z": value("gz", i)}
+        }
+        if "device_id" in batch:
+            message["device_id"] = batch["device_id"]
+        messages.append(message)
+    return messages
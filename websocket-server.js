@@ -20,6 +20,8 @@ const fallDetectionClients = new Set();
 // Almacenar historial de alertas (en memoria)
 const alertHistory = [];
 const maxAlerts = 100;
+// Capturas IMU (fall_capture) por alert_id, pueden llegar antes que su alerta verificada
+const fallCaptures = new Map();
 
 wss.on('connection', (ws, req) => {
     console.log('Nueva conexión WebSocket');
@@ -84,6 +86,23 @@ wss.on('connection', (ws, req) => {
                     }
                 });
             }
+            // Si es un lote de lecturas (micro-batching de raspberry_sensor_sender.py)
+            else if (data.type === 'sensor_data_batch') {
+                const samples = expandSensorBatch(data);
+                console.log(`Lote de ${samples.length} lecturas recibido`);
+                
+                // Guardar el lote completo en una sola petición ({"readings": [...]})
+                if (samples.length > 0) {
+                    await saveSensorBatchToDB(samples);
+                }
+                
+                // Retransmitir cada lectura a los clientes React en el formato habitual
+                reactClients.forEach(client => {
+                    if (client.readyState === WebSocket.OPEN) {
+                        samples.forEach(sample => client.send(JSON.stringify(sample)));
+                    }
+                });
+            }
             // Si es una alerta de caída
             else if (data.type === 'fall_alert') {
                 console.log('🚨 ALERTA DE CAÍDA:', data);
@@ -96,6 +115,9 @@ wss.on('connection', (ws, req) => {
                     ...data,
                     receivedAt: new Date().toISOString()
                 };
+                if (fallCaptures.has(alert.alert_id)) {
+                    alert.imu_capture = fallCaptures.get(alert.alert_id);
+                }
                 alertHistory.push(alert);
                 
                 // Mantener solo las últimas alertas
@@ -110,6 +132,30 @@ wss.on('connection', (ws, req) => {
                     }
                 });
             }
+            // Si es la captura IMU antes/después de una caída
+            else if (data.type === 'fall_capture') {
+                console.log(`📈 Captura IMU de ${data.alert_id}: ${data.pre_samples} + ${data.post_samples} muestras`);
+                
+                fallCaptures.set(data.alert_id, data);
+                if (fallCaptures.size > maxAlerts) {
+                    fallCaptures.delete(fallCaptures.keys().next().value);
+                }
+                const alert = alertHistory.find(item => item.alert_id === data.alert_id);
+                if (alert) {
+                    alert.imu_capture = data;
+                }
+                
+                // Retransmitir a todos los clientes React
+                reactClients.forEach(client => {
+                    if (client.readyState === WebSocket.OPEN) {
+                        client.send(JSON.stringify(data));
+                    }
+                });
+            }
+            // Si es un bucket de agregados (1 min / 1 h / 1 día) de la Raspberry Pi
+            else if (data.type === 'sensor_rollup') {
+                await saveRollupToDB(data);
+            }
             // Si es actualización de estado del sistema
             else if (data.type === 'system_status') {
                 console.log('Estado del sistema:', data);
@@ -150,6 +196,23 @@ wss.on('connection', (ws, req) => {
     });
 });
 
+// Convierte un sensor_data_batch columnar en mensajes sensor_data individuales
+function expandSensorBatch(batch) {
+    const columns = batch.c || {};
+    const value = (name, i) => (columns[name] ? columns[name][i] : null);
+    
+    return (batch.dt || []).map((offset, i) => ({
+        type: 'sensor_data',
+        timestamp: new Date(batch.t0 + offset).toISOString(),
+        device_id: batch.device_id,
+        temperature: value('tp', i),
+        humidity: value('hu', i),
+        pressure: value('pr', i),
+        acceleration: { x: value('ax', i), y: value('ay', i), z: value('az', i) },
+        gyroscope: { x: value('gx', i), y: value('gy', i), z: value('gz', i) }
+    }));
+}
+
 // Función para enviar datos de prueba (útil para testing)
 function sendTestData() {
     const testData = {
@@ -194,6 +257,26 @@ server.listen(PORT, () => {
 // Funciones para guardar datos en base de datos
 // =====================================================
 
+// Lectura en el formato de POST /sensor-data (las del sender serial traen los datos en el nivel superior)
+function sensorPayload(data) {
+    return {
+        device_id: data.device_name || data.device_id || 'unknown',
+        user_id: data.user_id || 'default_user',
+        timestamp: data.timestamp || new Date().toISOString(),
+        arduino_timestamp: data.arduino_timestamp,
+        sensor_data: data.sensor_data || {
+            environment: { temperature: data.temperature, humidity: data.humidity, pressure: data.pressure },
+            acceleration: data.acceleration || {},
+            gyroscope: data.gyroscope || {}
+        },
+        baseline_acceleration: data.baseline_acceleration,
+        current_acceleration: data.current_acceleration,
+        system_active: data.system_active !== undefined ? data.system_active : true,
+        fall_count: data.fall_count || 0,
+        data_source: data.platform === 'Windows' ? 'simulator' : 'arduino'
+    };
+}
+
 async function saveSensorDataToDB(data) {
     try {
         const response = await fetch(`${API_BASE_URL}/sensor-data`, {
@@ -201,18 +284,7 @@ async function saveSensorDataToDB(data) {
             headers: {
                 'Content-Type': 'application/json',
             },
-            body: JSON.stringify({
-                device_id: data.device_name || data.device_id || 'unknown',
-                user_id: data.user_id || 'default_user',
-                timestamp: data.timestamp || new Date().toISOString(),
-                arduino_timestamp: data.arduino_timestamp,
-                sensor_data: data.sensor_data || {},
-                baseline_acceleration: data.baseline_acceleration,
-                current_acceleration: data.current_acceleration,
-                system_active: data.system_active !== undefined ? data.system_active : true,
-                fall_count: data.fall_count || 0,
-                data_source: data.platform === 'Windows' ? 'simulator' : 'arduino'
-            })
+            body: JSON.stringify(sensorPayload(data))
         });
 
         if (response.ok) {
@@ -226,6 +298,28 @@ async function saveSensorDataToDB(data) {
     }
 }
 
+// Función para guardar un lote de lecturas en una sola petición y transacción
+async function saveSensorBatchToDB(samples) {
+    try {
+        const response = await fetch(`${API_BASE_URL}/sensor-data`, {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+            },
+            body: JSON.stringify({ readings: samples.map(sensorPayload) })
+        });
+
+        if (response.ok) {
+            const result = await response.json();
+            console.log(`✅ Lote de ${result.data.count} lecturas guardado en BD`);
+        } else {
+            console.error('❌ Error guardando lote de lecturas:', response.status, await response.text());
+        }
+    } catch (error) {
+        console.error('❌ Error conectando con API para lote de lecturas:', error.message);
+    }
+}
+
 async function saveFallAlertToDB(data) {
     try {
         const response = await fetch(`${API_BASE_URL}/fall-alert`, {
@@ -258,6 +352,31 @@ async function saveFallAlertToDB(data) {
     }
 }
 
+// Función para guardar agregados (sensor_rollup) en la base de datos
+async function saveRollupToDB(data) {
+    try {
+        const response = await fetch(`${API_BASE_URL}/rollups`, {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+            },
+            body: JSON.stringify({
+                ...data,
+                device_id: data.device_id || 'unknown',
+                user_id: data.user_id || null
+            })
+        });
+
+        if (response.ok) {
+            console.log(`📊 Agregado ${data.resolution} de ${data.device_id} guardado (${data.start})`);
+        } else {
+            console.error('❌ Error guardando agregado:', response.status);
+        }
+    } catch (error) {
+        console.error('❌ Error conectando con API:', error.message);
+    }
+}
+
 // Función para obtener estadísticas de la base de datos
 async function getDBStats() {
     try {
@@ -4,10 +4,15 @@ Simulador de detección de caídas para Windows - Testing local
 Este script simula el comportamiento del Raspberry Pi para pruebas.
 
 Dependencias para Windows:
-pip install websocket-client requests
+pip install websockets
+
+Requiere ws_outbound.py en el mismo directorio (y load_generator.py para el
+modo de carga con --devices).
 
 Uso:
 python windows_fall_simulator.py --ws-url ws://localhost:8080
+python windows_fall_simulator.py --devices 2000 --duration 120 --profile residencia
+python windows_fall_simulator.py --scenario escenario.json --processes 4
 
 Autor: Geronimo
 Fecha: Octubre 2025
@@ -21,14 +26,17 @@ import random
 from datetime import datetime
 import argparse
 
-# Intentar importar websocket
+# Intentar importar websockets
 try:
-    import websocket
+    from ws_outbound import WebSocketChannel
 except ImportError:
-    print("❌ Error: websocket-client no está instalado")
-    print("Ejecuta: pip install websocket-client requests")
+    print("❌ Error: websockets no está instalado")
+    print("Ejecuta: pip install websockets")
     exit(1)
 
+from load_generator import (DEFAULT_PROFILE, DEVICES_PER_CONNECTION, PROFILES, load_scenario,
+                            print_report, run_load)
+
 # Configuración de logging
 logging.basicConfig(
     level=logging.INFO,
@@ -44,27 +52,16 @@ class WindowsFallSimulator:
     def __init__(self, ws_url=DEFAULT_WS_URL, user_id=DEFAULT_USER_ID):
         self.ws_url = ws_url
         self.user_id = user_id
-        self.ws = None
-        self.connected = False
+        self.channel = None  # Canal WebSocket con cola de prioridad
         self.running = False
         self.fall_count = 0
         self.last_status_update = 0
         
-    def on_ws_open(self, ws):
-        """Cuando se abre la conexión WebSocket"""
-        logger.info("🔗 Conexión WebSocket establecida")
-        self.connected = True
-        
-        # Identificarse como simulador de Windows
-        identification = {
-            "type": "identify",
-            "client": "raspberry_fall_detection",
-            "device": "Windows Fall Simulator",
-            "platform": "Windows Testing"
-        }
-        ws.send(json.dumps(identification))
+    @property
+    def connected(self):
+        return self.channel is not None and self.channel.connected
         
-    def on_ws_message(self, ws, message):
+    def on_ws_message(self, message):
         """Recibir mensajes del servidor"""
         try:
             data = json.loads(message)
@@ -72,41 +69,26 @@ class WindowsFallSimulator:
                 logger.info(f"✅ Servidor responde: {data.get('message', 'Conectado')}")
         except Exception as e:
             logger.debug(f"Mensaje del servidor: {message}")
-            
-    def on_ws_error(self, ws, error):
-        """Error en WebSocket"""
-        logger.error(f"❌ Error WebSocket: {error}")
-        self.connected = False
-        
-    def on_ws_close(self, ws, close_status_code, close_msg):
-        """Conexión cerrada"""
-        logger.info("🔌 Conexión WebSocket cerrada")
-        self.connected = False
         
     def connect_websocket(self):
         """Conectar al servidor WebSocket"""
         try:
             logger.info(f"🔄 Conectando a: {self.ws_url}")
-            self.ws = websocket.WebSocketApp(
-                self.ws_url,
-                on_open=self.on_ws_open,
-                on_message=self.on_ws_message,
-                on_error=self.on_ws_error,
-                on_close=self.on_ws_close
-            )
             
-            # Ejecutar en hilo separado
-            wst = threading.Thread(target=self.ws.run_forever)
-            wst.daemon = True
-            wst.start()
+            # Identificarse como simulador de Windows
+            identification = {
+                "type": "identify",
+                "client": "raspberry_fall_detection",
+                "device": "Windows Fall Simulator",
+                "platform": "Windows Testing"
+            }
+            self.channel = WebSocketChannel(self.ws_url, identification, on_message=self.on_ws_message)
+            
+            # Ejecutar el canal (bucle asyncio propio) en hilo separado
+            self.channel.start_in_thread()
             
             # Esperar conexión (timeout 10 segundos)
-            timeout = 10
-            while not self.connected and timeout > 0:
-                time.sleep(0.5)
-                timeout -= 0.5
-                
-            if self.connected:
+            if self.channel.wait_connected_blocking(10):
                 logger.info("🎉 Conectado al servidor WebSocket")
             else:
                 logger.error("⏰ Timeout: No se pudo conectar al servidor")
@@ -146,9 +128,9 @@ class WindowsFallSimulator:
         }
         
         # Enviar alerta
-        if self.connected and self.ws:
+        if self.connected:
             try:
-                self.ws.send(json.dumps(fall_alert))
+                self.channel.send(fall_alert)
                 logger.info(f"📤 Alerta enviada al dashboard (Severidad: {fall_alert['severity']})")
             except Exception as e:
                 logger.error(f"❌ Error enviando alerta: {e}")
@@ -175,9 +157,9 @@ class WindowsFallSimulator:
             "status": "active"
         }
         
-        if self.connected and self.ws:
+        if self.connected:
             try:
-                self.ws.send(json.dumps(status_update))
+                self.channel.send(status_update)
                 logger.debug("📊 Estado del sistema actualizado")
             except Exception as e:
                 logger.error(f"❌ Error enviando estado: {e}")
@@ -241,7 +223,7 @@ class WindowsFallSimulator:
         logger.info("🛑 Deteniendo simulador...")
         self.running = False
         
-        if self.ws:
+        if self.channel:
             try:
                 # Enviar mensaje de desconexión
                 disconnect_msg = {
@@ -250,10 +232,10 @@ class WindowsFallSimulator:
                     "status": "disconnecting",
                     "fall_count": self.fall_count
                 }
-                self.ws.send(json.dumps(disconnect_msg))
+                self.channel.send(disconnect_msg)
             except:
                 pass
-            self.ws.close()
+            self.channel.close()
         
         logger.info("✅ Simulador detenido")
 
@@ -267,6 +249,11 @@ Ejemplos de uso:
   python windows_fall_simulator.py --ws-url ws://localhost:8080
   python windows_fall_simulator.py --user-id "test_user" --ws-url ws://192.168.1.100:8080
 
+Modo de carga (miles de dispositivos virtuales, ver load_generator.py):
+  python windows_fall_simulator.py --devices 2000 --duration 120
+  python windows_fall_simulator.py --devices 5000 --profile telemetria --processes 4
+  python windows_fall_simulator.py --scenario escenario.json --latency echo
+
 Asegúrate de tener el servidor WebSocket ejecutándose:
   node websocket-server.js
         """
@@ -283,8 +270,37 @@ Asegúrate de tener el servidor WebSocket ejecutándose:
         help=f"ID del usuario (default: {DEFAULT_USER_ID})"
     )
     
+    load = parser.add_argument_group("modo de carga")
+    load.add_argument("--devices", type=int, default=1,
+                      help="Dispositivos virtuales (más de 1 activa el generador de carga)")
+    load.add_argument("--scenario", help="Archivo JSON con las fases del escenario")
+    load.add_argument("--profile", default=DEFAULT_PROFILE, choices=sorted(PROFILES),
+                      help=f"Perfil de frecuencias (default: {DEFAULT_PROFILE})")
+    load.add_argument("--duration", type=float, default=60, help="Segundos de carga (sin --scenario)")
+    load.add_argument("--sensor-hz", type=float, help="Lecturas sensor_data por segundo y dispositivo")
+    load.add_argument("--status-interval", type=float, help="Segundos entre system_status por dispositivo")
+    load.add_argument("--falls-per-hour", type=float, help="Caídas por hora y dispositivo")
+    load.add_argument("--devices-per-connection", type=int, default=DEVICES_PER_CONNECTION,
+                      help=f"Dispositivos por conexión WebSocket (default: {DEVICES_PER_CONNECTION})")
+    load.add_argument("--processes", type=int, default=1, help="Procesos generadores en paralelo")
+    load.add_argument("--latency", choices=("observer", "echo", "none"), default="observer",
+                      help="Medir la latencia como cliente React (observer) o por eco")
+    
     args = parser.parse_args()
     
+    if args.devices > 1 or args.scenario:
+        phases = load_scenario(args.scenario, args.profile, args.devices, args.duration,
+                               sensor_hz=args.sensor_hz, status_interval=args.status_interval,
+                               falls_per_hour=args.falls_per_hour)
+        print("🏋️  Generador de carga")
+        print(f"📡 WebSocket: {args.ws_url}")
+        for phase in phases:
+            print(f"   {phase['name']}: {phase['devices']} dispositivos durante {phase['duration']} s")
+        logging.getLogger("ws_outbound").setLevel(logging.WARNING)
+        result = run_load(args.ws_url, phases, args.devices_per_connection, args.latency, args.processes)
+        print_report(result)
+        return
+    
     print("🎯 Simulador de Detección de Caídas - Windows")
     print("=" * 50)
     print(f"📡 WebSocket: {args.ws_url}")
@@ -0,0 +1,378 @@
+#!/usr/bin/env python3
+"""
+Canal WebSocket saliente con cola de prioridad y contrapresión.
+
+Todos los mensajes pasan por una única cola que atiende primero las alertas de
+caída, después los estados del sistema y por último la telemetría. Mientras un
+mensaje de telemetría espera en la cola, uno nuevo del mismo tipo y dispositivo
+lo sustituye (coalescencia), así una ráfaga de lecturas nunca queda delante de
+una alerta. Toda la E/S del socket la hace un único escritor asyncio.
+
+Se puede usar desde código asyncio (start / aclose) o desde scripts síncronos,
+que ejecutan el bucle del canal en un hilo propio (start_in_thread / close).
+
+Si se le pasa un MessageSpool (ws_spool.py), los mensajes que se producen con la
+conexión caída se guardan en disco y se reenvían en bloque al reconectar.
+
+Dependencias:
+pip install websockets
+
+Autor: Tu nombre
+Fecha: Octubre 2025
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from collections import deque
+
+import websockets
+
+from message_codec import dumps, encode_message
+from metrics import STAGE_END_TO_END, STAGE_QUEUE, now
+
+logger = logging.getLogger(__name__)
+
+# Prioridades (0 = más urgente)
+PRIORITY_ALERT = 0
+PRIORITY_STATUS = 1
+PRIORITY_TELEMETRY = 2
+
+MESSAGE_PRIORITIES = {
+    "fall_alert": PRIORITY_ALERT,
+    "system_status": PRIORITY_STATUS,
+    "sensor_data": PRIORITY_TELEMETRY,
+    "sensor_data_batch": PRIORITY_TELEMETRY,
+}
+
+# Tipos que se pueden fusionar: solo importa el último valor por dispositivo
+COALESCE_TYPES = {"system_status", "sensor_data"}
+
+MAX_QUEUE_SIZE = 500         # Mensajes pendientes como máximo (las alertas nunca se descartan)
+RECONNECT_DELAY = 5          # Segundos entre intentos de reconexión
+CLOSE_DRAIN_TIMEOUT = 2.0    # Segundos para vaciar la cola al cerrar
+MAX_TRACES = 1000            # Marcas de latencia pendientes como máximo
+
+
+def message_priority(message):
+    return MESSAGE_PRIORITIES.get(message.get("type"), PRIORITY_STATUS)
+
+
+def coalesce_key(message):
+    """Clave de fusión (tipo, dispositivo) o None si el mensaje no se puede fusionar"""
+    msg_type = message.get("type")
+    if msg_type not in COALESCE_TYPES:
+        return None
+    device = message.get("device_id") or message.get("device_name") or message.get("user_id")
+    if "ble_status" in message:
+        # Conexión o desconexión del enlace BLE: solo la sustituye otro cambio de enlace,
+        # no el STATUS periódico (que no lleva ble_status)
+        return (msg_type, device, "ble_status")
+    return (msg_type, device)
+
+
+class OutboundQueue:
+    """Cola de prioridad acotada con coalescencia de telemetría"""
+
+    def __init__(self, max_size=MAX_QUEUE_SIZE):
+        self.max_size = max_size
+        self.levels = [deque() for _ in range(PRIORITY_TELEMETRY + 1)]
+        self.pending = {}  # clave de fusión -> entrada [clave, mensaje]
+        self.size = 0
+        self.stats = {"enqueued": 0, "coalesced": 0, "dropped": 0}
+
+    def __len__(self):
+        return self.size
+
+    def depth(self):
+        """Mensajes pendientes por nivel de prioridad"""
+        return [len(level) for level in self.levels]
+
+    def drop_lower_than(self, priority):
+        """Descarta el mensaje más antiguo de menor prioridad que la indicada"""
+        for level in range(PRIORITY_TELEMETRY, priority, -1):
+            if self.levels[level]:
+                key, _ = self.levels[level].popleft()
+                if key is not None:
+                    self.pending.pop(key, None)
+                self.size -= 1
+                self.stats["dropped"] += 1
+                return True
+        return False
+
+    def put(self, message):
+        """Encola un mensaje. Devuelve False si se descartó por falta de espacio"""
+        return self.put_item(message, coalesce_key(message), message_priority(message))
+
+    def put_item(self, message, key, priority):
+        """Encola con la clave y prioridad ya calculadas (ws_relay_server.py encola el
+        mismo mensaje codificado en la cola de cada cliente)"""
+        if key is not None and key in self.pending:
+            self.pending[key][1] = message
+            self.stats["coalesced"] += 1
+            return True
+
+        if self.size >= self.max_size and not self.drop_lower_than(priority):
+            if priority != PRIORITY_ALERT:
+                self.stats["dropped"] += 1
+                return False
+            # Las alertas se aceptan aunque la cola esté llena
+
+        entry = [key, message]
+        self.levels[priority].append(entry)
+        if key is not None:
+            self.pending[key] = entry
+        self.size += 1
+        self.stats["enqueued"] += 1
+        return True
+
+    def put_front(self, message):
+        """Devuelve a la cabeza de su nivel un mensaje cuyo envío falló"""
+        self.levels[message_priority(message)].appendleft([None, message])
+        self.size += 1
+
+    def pop(self):
+        """Siguiente mensaje por prioridad (FIFO dentro de cada nivel) o None"""
+        for level in self.levels:
+            if level:
+                key, message = level.popleft()
+                if key is not None:
+                    self.pending.pop(key, None)
+                self.size -= 1
+                return message
+        return None
+
+
+class WebSocketChannel:
+    """Conexión WebSocket con reconexión automática y un único escritor asyncio"""
+
+    def __init__(self, url, identification, on_message=None, max_queue=MAX_QUEUE_SIZE,
+                 reconnect_delay=RECONNECT_DELAY, spool=None):
+        self.url = url
+        self.identification = identification  # dict o función que devuelve el dict
+        self.on_message = on_message
+        self.reconnect_delay = reconnect_delay
+        self.queue = OutboundQueue(max_queue)
+        self.spool = spool
+        self.connected = False
+        self.running = False
+        self.sent_count = 0
+        self.connections = 0  # Conexiones establecidas (la primera no es reconexión)
+        self.traces = {}  # id(mensaje) -> (mensaje, recepción, encolado) para las métricas de latencia
+        self.ws = None
+        self.loop = None
+        self.loop_thread_id = None
+        self.wakeup = None
+        self.connected_event = None
+        self.closed_event = None
+        self.task = None
+        self.thread = None
+
+    def start(self):
+        """Arranca el canal en el bucle de eventos actual"""
+        self.loop = asyncio.get_running_loop()
+        self.loop_thread_id = threading.get_ident()
+        self.wakeup = asyncio.Event()
+        self.connected_event = asyncio.Event()
+        self.closed_event = asyncio.Event()
+        self.running = True
+        self.task = asyncio.create_task(self.run())
+
+    def start_in_thread(self):
+        """Arranca el canal en un bucle de eventos propio en un hilo demonio"""
+        started = threading.Event()
+
+        def runner():
+            loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(loop)
+
+            async def main():
+                self.start()
+                started.set()
+                await self.closed_event.wait()
+
+            loop.run_until_complete(main())
+            loop.close()
+
+        self.thread = threading.Thread(target=runner, daemon=True)
+        self.thread.start()
+        started.wait()
+
+    async def wait_connected(self, timeout):
+        try:
+            await asyncio.wait_for(self.connected_event.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        return self.connected
+
+    def wait_connected_blocking(self, timeout):
+        """Equivalente síncrono de wait_connected para el modo hilo"""
+        future = asyncio.run_coroutine_threadsafe(self.wait_connected(timeout), self.loop)
+        return future.result(timeout + 1)
+
+    def enqueue(self, message, received=None):
+        # Sin socket abierto se persiste en disco; durante el reenvío del spool se usa la cola
+        if self.spool is not None and self.ws is None:
+            return self.spool.append(message, message_priority(message))
+        accepted = self.queue.put(message)
+        if accepted:
+            if len(self.traces) >= MAX_TRACES:
+                self.traces.clear()  # Mensajes coalescidos o descartados que nunca se escribieron
+            # Se guarda el propio mensaje para que su id no se reutilice antes de escribirlo
+            self.traces[id(message)] = (message, received, now())
+        self.wakeup.set()
+        return accepted
+
+    def send(self, message, received=None):
+        """Encola un mensaje desde cualquier hilo. Devuelve False si se descartó
+
+        received es el instante (metrics.now()) en que llegó el dato que originó
+        el mensaje, para medir la latencia de extremo a extremo.
+        """
+        if self.loop is None:
+            return False
+        if threading.get_ident() == self.loop_thread_id:
+            return self.enqueue(message, received)
+        self.loop.call_soon_threadsafe(self.enqueue, message, received)
+        return True
+
+    def get_stats(self):
+        stats = {
+            **self.queue.stats,
+            "sent": self.sent_count,
+            "reconnects": max(0, self.connections - 1),
+            "queued": len(self.queue),
+            "depth": self.queue.depth(),
+            "connected": self.connected
+        }
+        if self.spool is not None:
+            stats["spool"] = self.spool.get_stats()
+        return stats
+
+    def spool_pending(self):
+        """Pasa al spool lo que quedó en la cola al caerse la conexión"""
+        if self.spool is None:
+            return
+        message = self.queue.pop()
+        while message is not None:
+            self.spool.append(message, message_priority(message))
+            message = self.queue.pop()
+
+    async def replay_spool(self, ws):
+        """Reenvía en bloque el backlog del spool, primero las alertas"""
+        if self.spool is None or not len(self.spool):
+            return
+        start = time.perf_counter()
+        backlog = self.spool.replay()
+        for message in backlog:
+            await ws.send(encode_message(message))
+        # Solo se borra del disco cuando todo el backlog salió (entrega al menos una vez)
+        self.spool.clear(replayed=len(backlog))
+        self.sent_count += len(backlog)
+        elapsed = time.perf_counter() - start
+        stats = self.spool.get_stats()
+        logger.info(
+            f"Spool reenviado: {len(backlog)} mensajes en {elapsed:.3f}s "
+            f"({len(backlog) / elapsed if elapsed else 0:.0f} msg/s), "
+            f"fsync: {stats['fsyncs']} llamadas, {stats.get('fsync_avg_ms', 0)} ms de media"
+        )
+
+    async def read_loop(self, ws):
+        async for raw in ws:
+            if self.on_message:
+                self.on_message(raw)
+
+    async def write_loop(self, ws):
+        while True:
+            message = self.queue.pop()
+            if message is None:
+                self.wakeup.clear()
+                await self.wakeup.wait()
+                continue
+            try:
+                # send espera a que el socket drene: contrapresión natural
+                await ws.send(encode_message(message))
+                self.sent_count += 1
+            except Exception:
+                self.queue.put_front(message)
+                raise
+            trace = self.traces.pop(id(message), None)
+            if trace is not None:
+                written = now()
+                STAGE_QUEUE.observe(written - trace[2])
+                if trace[1] is not None:
+                    STAGE_END_TO_END.observe(written - trace[1])
+
+    async def run(self):
+        """Bucle de conexión con reconexión automática"""
+        while self.running:
+            try:
+                logger.info(f"Conectando a WebSocket: {self.url}")
+                async with websockets.connect(self.url) as ws:
+                    self.ws = ws
+                    identification = self.identification
+                    if callable(identification):
+                        identification = identification()
+                    await ws.send(dumps(identification))
+                    await self.replay_spool(ws)
+                    self.connections += 1
+                    self.connected = True
+                    self.connected_event.set()
+                    logger.info("Conexión WebSocket establecida")
+
+                    tasks = [asyncio.create_task(self.read_loop(ws)),
+                             asyncio.create_task(self.write_loop(ws))]
+                    try:
+                        done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                        for task in done:
+                            task.result()
+                    finally:
+                        for task in tasks:
+                            task.cancel()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error WebSocket: {e}")
+            finally:
+                self.ws = None
+                if self.connected:
+                    logger.info("Conexión WebSocket cerrada")
+                self.connected = False
+                self.connected_event.clear()
+                self.spool_pending()
+
+            if self.running:
+                await asyncio.sleep(self.reconnect_delay)
+
+    async def aclose(self, drain_timeout=CLOSE_DRAIN_TIMEOUT):
+        """Intenta vaciar la cola y cierra la conexión"""
+        waited = 0.0
+        while len(self.queue) and self.connected and waited < drain_timeout:
+            await asyncio.sleep(0.05)
+            waited += 0.05
+
+        self.running = False
+        if self.ws is not None:
+            await self.ws.close()
+        self.connected = False
+        if self.task:
+            self.task.cancel()
+            try:
+                await self.task
+            except (asyncio.CancelledError, Exception):
+                pass
+        if self.spool is not None:
+            self.spool_pending()
+            self.spool.close()
+        self.closed_event.set()
+
+    def close(self, drain_timeout=CLOSE_DRAIN_TIMEOUT):
+        """Cierre síncrono para el modo hilo"""
+        if self.loop is None or not self.loop.is_running():
+            return
+        future = asyncio.run_coroutine_threadsafe(self.aclose(drain_timeout), self.loop)
+        try:
+            future.result(drain_timeout + 2)
+        except Exception as e:
+            logger.error(f"Error cerrando WebSocket: {e}")
@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+"""
+Spool en disco (store-and-forward) para mensajes WebSocket.
+
+Mientras la conexión con el servidor está caída, cada mensaje saliente se
+guarda en segmentos append-only mapeados en memoria (mmap). Al reconectar se
+reenvía todo el backlog de una vez, primero las alertas, sin duplicar alertas
+con el mismo alert_id. Un reinicio del servidor del dashboard o de la propia
+Raspberry Pi ya no pierde alertas de caída.
+
+Formato de cada segmento (spool_000001.seg):
+  cabecera: b"FDSPOOL1"
+  registros: <longitud u32><prioridad u8><crc32 u32><JSON utf-8>
+  una longitud 0 marca el final de los datos escritos
+
+Autor: Tu nombre
+Fecha: Octubre 2025
+"""
+
+import logging
+import mmap
+import os
+import struct
+import time
+import zlib
+
+from message_codec import dumps_bytes, loads
+
+logger = logging.getLogger(__name__)
+
+SPOOL_DIR = "spool"
+SEGMENT_SIZE = 1024 * 1024        # 1 MiB por segmento
+MAX_SPOOL_BYTES = 64 * 1024 * 1024  # Presupuesto total en disco
+SYNC_EVERY = 50                   # Registros de telemetría entre cada msync
+SYNC_PRIORITY = 0                 # Prioridad que se sincroniza a disco en cada append (alertas)
+
+SEGMENT_MAGIC = b"FDSPOOL1"
+RECORD_HEADER = struct.Struct("<IBI")
+
+
+class MessageSpool:
+    """Spool append-only en segmentos mmap con rotación y presupuesto de disco"""
+
+    def __init__(self, directory=SPOOL_DIR, segment_size=SEGMENT_SIZE, max_bytes=MAX_SPOOL_BYTES,
+                 sync_every=SYNC_EVERY):
+        self.directory = directory
+        self.segment_size = segment_size
+        self.max_bytes = max_bytes
+        self.sync_every = sync_every
+        self.segments = []  # índices de segmento en disco, del más antiguo al más nuevo
+        self.active_file = None
+        self.active_map = None
+        self.offset = 0
+        self.unsynced = 0
+        self.count = 0
+        self.stats = {
+            "appended": 0, "bytes": 0, "evicted": 0, "lost": 0, "lost_alerts": 0,
+            "fsyncs": 0, "fsync_seconds": 0.0,
+            "replayed": 0, "duplicates": 0, "replay_seconds": 0.0
+        }
+
+        os.makedirs(directory, exist_ok=True)
+        self.segments = sorted(
+            int(name[6:12]) for name in os.listdir(directory)
+            if name.startswith("spool_") and name.endswith(".seg")
+        )
+        for index in self.segments:
+            self.count += sum(1 for _ in self.read_segment(index))
+        if self.segments:
+            self.open_segment(self.segments[-1])
+            logger.info(f"Spool recuperado: {self.count} mensajes pendientes en {len(self.segments)} segmentos")
+
+    def __len__(self):
+        return self.count
+
+    def segment_path(self, index):
+        return os.path.join(self.directory, f"spool_{index:06d}.seg")
+
+    def open_segment(self, index):
+        """Abre (o crea) un segmento y sitúa el puntero de escritura tras el último registro"""
+        path = self.segment_path(index)
+        is_new = not os.path.exists(path)
+        self.active_file = open(path, "a+b")
+        if is_new:
+            self.active_file.truncate(self.segment_size)
+        self.active_map = mmap.mmap(self.active_file.fileno(), self.segment_size)
+        if is_new:
+            self.active_map[:len(SEGMENT_MAGIC)] = SEGMENT_MAGIC
+            self.offset = len(SEGMENT_MAGIC)
+            self.segments.append(index)
+        else:
+            self.offset = len(SEGMENT_MAGIC)
+            for _, _, end in self.scan(self.active_map):
+                self.offset = end
+
+    def close_segment(self):
+        if self.active_map is not None:
+            self.sync()
+            self.active_map.close()
+            self.active_file.close()
+            self.active_map = None
+            self.active_file = None
+
+    def scan(self, buffer):
+        """Recorre los registros válidos de un segmento sin copiar: (prioridad, inicio, fin)"""
+        with memoryview(buffer) as view:
+            if view[:len(SEGMENT_MAGIC)] != SEGMENT_MAGIC:
+                return
+            offset = len(SEGMENT_MAGIC)
+            limit = len(view) - RECORD_HEADER.size
+            while offset <= limit:
+                length, priority, crc = RECORD_HEADER.unpack_from(view, offset)
+                start = offset + RECORD_HEADER.size
+                end = start + length
+                if length == 0 or end > len(view):
+                    break
+                if zlib.crc32(view[start:end]) != crc:
+                    logger.warning("Registro corrupto en el spool, se ignora el resto del segmento")
+                    break
+                yield priority, start, end
+                offset = end
+
+    def read_segment(self, index):
+        """Registros (prioridad, bytes JSON) de un segmento en disco"""
+        if self.active_map is not None and index == self.segments[-1]:
+            for priority, start, end in self.scan(self.active_map):
+                yield priority, self.active_map[start:end]
+            return
+        with open(self.segment_path(index), "rb") as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                for priority, start, end in self.scan(mm):
+                    yield priority, mm[start:end]
+
+    def sync(self):
+        """msync del segmento activo, midiendo su coste"""
+        if self.active_map is None or not self.unsynced:
+            return
+        start = time.perf_counter()
+        self.active_map.flush()
+        self.stats["fsync_seconds"] += time.perf_counter() - start
+        self.stats["fsyncs"] += 1
+        self.unsynced = 0
+
+    def rotate(self):
+        """Cierra el segmento activo, abre uno nuevo y aplica el presupuesto de disco"""
+        next_index = self.segments[-1] + 1 if self.segments else 1
+        self.close_segment()
+        self.open_segment(next_index)
+        while len(self.segments) * self.segment_size > self.max_bytes and len(self.segments) > 1:
+            self.evict_oldest()
+
+    def evict_oldest(self):
+        """Elimina el segmento más antiguo conservando sus alertas"""
+        index = self.segments.pop(0)
+        records = list(self.read_segment(index))
+        os.remove(self.segment_path(index))
+        alerts = [(priority, payload) for priority, payload in records if priority <= SYNC_PRIORITY]
+        lost = len(records) - len(alerts)
+        self.count -= len(records)
+        self.stats["evicted"] += 1
+        if len(alerts) < len(records):
+            self.stats["lost"] += lost
+            logger.error(f"Spool lleno: descartados {lost} mensajes de telemetría antiguos")
+            for priority, payload in alerts:
+                self.write_record(priority, payload)
+        elif alerts:
+            # Segmento solo de alertas: reescribirlas volvería a llenar el spool sin liberar nada
+            alert_ids = [loads(payload).get("alert_id") for _, payload in alerts]
+            self.stats["lost"] += len(alerts)
+            self.stats["lost_alerts"] += len(alerts)
+            logger.error(f"Spool lleno solo de alertas: descartadas {len(alerts)} alertas antiguas "
+                         f"({', '.join(str(alert_id) for alert_id in alert_ids)})")
+
+    def write_record(self, priority, payload):
+        needed = RECORD_HEADER.size + len(payload)
+        if needed > self.segment_size - len(SEGMENT_MAGIC) - RECORD_HEADER.size:
+            logger.error(f"Mensaje demasiado grande para el spool ({len(payload)} bytes)")
+            return False
+        if self.active_map is None:
+            self.rotate()
+        elif self.offset + needed + RECORD_HEADER.size > self.segment_size:
+            self.rotate()
+
+        RECORD_HEADER.pack_into(self.active_map, self.offset, len(payload), priority, zlib.crc32(payload))
+        start = self.offset + RECORD_HEADER.size
+        self.active_map[start:start + len(payload)] = payload
+        self.offset = start + len(payload)
+        self.count += 1
+        self.unsynced += 1
+        return True
+
+    def append(self, message, priority):
+        """Persiste un mensaje. Las alertas se sincronizan a disco inmediatamente"""
+        payload = dumps_bytes(message)
+        if not self.write_record(priority, payload):
+            return False
+        self.stats["appended"] += 1
+        self.stats["bytes"] += len(payload)
+        if priority <= SYNC_PRIORITY or self.unsynced >= self.sync_every:
+            self.sync()
+        return True
+
+    def replay(self):
+        """
+        Devuelve el backlog completo ordenado por prioridad (estable: dentro de cada
+        prioridad se conserva el orden de llegada) y sin alertas duplicadas
+        """
+        start = time.perf_counter()
+        self.sync()
+        records = []
+        seen_alerts = set()
+        for index in list(self.segments):
+            for priority, payload in self.read_segment(index):
+                message = loads(payload)
+                alert_id = message.get("alert_id")
+                if alert_id is not None:
+                    # La captura IMU (fall_capture) comparte alert_id con su alerta
+                    key = (message.get("type"), alert_id)
+                    if key in seen_alerts:
+                        self.stats["duplicates"] += 1
+                        continue
+                    seen_alerts.add(key)
+                records.append((priority, message))
+        records.sort(key=lambda record: record[0])
+        self.stats["replay_seconds"] += time.perf_counter() - start
+        return [message for _, message in records]
+
+    def clear(self, replayed=0):
+        """Borra todos los segmentos una vez reenviado el backlog"""
+        self.close_segment()
+        for index in self.segments:
+            os.remove(self.segment_path(index))
+        self.segments = []
+        self.count = 0
+        self.stats["replayed"] += replayed
+
+    def get_stats(self):
+        stats = dict(self.stats)
+        stats["pending"] = self.count
+        stats["segments"] = len(self.segments)
+        if stats["fsyncs"]:
+            stats["fsync_avg_ms"] = round(1000 * stats["fsync_seconds"] / stats["fsyncs"], 3)
+        if stats["replay_seconds"] and stats["replayed"]:
+            stats["replay_msgs_per_s"] = round(stats["replayed"] / stats["replay_seconds"])
+        return stats
+
+    def close(self):
+        self.close_segment()